@@ -1,5 +1,5 @@
 from app.database import SessionLocal
-from app import models
+from app import models, catalog_cache
 
 db = SessionLocal()
 
@@ -24,6 +24,7 @@ def list_and_update():
     if text:
         text.course_level = new_level
         db.commit()
+        catalog_cache.bump_generation(db) # Running workers reload the catalog
         print(f"✅ ¡Actualizado! '{text.title}' ahora es de nivel '{new_level}'")
     else:
         print("❌ ID no encontrado.")
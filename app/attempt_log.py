@@ -0,0 +1,68 @@
+import atexit
+import os
+import threading
+import time
+from datetime import datetime
+from typing import List
+from sqlalchemy import insert
+from . import database, models
+
+# Audit log of login attempts (login_attempts table), written in batches by a
+# background thread instead of one INSERT + COMMIT inside every login request.
+# Rate limiting does not read this table (see app/rate_limit.py), so a few
+# seconds of delay does not matter. Rows still buffered when a worker dies are lost.
+
+FLUSH_INTERVAL_SECONDS = float(os.getenv("LOGIN_ATTEMPT_FLUSH_SECONDS", "2"))
+MAX_BUFFERED = 10000
+
+
+class AttemptLog:
+    def __init__(self, flush_interval: float, max_buffered: int):
+        self.flush_interval = flush_interval
+        self.max_buffered = max_buffered
+        self._rows: List[dict] = []
+        self._lock = threading.Lock()
+        self._thread = None
+        self.dropped = 0
+
+    def record(self, ip_address: str, code_index: str, success: bool):
+        with self._lock:
+            if len(self._rows) >= self.max_buffered:
+                # DB unreachable for a long time: keep memory bounded
+                self.dropped += 1
+                return
+            self._rows.append({
+                "ip_address": ip_address,
+                "login_code_index": code_index,
+                "success": success,
+                "timestamp": datetime.utcnow(),
+            })
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="login-attempt-log", daemon=True)
+                self._thread.start()
+
+    def flush(self):
+        with self._lock:
+            rows, self._rows = self._rows, []
+        if not rows:
+            return
+        db = database.SessionLocal()
+        try:
+            db.execute(insert(models.LoginAttempt), rows)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            print(f"Could not write {len(rows)} login attempts: {e}")
+            with self._lock:
+                self._rows[:0] = rows[:max(self.max_buffered - len(self._rows), 0)]
+        finally:
+            db.close()
+
+    def _run(self):
+        while True:
+            time.sleep(self.flush_interval)
+            self.flush()
+
+
+attempt_log = AttemptLog(FLUSH_INTERVAL_SECONDS, MAX_BUFFERED)
+atexit.register(attempt_log.flush)
@@ -0,0 +1,123 @@
+import asyncio
+import os
+import tempfile
+from datetime import datetime, timedelta, date, time
+from typing import Optional
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import func, case
+from sqlalchemy.orm import Session
+from . import models
+from .database import SessionLocal
+
+try:
+    import fcntl
+except ImportError: # Windows: no lock, fine for a single process
+    fcntl = None
+
+# Retention for the login_attempts audit log.
+# Raw rows older than LOGIN_ATTEMPT_RETENTION_DAYS are rolled up into
+# login_attempts_daily (successes / failures per day, IP and code) and deleted.
+# One transaction per day, so the job can be stopped and re-run at any point.
+#
+# Runs every LOGIN_ATTEMPT_COMPACT_INTERVAL_HOURS inside the app (started in main.py, one
+# worker per machine at a time), from cron (`python compact_login_attempts.py`, see render.yaml,
+# which sets the interval to 0) or on demand with POST /auth/admin/login-attempts/compact.
+
+LOGIN_ATTEMPT_RETENTION_DAYS = int(os.getenv("LOGIN_ATTEMPT_RETENTION_DAYS", "30"))
+LOGIN_ATTEMPT_COMPACT_INTERVAL_HOURS = float(os.getenv("LOGIN_ATTEMPT_COMPACT_INTERVAL_HOURS", "24")) # 0 = off
+FIRST_RUN_DELAY_SECONDS = 60 # After startup, so restarts don't keep postponing it
+LOCK_PATH = os.path.join(tempfile.gettempdir(), "aula_cl_login_compact.lock")
+
+
+def compact(db: Session, retention_days: int = LOGIN_ATTEMPT_RETENTION_DAYS, dry_run: bool = False, now: Optional[datetime] = None) -> dict:
+    """
+    Rolls up and deletes raw attempts from days entirely before `now - retention_days`.
+    Returns a report: {"cutoff", "days", "rows_pruned", "aggregates_written", "per_day"}.
+    """
+    now = now or datetime.utcnow()
+    cutoff = datetime.combine((now - timedelta(days=retention_days)).date(), time.min)
+    report = {"cutoff": cutoff.isoformat(), "dry_run": dry_run, "days": 0, "rows_pruned": 0, "aggregates_written": 0, "per_day": {}}
+
+    oldest = db.query(func.min(models.LoginAttempt.timestamp)).filter(models.LoginAttempt.timestamp < cutoff).scalar()
+    if oldest is None:
+        return report
+
+    day = oldest.date()
+    while day < cutoff.date():
+        start = datetime.combine(day, time.min)
+        end = start + timedelta(days=1)
+        in_day = (models.LoginAttempt.timestamp >= start, models.LoginAttempt.timestamp < end)
+
+        groups = db.query(
+            models.LoginAttempt.ip_address,
+            models.LoginAttempt.login_code_index,
+            func.sum(case((models.LoginAttempt.success == True, 1), else_=0)),
+            func.sum(case((models.LoginAttempt.success == True, 0), else_=1)),
+        ).filter(*in_day).group_by(
+            models.LoginAttempt.ip_address, models.LoginAttempt.login_code_index
+        ).all()
+
+        if groups:
+            pruned = sum(ok + failed for _, _, ok, failed in groups)
+            report["days"] += 1
+            report["rows_pruned"] += pruned
+            report["aggregates_written"] += len(groups)
+            report["per_day"][day.isoformat()] = pruned
+
+            if not dry_run:
+                _merge_day(db, day, groups)
+                db.query(models.LoginAttempt).filter(*in_day).delete(synchronize_session=False)
+                db.commit()
+        day += timedelta(days=1)
+
+    return report
+
+
+def _merge_day(db: Session, day: date, groups):
+    # Adds to the aggregates of a previous run for the same day (if any)
+    existing = {
+        (row.ip_address, row.login_code_index): row
+        for row in db.query(models.LoginAttemptDaily).filter(models.LoginAttemptDaily.day == day)
+    }
+    for ip_address, code_index, ok, failed in groups:
+        row = existing.get((ip_address, code_index))
+        if row is None:
+            db.add(models.LoginAttemptDaily(
+                day=day, ip_address=ip_address, login_code_index=code_index,
+                successes=ok, failures=failed
+            ))
+        else:
+            row.successes += ok
+            row.failures += failed
+
+
+def compact_once() -> Optional[dict]:
+    """
+    compact() with its own session, unless another worker of this machine is already
+    running it (then returns None).
+    """
+    with open(LOCK_PATH, "w") as lock:
+        if fcntl is not None:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return None
+        db = SessionLocal()
+        try:
+            return compact(db)
+        finally:
+            db.close()
+
+
+async def run_periodically(interval_hours: float = LOGIN_ATTEMPT_COMPACT_INTERVAL_HOURS):
+    delay = FIRST_RUN_DELAY_SECONDS
+    while True:
+        await asyncio.sleep(delay)
+        delay = interval_hours * 3600
+        try:
+            report = await run_in_threadpool(compact_once)
+        except Exception as e:
+            print(f"Login attempts compaction failed: {e}")
+            continue
+        if report and report["rows_pruned"]:
+            print(f"Login attempts compacted: {report['rows_pruned']} rows, {report['days']} days")
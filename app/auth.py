@@ -4,8 +4,10 @@ from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi.security import OAuth2PasswordBearer
 from fastapi import Depends, HTTPException, status
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 from . import database, models, schemas
+from .identity_cache import Principal, identity_cache
 
 SECRET_KEY = "SECRET_KEY_AULA_CL_CHANGE_ME_IN_PROD" # TODO: usage env
 ALGORITHM = "HS256"
@@ -38,37 +40,96 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(database.get_db)):
-    credentials_exception = HTTPException(
+def _credentials_exception():
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+def decode_subject(token: str) -> str:
+    """
+    Returns the token's `sub` ("<username>" or "subuser:<id>"), or raises 401.
+    """
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         username: str = payload.get("sub")
         if username is None:
-            raise credentials_exception
+            raise _credentials_exception()
         token_data = schemas.TokenData(username=username)
     except JWTError:
-        raise credentials_exception
-    
-    if token_data.username.startswith("subuser:"):
+        raise _credentials_exception()
+    return token_data.username
+
+def principal_query(subject: str):
+    """
+    SELECT for the User / SubUser a token subject refers to.
+    """
+    if subject.startswith("subuser:"):
         # Handle SubUser
         try:
-            subuser_id = int(token_data.username.split(":")[1])
-            user = db.query(models.SubUser).filter(models.SubUser.id == subuser_id).first()
+            subuser_id = int(subject.split(":")[1])
         except (IndexError, ValueError):
-            raise credentials_exception
-    else:
-        # Handle Regular User
-        user = db.query(models.User).filter(models.User.username == token_data.username).first()
-        
+            raise _credentials_exception()
+        return select(models.SubUser).where(models.SubUser.id == subuser_id)
+    # Handle Regular User
+    return select(models.User).where(models.User.username == subject)
+
+# Plain `def` on purpose: the queries below are synchronous, so FastAPI must run
+# this dependency in its threadpool instead of on the event loop.
+def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(database.get_db)):
+    user = db.execute(principal_query(decode_subject(token))).scalars().first()
+    if user is None:
+        raise _credentials_exception()
+    return user
+
+async def get_current_user_async(token: str = Depends(oauth2_scheme), db = Depends(database.get_async_db)):
+    # Same as get_current_user, for endpoints running on the async engine (DATABASE_ASYNC=1)
+    result = await db.execute(principal_query(decode_subject(token)))
+    user = result.scalars().first()
     if user is None:
-        raise credentials_exception
+        raise _credentials_exception()
     return user
 
-async def get_current_active_user(current_user = Depends(get_current_user)):
+def get_current_principal(token: str = Depends(oauth2_scheme), db: Session = Depends(database.get_db)) -> Principal:
+    # Read-only identity (id, kind, username, access_expires_at, course_level),
+    # served from the identity cache when possible. Use get_current_user when
+    # the endpoint needs to modify the User / SubUser row.
+    subject = decode_subject(token)
+    principal = identity_cache.get(subject)
+    if principal is None:
+        user = db.execute(principal_query(subject)).scalars().first()
+        if user is None:
+            raise _credentials_exception()
+        principal = Principal.from_model(user)
+        identity_cache.put(subject, principal)
+    return principal
+
+async def get_current_principal_async(token: str = Depends(oauth2_scheme), db = Depends(database.get_async_db)) -> Principal:
+    subject = decode_subject(token)
+    principal = identity_cache.get(subject)
+    if principal is None:
+        result = await db.execute(principal_query(subject))
+        user = result.scalars().first()
+        if user is None:
+            raise _credentials_exception()
+        principal = Principal.from_model(user)
+        identity_cache.put(subject, principal)
+    return principal
+
+def _require_teacher(principal: Principal) -> Principal:
+    if principal.kind != "user":
+        raise HTTPException(status_code=403, detail="Not authorized")
+    return principal
+
+def get_current_teacher(principal: Principal = Depends(get_current_principal)) -> Principal:
+    # Teacher accounts only: a student token ("subuser:<id>") has an id from another table
+    return _require_teacher(principal)
+
+async def get_current_teacher_async(principal: Principal = Depends(get_current_principal_async)) -> Principal:
+    return _require_teacher(principal)
+
+def get_current_active_user(current_user = Depends(get_current_user)):
     # Simple check, can be expanded
     # Both User and SubUser have 'email' or 'name' fields, we assume they are active if they exist
     # For robust check:
@@ -0,0 +1,140 @@
+import hashlib
+import os
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Iterator, List, Tuple
+from sqlalchemy.orm import Session
+from . import models, storage, worksheet_pdf, pdf_renderer
+from .pdf_cache import pdf_cache
+
+# Worksheet booklets (/reading/booklet): the worksheets of a course in one download.
+#
+#   zip  every worksheet goes through the disk cache / PDF process pool, like /texts/{id}/pdf,
+#        up to PDF_RENDER_WORKERS renders at a time. The archive is streamed entry by entry,
+#        only the chunk being copied is in memory.
+#   pdf  one document with a table of contents. fpdf2 cannot import pages from other PDFs,
+#        so the booklet is drawn as a single pool task, and cached on disk as a whole.
+
+BOOKLET_MAX_TEXTS = int(os.getenv("BOOKLET_MAX_TEXTS", "100"))
+BUSY_RETRY_SECONDS = 0.5
+CHUNK_SIZE = 64 * 1024
+
+
+@dataclass(frozen=True)
+class BookletEntry:
+    text_id: int
+    filename: str # Name inside the ZIP
+    spec: worksheet_pdf.RenderSpec
+    key: str # pdf_cache key, same as /texts/{id}/pdf
+
+
+def collect(db: Session, texts, font_style: str, font_size: str) -> List[BookletEntry]:
+    """
+    Builds the render specs of `texts` (catalog snapshot entries), in order.
+    """
+    questions = {}
+    rows = db.query(models.Question).filter(
+        models.Question.text_id.in_([t.id for t in texts])
+    ).order_by(models.Question.id)
+    for q in rows:
+        questions.setdefault(q.text_id, []).append(q)
+
+    entries = []
+    for i, text in enumerate(texts, start=1):
+        try:
+            content = storage.read_text(db, text.content_path)
+        except Exception:
+            content = "Error loading content."
+        spec = worksheet_pdf.make_spec(text.title, content, questions.get(text.id, []), font_style, font_size)
+        entries.append(BookletEntry(
+            text_id=text.id,
+            filename=f"{i:03d}_Ficha_{text.filename.replace('.txt', '')}.pdf",
+            spec=spec,
+            key=worksheet_pdf.cache_key(text.id, spec),
+        ))
+    return entries
+
+
+def _render_when_free(render, *args) -> bytes:
+    # The download has already started: wait for room in the pool instead of failing halfway
+    while True:
+        try:
+            return render(*args)[0]
+        except pdf_renderer.RendererBusy:
+            time.sleep(BUSY_RETRY_SECONDS)
+
+
+def _worksheet_path(entry: BookletEntry) -> str:
+    path = pdf_cache.get(entry.key)
+    if path is None:
+        path = pdf_cache.put(entry.key, _render_when_free(pdf_renderer.pdf_renderer.render, entry.spec))
+    return path
+
+
+def worksheet_paths(entries: List[BookletEntry]) -> Iterator[Tuple[BookletEntry, str]]:
+    """
+    Yields (entry, cached PDF path) in order. Missing worksheets are rendered in parallel.
+    """
+    pool = ThreadPoolExecutor(max_workers=pdf_renderer.pdf_renderer.workers, thread_name_prefix="booklet")
+    try:
+        futures = [pool.submit(_worksheet_path, entry) for entry in entries]
+        for entry, future in zip(entries, futures):
+            yield entry, future.result()
+    finally:
+        # Client gone: don't render the rest
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+class _ZipSink:
+    # Write-only file for ZipFile (no seek/tell: entries get data descriptors)
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def stream_zip(entries: List[BookletEntry]) -> Iterator[bytes]:
+    sink = _ZipSink()
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_STORED) as archive:
+        for entry, path in worksheet_paths(entries):
+            info = zipfile.ZipInfo(entry.filename, date_time=time.localtime(os.path.getmtime(path))[:6])
+            # PDFs are already compressed
+            with open(path, "rb") as src, archive.open(info, "w") as dst:
+                while True:
+                    chunk = src.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    dst.write(chunk)
+                    yield sink.drain()
+            yield sink.drain()
+    yield sink.drain()
+
+
+def booklet_key(title: str, entries: List[BookletEntry]) -> str:
+    # Changes whenever any worksheet (or the selection, or its order) changes
+    digest = hashlib.sha256("\n".join([title] + [e.key for e in entries]).encode("utf-8")).hexdigest()[:32]
+    return f"booklet-{digest}"
+
+
+def booklet_pdf(title: str, entries: List[BookletEntry]) -> Tuple[str, str]:
+    """
+    (path, cache key) of the merged booklet. Raises RendererBusy.
+    """
+    key = booklet_key(title, entries)
+    path = pdf_cache.get(key)
+    if path is None:
+        data, _, _ = pdf_renderer.pdf_renderer.render_booklet(title, [e.spec for e in entries])
+        path = pdf_cache.put(key, data)
+    return path, key
@@ -0,0 +1,126 @@
+import asyncio
+import multiprocessing
+import threading
+import time
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Optional, Tuple
+
+# Executor with admission control, for CPU-heavy work that must not take over the
+# server (bcrypt on /auth/login-code, PDF rendering). At most `max_pending` calls are
+# queued or running; beyond that PoolBusy is raised and the endpoint answers 503.
+# Tracks queue depth, queue wait and run time.
+
+
+class PoolBusy(Exception):
+    pass
+
+
+def _timed_call(fn, *args):
+    # Module level so it can be pickled for the process pool
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+class BoundedPool:
+    def __init__(self, name: str, workers: int, max_pending: int, kind: str = "thread"):
+        self.name = name
+        self.workers = workers
+        self.max_pending = max_pending
+        self.kind = kind
+        self._executor: Optional[Executor] = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._peak_pending = 0
+        self._admitted = 0
+        self._rejected = 0
+        self._completed = 0
+        self._wait_seconds = 0.0
+        self._run_seconds = 0.0
+        self._max_wait_seconds = 0.0
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    if self.kind == "process":
+                        # "spawn": the server process has threads, forking it is unsafe
+                        self._executor = ProcessPoolExecutor(
+                            max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+                        )
+                    else:
+                        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=self.name)
+        return self._executor
+
+    def _admit(self):
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self._rejected += 1
+                raise PoolBusy()
+            self._pending += 1
+            self._admitted += 1
+            self._peak_pending = max(self._peak_pending, self._pending)
+
+    def _release(self, wait_seconds: Optional[float] = None, run_seconds: float = 0.0):
+        with self._lock:
+            self._pending -= 1
+            if wait_seconds is not None:
+                self._completed += 1
+                self._wait_seconds += wait_seconds
+                self._run_seconds += run_seconds
+                self._max_wait_seconds = max(self._max_wait_seconds, wait_seconds)
+
+    def _submit(self, fn, *args) -> Future:
+        self._admit()
+        start = time.perf_counter()
+        try:
+            future = self._get_executor().submit(_timed_call, fn, *args)
+        except BaseException:
+            self._release()
+            raise
+        # The slot is freed when the job ends, not when the caller stops waiting:
+        # a disconnected client must not let more work in than max_pending
+        future.add_done_callback(lambda f: self._finish(f, start))
+        return future
+
+    def _finish(self, future: Future, start: float):
+        if future.cancelled() or future.exception() is not None:
+            self._release()
+            return
+        run_seconds = future.result()[1]
+        self._release(max(time.perf_counter() - start - run_seconds, 0.0), run_seconds)
+
+    def run_timed(self, fn, *args) -> Tuple[object, float, float]:
+        """
+        Runs fn(*args) on the pool and blocks until done.
+        Returns (result, queue wait seconds, run seconds). Raises PoolBusy.
+        """
+        start = time.perf_counter()
+        result, run_seconds = self._submit(fn, *args).result()
+        return result, max(time.perf_counter() - start - run_seconds, 0.0), run_seconds
+
+    async def run_async(self, fn, *args):
+        """
+        Same as run_timed for async endpoints: awaits without blocking the event loop.
+        Returns only the result.
+        """
+        result, _ = await asyncio.wrap_future(self._submit(fn, *args))
+        return result
+
+    def stats(self) -> dict:
+        with self._lock:
+            completed = self._completed or 1
+            return {
+                "executor": self.kind,
+                "workers": self.workers,
+                "max_pending": self.max_pending,
+                "pending": self._pending,
+                "queued": max(self._pending - self.workers, 0),
+                "peak_pending": self._peak_pending,
+                "admitted": self._admitted,
+                "rejected": self._rejected,
+                "completed": self._completed,
+                "avg_wait_ms": round(self._wait_seconds / completed * 1000, 2),
+                "max_wait_ms": round(self._max_wait_seconds * 1000, 2),
+                "avg_run_ms": round(self._run_seconds / completed * 1000, 2),
+            }
@@ -0,0 +1,120 @@
+from typing import Optional, Dict
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from . import models
+
+# Catalog queries for the dashboard.
+# All the per-user work (latest score per text, free text, filters) happens in SQL,
+# so a page costs the same whether the library has 10 texts or 10,000.
+
+DEFAULT_PAGE_SIZE = 24
+MAX_PAGE_SIZE = 100
+
+
+def latest_scores_subquery(db: Session, user_id: int):
+    """
+    One row per text the user has attempted: (text_id, score) of the latest attempt.
+    """
+    last_attempts = db.query(
+        func.max(models.ReadingAttempt.id).label("attempt_id")
+    ).filter(
+        models.ReadingAttempt.user_id == user_id
+    ).group_by(models.ReadingAttempt.text_id).subquery()
+
+    return db.query(
+        models.ReadingAttempt.text_id.label("text_id"),
+        models.ReadingAttempt.score.label("score")
+    ).join(
+        last_attempts, models.ReadingAttempt.id == last_attempts.c.attempt_id
+    ).subquery()
+
+
+def latest_scores(db: Session, user_id: int) -> Dict[int, float]:
+    """
+    {text_id: score} of the user's latest attempt per text.
+    """
+    scores = latest_scores_subquery(db, user_id)
+    return {text_id: score for text_id, score in db.query(scores.c.text_id, scores.c.score).all()}
+
+
+def _apply_filters(query, scores, include_inactive: bool, filters: dict, skip: Optional[str] = None):
+    if not include_inactive:
+        query = query.filter(models.Text.is_active == True)
+    if filters.get("course_level") and skip != "course_level":
+        query = query.filter(models.Text.course_level == filters["course_level"])
+    if filters.get("language") and skip != "language":
+        query = query.filter(models.Text.language == filters["language"])
+    if filters.get("completed") is not None and skip != "completed":
+        if filters["completed"]:
+            query = query.filter(scores.c.text_id.isnot(None))
+        else:
+            query = query.filter(scores.c.text_id.is_(None))
+    return query
+
+
+def query_texts(
+    db: Session,
+    user_id: int,
+    include_inactive: bool = False,
+    course_level: Optional[str] = None,
+    language: Optional[str] = None,
+    completed: Optional[bool] = None,
+    after: Optional[int] = None,
+    limit: Optional[int] = None,
+):
+    """
+    Returns a list of (Text, score, is_completed) rows ordered by id.
+    `after` is the keyset cursor (last id of the previous page).
+    """
+    scores = latest_scores_subquery(db, user_id)
+    filters = {"course_level": course_level, "language": language, "completed": completed}
+
+    query = db.query(
+        models.Text,
+        scores.c.score,
+        scores.c.text_id.isnot(None).label("is_completed")
+    ).outerjoin(scores, scores.c.text_id == models.Text.id)
+    query = _apply_filters(query, scores, include_inactive, filters)
+
+    if after is not None:
+        query = query.filter(models.Text.id > after)
+    query = query.order_by(models.Text.id.asc())
+    if limit is not None:
+        query = query.limit(limit)
+    return query.all()
+
+
+def facet_counts(
+    db: Session,
+    user_id: int,
+    include_inactive: bool = False,
+    course_level: Optional[str] = None,
+    language: Optional[str] = None,
+    completed: Optional[bool] = None,
+) -> Dict[str, Dict[str, int]]:
+    """
+    Counts per course_level / language / completed.
+    Each facet ignores its own filter, so the UI can show how many texts
+    each option of a select would return.
+    """
+    scores = latest_scores_subquery(db, user_id)
+    filters = {"course_level": course_level, "language": language, "completed": completed}
+    facets = {}
+
+    for name, column in (("course_level", models.Text.course_level), ("language", models.Text.language)):
+        query = db.query(column, func.count(models.Text.id)).outerjoin(
+            scores, scores.c.text_id == models.Text.id
+        )
+        query = _apply_filters(query, scores, include_inactive, filters, skip=name)
+        facets[name] = {str(value): count for value, count in query.group_by(column).all()}
+
+    done = scores.c.text_id.isnot(None)
+    query = db.query(done, func.count(models.Text.id)).outerjoin(
+        scores, scores.c.text_id == models.Text.id
+    )
+    query = _apply_filters(query, scores, include_inactive, filters, skip="completed")
+    facets["completed"] = {"true": 0, "false": 0}
+    for is_done, count in query.group_by(done).all():
+        facets["completed"]["true" if is_done else "false"] = count
+
+    return facets
@@ -0,0 +1,157 @@
+import os
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Optional, Tuple, TYPE_CHECKING
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from . import models
+
+if TYPE_CHECKING: # sqlalchemy.ext.asyncio needs greenlet, only required with DATABASE_ASYNC=1
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+# In-memory snapshot of the `texts` table, shared by all requests of a worker.
+# The catalog only changes through the admin endpoints, which call bump_generation().
+# The generation lives in the DB (catalog_versions) so every gunicorn worker notices.
+
+# How often (seconds) a worker re-reads the generation. 0 = on every request.
+CHECK_INTERVAL_SECONDS = float(os.getenv("CATALOG_CACHE_CHECK_SECONDS", "2"))
+
+
+@dataclass(frozen=True)
+class CachedText:
+    id: int
+    title: str
+    filename: str
+    course_level: str
+    content_path: str
+    audio_path: Optional[str]
+    language: str
+    is_active: bool
+
+
+@dataclass(frozen=True)
+class CatalogSnapshot:
+    generation: int
+    texts: Dict[int, CachedText]
+    ordered_ids: Tuple[int, ...]
+    first_id: Optional[int] # Lowest id overall (free text for /texts/{id})
+    first_active_id: Optional[int] # Lowest active id (free text in the student list)
+
+    def get(self, text_id: int) -> Optional[CachedText]:
+        return self.texts.get(text_id)
+
+    def list(self, include_inactive: bool = False, course_level: Optional[str] = None, language: Optional[str] = None):
+        result = []
+        for text_id in self.ordered_ids:
+            t = self.texts[text_id]
+            if not include_inactive and not t.is_active:
+                continue
+            if course_level and t.course_level != course_level:
+                continue
+            if language and t.language != language:
+                continue
+            result.append(t)
+        return result
+
+
+_lock = threading.Lock()
+_snapshot: Optional[CatalogSnapshot] = None
+_last_check = 0.0
+
+
+def _read_generation(db: Session) -> int:
+    generation = db.query(models.CatalogVersion.generation).filter(models.CatalogVersion.id == 1).scalar()
+    return generation or 0
+
+
+def _build(db: Session, generation: int) -> CatalogSnapshot:
+    texts = {}
+    for t in db.query(models.Text).order_by(models.Text.id.asc()).all():
+        texts[t.id] = CachedText(
+            id=t.id,
+            title=t.title,
+            filename=t.filename,
+            course_level=t.course_level,
+            content_path=t.content_path,
+            audio_path=t.audio_path,
+            language=t.language,
+            is_active=bool(t.is_active),
+        )
+    ordered_ids = tuple(texts.keys())
+    active_ids = [i for i in ordered_ids if texts[i].is_active]
+    return CatalogSnapshot(
+        generation=generation,
+        texts=texts,
+        ordered_ids=ordered_ids,
+        first_id=ordered_ids[0] if ordered_ids else None,
+        first_active_id=active_ids[0] if active_ids else None,
+    )
+
+
+def get_snapshot(db: Session) -> CatalogSnapshot:
+    """
+    Returns the current catalog. Rebuilt only when the DB generation changed.
+    """
+    global _snapshot, _last_check
+
+    snapshot = _snapshot
+    now = time.monotonic()
+    if snapshot is not None and now - _last_check < CHECK_INTERVAL_SECONDS:
+        return snapshot
+
+    with _lock:
+        generation = _read_generation(db)
+        _last_check = time.monotonic()
+        if _snapshot is None or _snapshot.generation != generation:
+            _snapshot = _build(db, generation)
+        return _snapshot
+
+
+async def get_snapshot_async(db: "AsyncSession") -> CatalogSnapshot:
+    """
+    get_snapshot() for the async engine. No lock here: holding a thread lock across
+    an await would block the event loop; two concurrent rebuilds are harmless.
+    """
+    global _snapshot, _last_check
+
+    snapshot = _snapshot
+    if snapshot is not None and time.monotonic() - _last_check < CHECK_INTERVAL_SECONDS:
+        return snapshot
+
+    result = await db.execute(select(models.CatalogVersion.generation).where(models.CatalogVersion.id == 1))
+    generation = result.scalar() or 0
+    _last_check = time.monotonic()
+    if snapshot is None or snapshot.generation != generation:
+        snapshot = await db.run_sync(_build, generation)
+        _snapshot = snapshot
+    return snapshot
+
+
+def invalidate():
+    """
+    Drops this worker's snapshot (next request rebuilds it).
+    """
+    global _snapshot
+    with _lock:
+        _snapshot = None
+
+
+def bump_generation(db: Session) -> int:
+    """
+    Call after committing a change to texts. Other workers will rebuild
+    their snapshot on their next check.
+    """
+    updated = db.query(models.CatalogVersion).filter(models.CatalogVersion.id == 1).update(
+        {
+            models.CatalogVersion.generation: models.CatalogVersion.generation + 1,
+            models.CatalogVersion.updated_at: datetime.utcnow(),
+        },
+        synchronize_session=False
+    )
+    if not updated:
+        db.add(models.CatalogVersion(id=1, generation=1, updated_at=datetime.utcnow()))
+    db.commit()
+    invalidate()
+    return _read_generation(db)
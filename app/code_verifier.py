@@ -0,0 +1,31 @@
+import os
+from . import security_utils
+from .bounded_pool import BoundedPool, PoolBusy
+
+# Dedicated executor for bcrypt checks on /auth/login-code.
+# A classroom logging in at 9:00 means hundreds of ~250 ms bcrypt verifies at once.
+# Running them in FastAPI's shared threadpool lets them take every thread and stall
+# unrelated routes. Here they get their own bounded pool, and requests beyond
+# CODE_VERIFY_MAX_PENDING are turned away (503 + Retry-After) instead of queueing forever.
+#
+# bcrypt releases the GIL, so threads already run in parallel; CODE_VERIFY_EXECUTOR=process
+# is there for deployments that prefer to isolate the CPU work in separate processes.
+
+CODE_VERIFY_WORKERS = int(os.getenv("CODE_VERIFY_WORKERS", str(os.cpu_count() or 1)))
+CODE_VERIFY_MAX_PENDING = int(os.getenv("CODE_VERIFY_MAX_PENDING", str(CODE_VERIFY_WORKERS * 16)))
+CODE_VERIFY_EXECUTOR = os.getenv("CODE_VERIFY_EXECUTOR", "thread")
+RETRY_AFTER_SECONDS = 2
+
+VerifierBusy = PoolBusy
+
+
+class CodeVerifier(BoundedPool):
+    async def verify(self, plain_code: str, hashed_code: str) -> bool:
+        """
+        Checks a login code on the pool without blocking the event loop.
+        Raises VerifierBusy when too many checks are already pending.
+        """
+        return await self.run_async(security_utils.verify_code, plain_code, hashed_code)
+
+
+code_verifier = CodeVerifier("code-verify", CODE_VERIFY_WORKERS, CODE_VERIFY_MAX_PENDING, CODE_VERIFY_EXECUTOR)
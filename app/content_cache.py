@@ -0,0 +1,96 @@
+import os
+import threading
+from collections import OrderedDict
+
+# LRU cache for text file contents (get_text / generate_text_pdf).
+# Entries are validated against the file's mtime and size on every read,
+# so a rewritten file (e.g. upload_text removing the questions) is reloaded.
+
+DEFAULT_MAX_BYTES = int(os.getenv("TEXT_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+
+
+class ContentCache:
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict() # key -> (version, size, content)
+        self._lock = threading.Lock()
+
+    def read(self, path: str) -> str:
+        """
+        Returns the file content (utf-8). Raises like open() if the file is missing.
+        """
+        st = os.stat(path)
+        version = (st.st_mtime_ns, st.st_size)
+        content = self._lookup(path, version)
+        if content is not None:
+            return content
+
+        with open(path, "r", encoding="utf-8") as f:
+            content = f.read()
+        self._store(path, version, content, st.st_size)
+        return content
+
+    def read_immutable(self, key: str, load) -> str:
+        """
+        For content-addressed entries (blob store): the key never changes meaning,
+        so there is nothing to validate. `load()` returns the content on a miss.
+        """
+        content = self._lookup(key, None)
+        if content is not None:
+            return content
+
+        content = load()
+        self._store(key, None, content, len(content.encode("utf-8")))
+        return content
+
+    def _lookup(self, key: str, version):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] == version:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[2]
+            self.misses += 1
+            return None
+
+    def _store(self, key: str, version, content: str, size: int):
+        with self._lock:
+            self._remove(key)
+            if size <= self.max_bytes:
+                self._entries[key] = (version, size, content)
+                self.current_bytes += size
+                while self.current_bytes > self.max_bytes:
+                    oldest = next(iter(self._entries))
+                    self._remove(oldest)
+                    self.evictions += 1
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry:
+            self.current_bytes -= entry[1]
+
+    def invalidate(self, key: str = None):
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+                self.current_bytes = 0
+            else:
+                self._remove(key)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+text_cache = ContentCache()
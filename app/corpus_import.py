@@ -0,0 +1,278 @@
+import hashlib
+import json
+import multiprocessing
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import List
+from sqlalchemy import delete, insert, update
+from sqlalchemy.orm import Session
+from . import models, storage, catalog_cache, question_parser
+
+# Readings collection files (data/texts/PRIMARIA/INGLÉS/textos/readings_Nprimaria_readings_questions.txt):
+# many readings per file, each with an ID like "3P-01", in one of two layouts:
+#
+#   READING 1 (4P-01): Title              3º - Reading 1 (3P-01)
+#   [STORY]                               Title
+#   ...                                   ...
+#   [QUESTIONS]                           Comprehension Questions
+#   1. Question?                          1. Question?
+#      1) Option                          - Option
+#
+# ("READING 1: Title" without an ID gets one from the course in the file header.)
+# The file is split into readings here, the readings are parsed in a process pool, and
+# texts + questions are written CORPUS_IMPORT_BATCH_SIZE readings per transaction.
+# corpus_readings keeps the hash of every imported reading: importing the same file
+# again only rewrites the readings that changed. Readings with a question that has no
+# option marked with * are imported inactive (hidden from students) until the file
+# carries their answer key.
+# The authors' .docx collections (app/docx_ingest.py) use the same reading IDs and carry
+# the answer key: a reading imported from a .docx is never rewritten from a .txt file.
+
+CORPUS_IMPORT_WORKERS = int(os.getenv("CORPUS_IMPORT_WORKERS", str(min(os.cpu_count() or 1, 4))))
+CORPUS_IMPORT_BATCH_SIZE = int(os.getenv("CORPUS_IMPORT_BATCH_SIZE", "25"))
+CORPUS_LANGUAGE = "en"
+AUTHORITATIVE_SOURCE = ".docx" # Wins over the .txt export of the same reading
+
+COURSE_NUMBER = re.compile(r"(\d)º")
+READING_HEADING = re.compile(
+    r"^(?:READING (?P<number>\d+)(?: \((?P<id>\d+P-\d+)\))?: (?P<title>.+?)"
+    r"|\d+º - Reading (?P<number2>\d+) \((?P<id2>\d+P-\d+)\))[ \t]*$",
+    re.MULTILINE,
+)
+# Decoration between and inside readings
+RULE_LINE = re.compile(r"^(?:={10,}|-{10,}|\[STORY\])[ \t]*$", re.MULTILINE)
+
+
+@dataclass(frozen=True)
+class RawReading:
+    reading_id: str
+    course_level: str
+    title: str # Empty when the title is the first line of the body
+    body: str
+    line: int # Line of the heading in the file
+    source: str
+    language: str = CORPUS_LANGUAGE
+
+
+@dataclass
+class ParsedReading:
+    reading_id: str
+    course_level: str
+    title: str
+    content: str
+    questions: question_parser.ParseResult
+    diagnostics: List[str]
+    sha256: str
+    source: str
+    language: str
+    is_active: bool # False while some question has no marked answer
+
+
+@dataclass
+class ImportReport:
+    readings: int = 0
+    created: List[str] = field(default_factory=list)
+    updated: List[str] = field(default_factory=list)
+    unchanged: List[str] = field(default_factory=list)
+    skipped: List[str] = field(default_factory=list)
+    inactive: List[str] = field(default_factory=list) # Written without a complete answer key
+    diagnostics: List[str] = field(default_factory=list)
+
+
+def split_collection(content: str, source: str) -> List[RawReading]:
+    """
+    The readings of a collection file, in file order.
+    """
+    course = COURSE_NUMBER.search(content)
+    course_level = f"{course.group(1)}P" if course else "ALL"
+    headings = list(READING_HEADING.finditer(content))
+    readings = []
+    for i, m in enumerate(headings):
+        end = headings[i + 1].start() if i + 1 < len(headings) else len(content)
+        number = int(m.group("number") or m.group("number2"))
+        reading_id = m.group("id") or m.group("id2") or f"{course_level}-{number:02d}"
+        readings.append(RawReading(
+            reading_id=reading_id,
+            course_level=reading_id.split("-")[0],
+            title=(m.group("title") or "").strip(),
+            body=content[m.end():end],
+            line=content.count("\n", 0, m.start()) + 1,
+            source=source,
+        ))
+    return readings
+
+
+def parse_reading(raw: RawReading) -> ParsedReading:
+    # Module level so it can be pickled for the process pool
+    body = RULE_LINE.sub("", raw.body) # Keeps the newlines, so line numbers still match
+    main_text, questions_text, questions_line = question_parser.split_questions(body)
+    title = raw.title
+    if not title:
+        title, _, main_text = main_text.partition("\n")
+        title, main_text = title.strip(), main_text.strip()
+
+    diagnostics = []
+    if questions_text is None:
+        parsed = question_parser.ParseResult()
+        diagnostics.append(f"{raw.source}: {raw.reading_id}: no questions found")
+    else:
+        parsed = question_parser.parse(questions_text, raw.line + questions_line - 1)
+        diagnostics.extend(f"{raw.source}: {raw.reading_id}: {d}" for d in parsed.diagnostics)
+    is_active = parsed.answer_key_complete
+    if not is_active:
+        diagnostics.append(f"{raw.source}: {raw.reading_id}: incomplete answer key, imported as inactive")
+
+    fingerprint = json.dumps([
+        raw.course_level, raw.language, title, main_text,
+        [(q.question_content, q.options, q.correct_answer, q.marked) for q in parsed.questions],
+    ], ensure_ascii=False)
+    return ParsedReading(
+        reading_id=raw.reading_id,
+        course_level=raw.course_level,
+        title=title,
+        content=main_text,
+        questions=parsed,
+        diagnostics=diagnostics,
+        sha256=hashlib.sha256(fingerprint.encode("utf-8")).hexdigest(),
+        source=raw.source,
+        language=raw.language,
+        is_active=is_active,
+    )
+
+
+def parse_readings(raws: List[RawReading], workers: int = CORPUS_IMPORT_WORKERS) -> List[ParsedReading]:
+    """
+    parse_reading() over every reading, in order, on `workers` processes.
+    """
+    if workers <= 1 or len(raws) < 2:
+        return [parse_reading(raw) for raw in raws]
+    # "spawn": the server process has threads, forking it is unsafe
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        return list(pool.map(parse_reading, raws, chunksize=max(1, len(raws) // (workers * 4))))
+
+
+def _filename(reading: ParsedReading) -> str:
+    return f"corpus_{reading.reading_id}.txt"
+
+
+def _write_batch(db: Session, new: List[ParsedReading], changed: List[tuple]):
+    # Bodies are staged (temp files, or blobs in this transaction) and published only
+    # once the rows are committed: a failed batch leaves the live files untouched
+    staged = {}
+    try:
+        for reading in new + [reading for reading, _ in changed]:
+            staged[reading.reading_id] = storage.stage_text(db, reading.course_level, _filename(reading), reading.content)
+        _write_rows(db, new, changed, {reading_id: s.content_path for reading_id, s in staged.items()})
+    except BaseException:
+        db.rollback()
+        for s in staged.values():
+            s.discard()
+        raise
+    for s in staged.values():
+        s.publish()
+
+
+def _write_rows(db: Session, new: List[ParsedReading], changed: List[tuple], paths: dict):
+    now = datetime.utcnow()
+
+    text_ids = []
+    if new:
+        text_ids = db.execute(
+            insert(models.Text).returning(models.Text.id, sort_by_parameter_order=True),
+            [
+                {"title": r.title, "filename": _filename(r), "course_level": r.course_level,
+                 "language": r.language, "content_path": paths[r.reading_id], "audio_path": None,
+                 "is_active": r.is_active}
+                for r in new
+            ]
+        ).scalars().all()
+        db.execute(insert(models.CorpusReading), [
+            {"reading_id": r.reading_id, "text_id": text_id, "sha256": r.sha256, "source": r.source, "imported_at": now}
+            for r, text_id in zip(new, text_ids)
+        ])
+
+    if changed:
+        db.execute(update(models.Text), [
+            {"id": row.text_id, "title": r.title, "course_level": r.course_level, "language": r.language,
+             "content_path": paths[r.reading_id], "is_active": r.is_active}
+            for r, row in changed
+        ])
+        db.execute(delete(models.Question).where(models.Question.text_id.in_([row.text_id for _, row in changed])))
+        db.execute(update(models.CorpusReading), [
+            {"reading_id": r.reading_id, "sha256": r.sha256, "source": r.source, "imported_at": now}
+            for r, _ in changed
+        ])
+
+    questions = []
+    for r, text_id in list(zip(new, text_ids)) + [(r, row.text_id) for r, row in changed]:
+        questions.extend(r.questions.rows(text_id))
+    if questions:
+        db.execute(insert(models.Question), questions)
+    db.commit()
+
+
+def import_readings(db: Session, readings: List[ParsedReading], dry_run: bool = False) -> ImportReport:
+    """
+    Creates the readings not imported yet and rewrites the ones whose content changed
+    (same Text row, questions replaced). Readings with the same hash are left alone.
+    """
+    report = ImportReport(readings=len(readings))
+    seen = set()
+    unique = []
+    for reading in readings:
+        if reading.reading_id in seen:
+            report.skipped.append(f"{reading.reading_id}: duplicate reading ID in {reading.source}")
+            continue
+        seen.add(reading.reading_id)
+        unique.append(reading)
+
+    existing = {
+        row.reading_id: row
+        for row in db.query(models.CorpusReading).filter(models.CorpusReading.reading_id.in_(seen))
+    }
+    new, changed = [], []
+    kept = set() # Owned by a .docx: their diagnostics don't matter
+    for reading in unique:
+        row = existing.get(reading.reading_id)
+        if row is None:
+            if storage.exists(db, reading.course_level, _filename(reading)):
+                report.skipped.append(f"{reading.reading_id}: {_filename(reading)} already exists and was not imported from a collection")
+                continue
+            new.append(reading)
+            report.created.append(reading.reading_id)
+        elif row.source.endswith(AUTHORITATIVE_SOURCE) and not reading.source.endswith(AUTHORITATIVE_SOURCE):
+            report.skipped.append(f"{reading.reading_id}: imported from {row.source}, not overwritten from {reading.source}")
+            kept.add(reading.reading_id)
+            continue
+        elif row.sha256 != reading.sha256:
+            changed.append((reading, row))
+            report.updated.append(reading.reading_id)
+        else:
+            report.unchanged.append(reading.reading_id)
+            continue
+        if not reading.is_active:
+            report.inactive.append(reading.reading_id)
+    for reading in readings:
+        if reading.reading_id not in kept:
+            report.diagnostics.extend(reading.diagnostics)
+
+    if dry_run or not (new or changed):
+        db.rollback()
+        return report
+
+    size = max(CORPUS_IMPORT_BATCH_SIZE, 1)
+    for start in range(0, max(len(new), len(changed)), size):
+        _write_batch(db, new[start:start + size], changed[start:start + size])
+    catalog_cache.bump_generation(db)
+    return report
+
+
+def import_collection(db: Session, content: str, source: str, dry_run: bool = False,
+                      workers: int = CORPUS_IMPORT_WORKERS) -> ImportReport:
+    """
+    Splits, parses and imports one collection file.
+    """
+    return import_readings(db, parse_readings(split_collection(content, source), workers), dry_run)
@@ -26,3 +26,42 @@ def get_db():
         yield db
     finally:
         db.close()
+
+# --- Optional async mode ---
+# DATABASE_ASYNC=1 adds an async engine (needs greenlet plus aiosqlite or asyncpg installed)
+# and the routers register async versions of their hot endpoints.
+ASYNC_DB_ENABLED = os.getenv("DATABASE_ASYNC", "0").lower() in ("1", "true", "yes")
+
+def async_database_url(url: str) -> str:
+    if url.startswith("sqlite://"):
+        return url.replace("sqlite://", "sqlite+aiosqlite://", 1)
+    if url.startswith("postgresql://"):
+        return url.replace("postgresql://", "postgresql+asyncpg://", 1)
+    return url
+
+async_engine = None
+AsyncSessionLocal = None
+
+if ASYNC_DB_ENABLED:
+    from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+    try:
+        import greenlet # noqa: F401 (required by sqlalchemy.ext.asyncio)
+        async_engine = create_async_engine(async_database_url(SQLALCHEMY_DATABASE_URL))
+    except ImportError as e:
+        raise RuntimeError(
+            f"DATABASE_ASYNC=1 needs greenlet and the async driver (aiosqlite or asyncpg): {e}. "
+            "Install them with: pip install -r requirements.txt"
+        ) from e
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+def create_missing_indexes():
+    # create_all() only builds indexes together with new tables.
+    # Indexes added later to existing tables (e.g. production DB) are created here.
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
@@ -0,0 +1,293 @@
+import hashlib
+import io
+import json
+import multiprocessing
+import os
+import re
+import tempfile
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field, replace
+from typing import List, Optional, Tuple
+from xml.etree import ElementTree
+from .corpus_import import RawReading
+
+# Word files from the authors (.docx) turned into readings for app/corpus_import.py, so they
+# go through the same question parser and batched, idempotent import as the .txt collections.
+# A .docx is a zip with the text in word/document.xml: no extra dependency to read it.
+#
+#   collection      "Comprehension Questions" after every story (the *_READINGSrev.docx files).
+#                   Reading titles and questions are Word list items, the correct option is
+#                   highlighted. Reading IDs follow the .txt collections ("3P-01", ...): a
+#                   reading imported from a .docx is not overwritten by import_corpus.py.
+#                   The title is the list item's first line, up to a change of formatting
+#                   or a second sentence (authors append a subtitle or a new title there).
+#   questions only  starts with "PREGUNTAS": question, "A. ..." options, "Sol. B".
+#                   Attached to a single text (see extract_all).
+#   single text     anything else: first paragraph = title, the rest = text.
+#
+# Extraction runs in a process pool. Results are cached on disk by the SHA-256 of the
+# file, so documents that did not change are not opened again.
+
+DOCX_INGEST_WORKERS = int(os.getenv("DOCX_INGEST_WORKERS", str(min(os.cpu_count() or 1, 4))))
+DOCX_CACHE_DIR = os.getenv("DOCX_CACHE_DIR", os.path.join(tempfile.gettempdir(), "aula_cl_docx_cache"))
+EXTRACTOR_VERSION = 2 # Part of the cache key: bump when the extraction output changes
+
+W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+QUESTIONS_MARKER = "comprehension questions"
+QUESTIONS_ONLY_MARKER = "preguntas"
+COURSE_NUMBER = re.compile(r"(\d)º")
+TYPED_NUMBER = re.compile(r"\d+\.\s*") # "2. Where is..." typed instead of a Word list
+LETTER_OPTION = re.compile(r"([A-Z])[.)]\s*(.*)")
+SOLUTION = re.compile(r"Sol(?:ución)?\.?\s*([A-Z])\b", re.IGNORECASE)
+SECOND_SENTENCE = re.compile(r"(?<=[?!])\s+(?=\S)") # "What can Luna do? Luna’s Day"
+# Run properties that show: a title and its subtitle differ in one of these
+VISIBLE_FORMAT = ("b", "i", "u", "strike", "dstrike", "sz", "color", "highlight", "caps", "smallCaps", "vertAlign")
+
+
+@dataclass(frozen=True)
+class Paragraph:
+    text: str
+    numbered: bool # Word list item (the number is not part of the text)
+    highlighted: bool # Some of its text is highlighted
+    runs: Tuple[Tuple[str, tuple], ...] = () # (text, visible format), line breaks as "\n"
+
+
+@dataclass
+class DocxExtraction:
+    source: str
+    sha256: str
+    kind: str = "" # "collection", "questions", "text"
+    readings: List[RawReading] = field(default_factory=list)
+    questions: Optional[str] = None # Questions-only documents
+    cached: bool = False
+
+
+def read_paragraphs(data: bytes) -> List[Paragraph]:
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        root = ElementTree.fromstring(archive.read("word/document.xml"))
+    paragraphs = []
+    for p in root.iter(f"{W}p"):
+        runs = []
+        highlighted = False
+        for run in p.iter(f"{W}r"):
+            text = "".join(
+                node.text or "" if node.tag == f"{W}t" else " " if node.tag == f"{W}tab" else "\n"
+                for node in run if node.tag in (f"{W}t", f"{W}tab", f"{W}br", f"{W}cr")
+            )
+            props = run.find(f"{W}rPr")
+            style = tuple(
+                (tag, node.get(f"{W}val"))
+                for tag in VISIBLE_FORMAT
+                for node in ([] if props is None else props.findall(f"{W}{tag}"))
+            )
+            runs.append((text, style))
+            if dict(style).get("highlight", "none") != "none" and text.strip():
+                highlighted = True
+        text = "".join(text for text, _ in runs).replace("\n", " ").strip()
+        paragraphs.append(Paragraph(text, p.find(f"{W}pPr/{W}numPr") is not None, highlighted, tuple(runs)))
+    return paragraphs
+
+
+def _questions_lines(paragraphs: List[Paragraph]) -> List[str]:
+    # Blocks separated by empty paragraphs: the question (a list item or not), then its options.
+    # One line per paragraph, so line numbers in diagnostics are paragraph numbers.
+    lines = []
+    number = 0
+    block_start = True
+    for i, p in enumerate(paragraphs):
+        if not p.text:
+            lines.append("")
+            block_start = True
+        elif block_start:
+            block_start = False
+            has_options = i + 1 < len(paragraphs) and paragraphs[i + 1].text
+            if has_options:
+                number += 1
+                lines.append(f"{number}. {TYPED_NUMBER.sub('', p.text, count=1)}")
+            else:
+                lines.append(p.text) # A note, not a question: reported and skipped by the parser
+        else:
+            lines.append(f"- {p.text}{' *' if p.highlighted else ''}")
+    return lines
+
+
+def _title(paragraph: Paragraph) -> str:
+    # "Paul’s Birthday Party A birthday party" (struck title + added subtitle) -> "Paul’s Birthday Party"
+    parts = []
+    style = None
+    for text, run_style in paragraph.runs:
+        if not parts and not text.strip(". "):
+            continue # Leading ". " left from a typed number
+        if style is None:
+            style = run_style
+        elif run_style != style and text.strip():
+            break
+        line, br, _ = text.partition("\n")
+        parts.append(line)
+        if br:
+            break
+    title = "".join(parts) if parts else paragraph.text
+    title = title.lstrip(". ")
+    return SECOND_SENTENCE.split(title, maxsplit=1)[0].strip()
+
+
+def _collection(paragraphs: List[Paragraph], source: str) -> List[RawReading]:
+    course = next((m for m in map(COURSE_NUMBER.search, (p.text for p in paragraphs)) if m), None)
+    course_level = f"{course.group(1)}P" if course else "ALL"
+
+    # A list item is a reading title when the next list item / marker is "Comprehension Questions"
+    events = [
+        i for i, p in enumerate(paragraphs)
+        if p.text and (p.numbered or p.text.lower() == QUESTIONS_MARKER)
+    ]
+    titles = [
+        i for i, nxt in zip(events, events[1:] + [None])
+        if paragraphs[i].numbered and nxt is not None and paragraphs[nxt].text.lower() == QUESTIONS_MARKER
+    ]
+
+    readings = []
+    for number, (start, end) in enumerate(zip(titles, titles[1:] + [len(paragraphs)]), start=1):
+        marker = next(i for i in range(start + 1, end) if paragraphs[i].text.lower() == QUESTIONS_MARKER)
+        lines = [p.text for p in paragraphs[start + 1:marker + 1]] + _questions_lines(paragraphs[marker + 1:end])
+        readings.append(RawReading(
+            reading_id=f"{course_level}-{number:02d}",
+            course_level=course_level,
+            title=_title(paragraphs[start]),
+            body="\n" + "\n".join(lines),
+            line=start + 1,
+            source=source,
+        ))
+    return readings
+
+
+def _questions_only(paragraphs: List[Paragraph]) -> str:
+    # Rewritten in the upload format: "1. Question", "a) Option", "*" on the solution
+    lines = []
+    number = 0
+    options = {} # letter -> line index, current question
+    for p in paragraphs:
+        option = LETTER_OPTION.match(p.text)
+        solution = SOLUTION.match(p.text)
+        if not p.text or p.text.lower() == QUESTIONS_ONLY_MARKER:
+            lines.append("")
+        elif solution:
+            index = options.get(solution.group(1).upper())
+            if index is not None:
+                lines[index] += " *"
+            lines.append("")
+        elif option:
+            options[option.group(1)] = len(lines)
+            lines.append(f"{option.group(1).lower()}) {option.group(2)}{' *' if p.highlighted else ''}")
+        else:
+            number += 1
+            options = {}
+            lines.append(f"{number}. {p.text}")
+    return "\n".join(lines)
+
+
+def _slug(name: str) -> str:
+    return re.sub(r"[-\s]+", "_", re.sub(r"[^\w\s-]", "", name).strip().lower())
+
+
+def extract(data: bytes, source: str, course_level: str = "ALL", language: str = "es") -> DocxExtraction:
+    """
+    Readings (or a questions block) of one .docx. `course_level` and `language` apply
+    to single texts: collections take the course from their header and are in English.
+    """
+    # Module level so it can be pickled for the process pool
+    paragraphs = read_paragraphs(data)
+    result = DocxExtraction(source=source, sha256=hashlib.sha256(data).hexdigest())
+    first = next((p.text for p in paragraphs if p.text), "")
+    if any(p.text.lower() == QUESTIONS_MARKER for p in paragraphs):
+        result.kind = "collection"
+        result.readings = _collection(paragraphs, source)
+    elif first.lower() == QUESTIONS_ONLY_MARKER:
+        result.kind = "questions"
+        result.questions = _questions_only(paragraphs)
+    elif first:
+        result.kind = "text"
+        start = next(i for i, p in enumerate(paragraphs) if p.text)
+        result.readings = [RawReading(
+            reading_id=_slug(os.path.splitext(source)[0]),
+            course_level=course_level,
+            title=first,
+            body="\n" + "\n".join(p.text for p in paragraphs[start + 1:]),
+            line=start + 1,
+            source=source,
+            language=language,
+        )]
+    return result
+
+
+class ExtractionCache:
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def _path(self, sha256: str, options: tuple) -> str:
+        # options: (file name, course_level, language), the other inputs of extract()
+        key = hashlib.sha256(json.dumps([EXTRACTOR_VERSION, sha256, *options]).encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, sha256: str, options: tuple) -> Optional[DocxExtraction]:
+        try:
+            with open(self._path(sha256, options), encoding="utf-8") as f:
+                entry = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+        entry["readings"] = [RawReading(**r) for r in entry["readings"]]
+        return DocxExtraction(**entry, cached=True)
+
+    def put(self, extraction: DocxExtraction, options: tuple):
+        # Temp file + rename, safe with concurrent imports
+        os.makedirs(self.directory, exist_ok=True)
+        entry = asdict(extraction)
+        del entry["cached"]
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(tmp_path, self._path(extraction.sha256, options))
+
+
+extraction_cache = ExtractionCache(DOCX_CACHE_DIR)
+
+
+def extract_all(paths: List[str], course_level: str = "ALL", language: str = "es",
+                questions_path: Optional[str] = None, workers: int = DOCX_INGEST_WORKERS) -> List[DocxExtraction]:
+    """
+    extract() over every file, in order: cached results first, the rest in the pool.
+    A questions-only document (`questions_path`) is appended to the single text among `paths`.
+    """
+    all_paths = list(paths) + ([questions_path] if questions_path else [])
+    results: List[Optional[DocxExtraction]] = []
+    missing = []
+    for i, path in enumerate(all_paths):
+        with open(path, "rb") as f:
+            data = f.read()
+        options = (os.path.basename(path), course_level, language)
+        cached = extraction_cache.get(hashlib.sha256(data).hexdigest(), options)
+        results.append(cached)
+        if cached is None:
+            missing.append((i, data, options))
+
+    if missing:
+        args = [(data, *options) for _, data, options in missing]
+        if workers <= 1 or len(missing) < 2:
+            extracted = [extract(*a) for a in args]
+        else:
+            # "spawn": the server process has threads, forking it is unsafe
+            with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+                extracted = list(pool.map(extract, *zip(*args)))
+        for (i, _, options), extraction in zip(missing, extracted):
+            extraction_cache.put(extraction, options)
+            results[i] = extraction
+
+    if questions_path:
+        questions = results[-1]
+        texts = [e for e in results[:-1] if e.kind == "text"]
+        if questions.kind != "questions" or len(texts) != 1:
+            raise ValueError(f"{questions.source} must be a questions document, given with exactly one single text")
+        # Same layout as an upload: text, separator, questions
+        reading = texts[0].readings[0]
+        texts[0].readings = [replace(reading, body=f"{reading.body}\n--- Preguntas ---\n{questions.questions}")]
+    return results
@@ -0,0 +1,99 @@
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional, TYPE_CHECKING
+from sqlalchemy.orm import Session
+from . import models, catalog_cache
+
+if TYPE_CHECKING: # sqlalchemy.ext.asyncio needs greenlet, only required with DATABASE_ASYNC=1
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+# Who can read what.
+# - Premium: access_expires_at in the future, or the "admin" user.
+# - Everyone else: only the free text (lowest id among active texts).
+# Works for both User and SubUser.
+
+MAX_CACHED_PRINCIPALS = 10000
+
+
+@dataclass(frozen=True)
+class Entitlement:
+    principal: str # "user:<id>" or "subuser:<id>"
+    is_admin: bool
+    is_premium: bool
+    expires_at: Optional[datetime]
+    free_text_id: Optional[int]
+
+    def can_read(self, text_id: int) -> bool:
+        return self.is_premium or text_id == self.free_text_id
+
+    def is_locked(self, text_id: int) -> bool:
+        return not self.can_read(text_id)
+
+
+def principal_key(principal) -> str:
+    # Accepts ORM objects and identity_cache.Principal snapshots
+    kind = getattr(principal, "kind", None) or ("subuser" if isinstance(principal, models.SubUser) else "user")
+    return f"{kind}:{principal.id}"
+
+
+# principal -> (access_expires_at, is_admin, is_premium, valid_until)
+_decisions = OrderedDict()
+_lock = threading.Lock()
+
+
+def _decide(principal, now: datetime):
+    is_admin = getattr(principal, "username", None) == "admin"
+    expires_at = principal.access_expires_at
+    is_premium = is_admin or bool(expires_at and expires_at > now)
+    # A premium decision holds until the expiry date; a free one until
+    # access_expires_at changes (which changes the cache key below).
+    valid_until = expires_at if (is_premium and not is_admin) else None
+    return is_admin, is_premium, valid_until
+
+
+def _resolve(principal, snapshot) -> Entitlement:
+    key = principal_key(principal)
+    expires_at = principal.access_expires_at
+    now = datetime.utcnow()
+
+    with _lock:
+        cached = _decisions.get(key)
+        if cached and cached[0] == expires_at and (cached[3] is None or now < cached[3]):
+            _decisions.move_to_end(key)
+            is_admin, is_premium = cached[1], cached[2]
+        else:
+            is_admin, is_premium, valid_until = _decide(principal, now)
+            _decisions[key] = (expires_at, is_admin, is_premium, valid_until)
+            _decisions.move_to_end(key)
+            while len(_decisions) > MAX_CACHED_PRINCIPALS:
+                _decisions.popitem(last=False)
+
+    return Entitlement(
+        principal=key,
+        is_admin=is_admin,
+        is_premium=is_premium,
+        expires_at=expires_at,
+        free_text_id=snapshot.first_active_id,
+    )
+
+
+def resolve(db: Session, principal) -> Entitlement:
+    # Free text id comes from the catalog snapshot (cached until the catalog changes)
+    return _resolve(principal, catalog_cache.get_snapshot(db))
+
+
+async def resolve_async(db: "AsyncSession", principal) -> Entitlement:
+    return _resolve(principal, await catalog_cache.get_snapshot_async(db))
+
+
+def invalidate(principal=None):
+    """
+    Forget cached decisions (one principal, or all).
+    """
+    with _lock:
+        if principal is None:
+            _decisions.clear()
+        else:
+            _decisions.pop(principal if isinstance(principal, str) else principal_key(principal), None)
@@ -0,0 +1,100 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+from . import models
+
+# Short-lived cache: token subject -> who that is.
+# Lets most authenticated requests skip the User / SubUser query.
+# Endpoints that change a principal call invalidate(); other workers
+# pick the change up when the entry expires (IDENTITY_CACHE_TTL_SECONDS).
+
+TTL_SECONDS = float(os.getenv("IDENTITY_CACHE_TTL_SECONDS", "30"))
+MAX_ENTRIES = int(os.getenv("IDENTITY_CACHE_MAX_ENTRIES", "10000"))
+
+
+@dataclass(frozen=True)
+class Principal:
+    id: int
+    kind: str # "user" or "subuser"
+    username: Optional[str] # None for sub-users
+    access_expires_at: Optional[datetime]
+    course_level: Optional[str]
+
+    @classmethod
+    def from_model(cls, obj) -> "Principal":
+        if isinstance(obj, models.SubUser):
+            return cls(id=obj.id, kind="subuser", username=None,
+                       access_expires_at=obj.access_expires_at, course_level=None)
+        return cls(id=obj.id, kind="user", username=obj.username,
+                   access_expires_at=obj.access_expires_at, course_level=obj.course_level)
+
+
+def subject_for(obj) -> str:
+    """
+    Token `sub` of a User / SubUser / Principal ("<username>" or "subuser:<id>").
+    """
+    is_subuser = getattr(obj, "kind", None) == "subuser" or isinstance(obj, models.SubUser)
+    return f"subuser:{obj.id}" if is_subuser else obj.username
+
+
+class IdentityCache:
+    def __init__(self, ttl_seconds: float = TTL_SECONDS, max_entries: int = MAX_ENTRIES):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict() # subject -> (expires_at_monotonic, Principal)
+        self._lock = threading.Lock()
+
+    def get(self, subject: str) -> Optional[Principal]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(subject)
+            if entry and entry[0] > now:
+                self._entries.move_to_end(subject)
+                self.hits += 1
+                return entry[1]
+            if entry:
+                del self._entries[subject]
+            self.misses += 1
+            return None
+
+    def put(self, subject: str, principal: Principal):
+        if self.ttl_seconds <= 0:
+            return
+        with self._lock:
+            self._entries[subject] = (time.monotonic() + self.ttl_seconds, principal)
+            self._entries.move_to_end(subject)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, subject: str = None):
+        with self._lock:
+            if subject is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(subject, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+identity_cache = IdentityCache()
+
+
+def invalidate(obj):
+    """
+    Call after changing a User / SubUser (access, password, deletion).
+    Accepts the object or its token subject.
+    """
+    identity_cache.invalidate(obj if isinstance(obj, str) else subject_for(obj))
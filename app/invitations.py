@@ -0,0 +1,117 @@
+import csv
+import io
+import secrets
+import string
+from datetime import datetime
+from typing import Iterator, List, Optional, Tuple
+from sqlalchemy import and_, insert, or_
+from sqlalchemy.orm import Session, joinedload
+from . import models
+
+# Invitation codes (admin panel): bulk generation, keyset-paginated listing and CSV export.
+# Listing order is newest first: (created_at DESC, code DESC), cursor "<created_at iso>|<code>".
+
+CODE_ALPHABET = string.ascii_uppercase + string.digits
+CODE_LENGTH = 8
+MAX_GENERATE = 10000
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+EXPORT_BATCH_SIZE = 1000
+
+
+def _random_code() -> str:
+    return ''.join(secrets.choice(CODE_ALPHABET) for _ in range(CODE_LENGTH))
+
+
+def generate(db: Session, count: int) -> List[str]:
+    """
+    Creates `count` unused codes: one collision query per round, one INSERT. Commits.
+    """
+    codes = set()
+    while len(codes) < count:
+        candidates = {_random_code() for _ in range(count - len(codes))} - codes
+        taken = {
+            code for (code,) in db.query(models.InvitationCode.code).filter(
+                models.InvitationCode.code.in_(list(candidates))
+            )
+        }
+        codes |= candidates - taken
+
+    now = datetime.utcnow()
+    codes = sorted(codes)
+    db.execute(insert(models.InvitationCode), [{"code": code, "is_used": False, "created_at": now} for code in codes])
+    db.commit()
+    return codes
+
+
+def encode_cursor(code: models.InvitationCode) -> str:
+    return f"{code.created_at.isoformat()}|{code.code}"
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    created_at, code = cursor.split("|", 1)
+    return datetime.fromisoformat(created_at), code
+
+
+def query_codes(
+    db: Session,
+    is_used: Optional[bool] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    after: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+) -> List[models.InvitationCode]:
+    """
+    One page of codes with their user loaded in the same query (no N+1).
+    `after` is the cursor of the last code of the previous page.
+    """
+    Code = models.InvitationCode
+    query = db.query(Code).options(joinedload(Code.user))
+    if is_used is not None:
+        query = query.filter(Code.is_used == is_used)
+    if created_from is not None:
+        query = query.filter(Code.created_at >= created_from)
+    if created_to is not None:
+        query = query.filter(Code.created_at < created_to)
+    if after:
+        created_at, code = decode_cursor(after)
+        query = query.filter(or_(
+            Code.created_at < created_at,
+            and_(Code.created_at == created_at, Code.code < code)
+        ))
+    return query.order_by(Code.created_at.desc(), Code.code.desc()).limit(limit).all()
+
+
+def code_row(c: models.InvitationCode) -> dict:
+    return {
+        "code": c.code,
+        "is_used": c.is_used,
+        "used_at": c.used_at,
+        "created_at": c.created_at,
+        "used_by": c.user.username if c.user else None,
+        "user_email": c.user.email if c.user else None,
+        "expires_at": c.user.access_expires_at if c.user else None
+    }
+
+
+def export_csv(db: Session, **filters) -> Iterator[str]:
+    """
+    Every code matching the filters as CSV, walking the keyset one batch at a time.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    columns = ["code", "is_used", "created_at", "used_at", "used_by", "user_email", "expires_at"]
+    writer.writerow(columns)
+    after = None
+    while True:
+        page = query_codes(db, after=after, limit=EXPORT_BATCH_SIZE, **filters)
+        for c in page:
+            row = code_row(c)
+            writer.writerow(["" if row[k] is None else row[k].isoformat() if isinstance(row[k], datetime) else row[k] for k in columns])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        if len(page) < EXPORT_BATCH_SIZE:
+            break
+        after = encode_cursor(page[-1])
+        db.expunge_all() # Keep the identity map from growing with the export
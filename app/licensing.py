@@ -0,0 +1,59 @@
+import csv
+import io
+from datetime import datetime
+from typing import Iterator, List
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+from . import models, security_utils
+
+# Bulk minting of License rows (admin endpoint POST /auth/admin/licenses and mint_licenses.py).
+# Keys are generated per batch, checked against the table with one IN query,
+# inserted with one executemany and committed before they are handed out, so a
+# key that reaches the CSV always exists. At most one batch lives in memory.
+
+MINT_BATCH_SIZE = 1000
+MAX_MINT = 100000
+
+
+def _fresh_keys(db: Session, count: int) -> List[str]:
+    keys = set()
+    while len(keys) < count:
+        candidates = {security_utils.generate_license_key() for _ in range(count - len(keys))} - keys
+        taken = {
+            key for (key,) in db.query(models.License.key).filter(models.License.key.in_(list(candidates)))
+        }
+        keys |= candidates - taken
+    return list(keys)
+
+
+def mint(db: Session, count: int, duration_days: int = 365, batch_size: int = MINT_BATCH_SIZE) -> Iterator[List[str]]:
+    """
+    Creates `count` ACTIVE licenses. Yields the keys of each batch once it is committed.
+    """
+    remaining = count
+    while remaining > 0:
+        keys = _fresh_keys(db, min(batch_size, remaining))
+        now = datetime.utcnow()
+        db.execute(insert(models.License), [
+            {"key": key, "status": "ACTIVE", "duration_days": duration_days, "created_at": now}
+            for key in keys
+        ])
+        db.commit()
+        remaining -= len(keys)
+        yield keys
+
+
+def mint_csv(db: Session, count: int, duration_days: int = 365) -> Iterator[str]:
+    """
+    Same as mint(), as CSV text chunks (one per batch): key,duration_days.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(["key", "duration_days"])
+    for keys in mint(db, count, duration_days):
+        writer.writerows([key, duration_days] for key in keys)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
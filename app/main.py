@@ -1,23 +1,41 @@
 from fastapi import FastAPI
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-from .database import engine, Base
-from .database import engine, Base
+from .database import engine, Base, create_missing_indexes, ASYNC_DB_ENABLED
 from .routers import auth, reading, subusers
 from . import schemas # Import schemas
+from . import attempt_retention
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import Request, Depends
 from fastapi.responses import HTMLResponse, RedirectResponse
 
 # Create Database Tables
 Base.metadata.create_all(bind=engine)
+create_missing_indexes()
 
-app = FastAPI(title="Aula CL")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Daily roll-up of login_attempts (see app/attempt_retention.py)
+    task = None
+    if attempt_retention.LOGIN_ATTEMPT_COMPACT_INTERVAL_HOURS > 0:
+        task = asyncio.create_task(attempt_retention.run_periodically())
+    yield
+    if task:
+        task.cancel()
+
+app = FastAPI(title="Aula CL", lifespan=lifespan)
 
 app.mount("/static", StaticFiles(directory="static"), name="static")
 app.mount("/texts", StaticFiles(directory="data/texts"), name="texts_files") # Serve text files
 app.mount("/audio", StaticFiles(directory="static/audio"), name="audio_files") # Serve audio
 
 # Include Routers
+if ASYNC_DB_ENABLED:
+    # Async versions of the hot endpoints, matched before the sync ones
+    app.include_router(auth.async_router)
+    app.include_router(reading.async_router)
+    app.include_router(subusers.async_router)
 app.include_router(auth.router)
 app.include_router(reading.router)
 app.include_router(subusers.router)
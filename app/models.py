@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Float, JSON, Boolean
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Float, JSON, Boolean, Index, LargeBinary, Date, UniqueConstraint
 from sqlalchemy.orm import relationship
 from .database import Base
 from datetime import datetime
@@ -28,6 +28,12 @@ class InvitationCode(Base):
     
     user = relationship("User")
 
+    # Admin listing: newest first, optionally only used / unused (app/invitations.py)
+    __table_args__ = (
+        Index("ix_invitation_codes_created", "created_at", "code"),
+        Index("ix_invitation_codes_used_created", "is_used", "created_at", "code"),
+    )
+
 class Text(Base):
     __tablename__ = "texts"
 
@@ -35,7 +41,7 @@ class Text(Base):
     title = Column(String, index=True)
     filename = Column(String, unique=True)
     course_level = Column(String)
-    content_path = Column(String) # Path to the .txt file
+    content_path = Column(String) # Path to the .txt file, or "blob:<sha256>" (see app/storage.py)
     audio_path = Column(String, nullable=True) # Path to the .mp3 file
     language = Column(String, default="es") # "es", "en", "val", "cat", "gal", "eus", "fr"
     is_active = Column(Boolean, default=True)
@@ -43,6 +49,11 @@ class Text(Base):
     questions = relationship("Question", back_populates="text")
     attempts = relationship("ReadingAttempt", back_populates="text")
 
+    # Catalog filters (dashboard): active texts by course/language, paged by id
+    __table_args__ = (
+        Index("ix_texts_catalog", "is_active", "course_level", "language", "id"),
+    )
+
 class Question(Base):
     __tablename__ = "questions"
 
@@ -67,6 +78,11 @@ class ReadingAttempt(Base):
     user = relationship("User", back_populates="attempts")
     text = relationship("Text", back_populates="attempts")
 
+    # Latest score per text for one user (catalog join)
+    __table_args__ = (
+        Index("ix_reading_attempts_user_text", "user_id", "text_id", "id"),
+    )
+
 
 
 class SubUser(Base):
@@ -110,3 +126,76 @@ class LoginAttempt(Base):
     login_code_index = Column(String, index=True, nullable=True) # Targeted account (if known)
     timestamp = Column(DateTime, default=datetime.utcnow)
     success = Column(Boolean, default=False)
+
+    __table_args__ = (
+        # Failures per code in a time window
+        Index("ix_login_attempts_code_success_ts", "login_code_index", "success", "timestamp"),
+        # Retention job (app/attempt_retention.py) scans and deletes by day
+        Index("ix_login_attempts_timestamp", "timestamp"),
+    )
+
+class LoginAttemptDaily(Base):
+    __tablename__ = "login_attempts_daily"
+
+    # Old login_attempts rows rolled up per day, IP and code (see app/attempt_retention.py)
+    id = Column(Integer, primary_key=True, index=True)
+    day = Column(Date, index=True)
+    ip_address = Column(String, nullable=True)
+    login_code_index = Column(String, nullable=True)
+    successes = Column(Integer, default=0)
+    failures = Column(Integer, default=0)
+
+    __table_args__ = (
+        UniqueConstraint("day", "ip_address", "login_code_index", name="uq_login_attempts_daily"),
+    )
+
+class CatalogVersion(Base):
+    __tablename__ = "catalog_versions"
+
+    # Single row (id=1). Bumped by every admin change to the texts table,
+    # so each worker knows when its in-memory catalog is stale.
+    id = Column(Integer, primary_key=True)
+    generation = Column(Integer, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+class TextBlob(Base):
+    __tablename__ = "text_blobs"
+
+    # Compressed text bodies, deduplicated by content hash
+    sha256 = Column(String, primary_key=True) # Hash of the raw utf-8 bytes
+    codec = Column(String, default="gzip") # "zstd", "gzip"
+    size = Column(Integer) # Uncompressed size in bytes
+    data = Column(LargeBinary)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class CorpusReading(Base):
+    __tablename__ = "corpus_readings"
+
+    # Texts created from the readings collection files (see app/corpus_import.py),
+    # so a re-import only touches the readings whose content changed
+    reading_id = Column(String, primary_key=True) # As in the file: "3P-01"
+    text_id = Column(Integer, ForeignKey("texts.id"))
+    sha256 = Column(String) # Hash of the parsed reading (title, text, questions)
+    source = Column(String) # Collection file name
+    imported_at = Column(DateTime, default=datetime.utcnow)
+
+class RefreshToken(Base):
+    __tablename__ = "refresh_tokens"
+
+    id = Column(Integer, primary_key=True, index=True)
+    token_hash = Column(String, unique=True, index=True) # SHA-256 of the token (never stored raw)
+    subject = Column(String, index=True) # Same as the JWT `sub`: username or "subuser:<id>"
+    family_id = Column(String, index=True) # All rotations of one login share it
+    created_at = Column(DateTime, default=datetime.utcnow)
+    expires_at = Column(DateTime)
+    revoked_at = Column(DateTime, nullable=True)
+    replaced_by_id = Column(Integer, nullable=True) # Set when rotated
+
+class RateLimitHit(Base):
+    __tablename__ = "rate_limit_hits"
+
+    # Failed logins per key ("code:<index>" / "ip:<addr>") and minute,
+    # for RATE_LIMIT_BACKEND=db (see app/rate_limit.py)
+    key = Column(String, primary_key=True)
+    bucket = Column(Integer, primary_key=True) # unix time // 60
+    count = Column(Integer, default=0)
@@ -0,0 +1,51 @@
+import copy
+import io
+import threading
+from pathlib import Path
+
+from fontTools import ttLib
+from fpdf.fonts import SubsetMap, TTFFont
+
+# The "ligada" worksheet font, prepared once per process (see worksheet_pdf.render).
+# pdf.add_font() reads and parses the TTF and builds its width tables on every document.
+# Here that happens on first use. Each document then gets a copy of the parsed font with
+# its own glyph usage and a fresh in-memory TTFont, because fpdf2 subsets that object
+# in place when the PDF is written. Only the glyphs the document uses end up in the
+# PDF, so the font adds ~4 KB to a worksheet instead of the whole 40 KB file.
+
+AULA_FONT_FAMILY = "AulaCNova"
+AULA_FONT_PATH = "static/fonts/AulaCNova.ttf"
+
+
+class PreparedFont:
+    def __init__(self, family: str, path: str):
+        self.family = family
+        self.path = path
+        self.fontkey = family.lower()
+        self._data = None
+        self._prototype = None
+        self._lock = threading.Lock()
+
+    def _load(self, pdf) -> TTFFont:
+        if self._prototype is None:
+            with self._lock:
+                if self._prototype is None:
+                    data = Path(self.path).read_bytes()
+                    self._prototype = TTFFont(pdf, io.BytesIO(data), self.fontkey, "")
+                    self._data = data
+        return self._prototype
+
+    def add_to(self, pdf):
+        """
+        Same as pdf.add_font(family, fname=path), without parsing the file again.
+        """
+        font = copy.copy(self._load(pdf))
+        font.i = len(pdf.fonts) + 1
+        font.ttfont = ttLib.TTFont(io.BytesIO(self._data), recalcTimestamp=False, lazy=True)
+        font.subset = SubsetMap(font)
+        font.missing_glyphs = []
+        font.biggest_size_pt = 0
+        pdf.fonts[self.fontkey] = font
+
+
+aula_font = PreparedFont(AULA_FONT_FAMILY, AULA_FONT_PATH)
@@ -0,0 +1,139 @@
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Tuple
+
+from fpdf.enums import Align, WrapMode, XPos, YPos
+from fpdf.line_break import MultiLineBreak, TextLine
+from fpdf.util import Padding
+
+# Line layout for the worksheet question blocks (see worksheet_pdf.render).
+# A block (question or option) is broken into lines once: the lines give its height for
+# the "does it fit on this page" decision and are then drawn as they are, instead of
+# measuring with multi_cell(split_only=True) and letting multi_cell break the text again.
+#
+# Drawing follows FPDF.multi_cell (justified, no border / padding / markdown), line by line.
+# Line breaks only depend on (text, font, size, width), so they are kept in a per-process
+# LRU shared by every worksheet the process renders: questions are always Arial, so the
+# "imprenta" and "ligada" versions of a text at the same size reuse all of them.
+
+PDF_LAYOUT_CACHE_SIZE = int(os.getenv("PDF_LAYOUT_CACHE_SIZE", "4096"))
+
+
+@dataclass(frozen=True)
+class Line:
+    text: str
+    text_width: float
+    number_of_spaces: int
+    align: Align
+    trailing_nl: bool
+
+
+@dataclass(frozen=True)
+class TextBlock:
+    lines: Tuple[Line, ...]
+    family: str
+    style: str
+    size: float
+    width: float
+    line_height: float
+
+    @property
+    def height(self) -> float:
+        return len(self.lines) * self.line_height
+
+
+class LineBreakCache:
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[tuple, Tuple[Line, ...]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple):
+        with self._lock:
+            lines = self._entries.get(key)
+            if lines is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return lines
+
+    def put(self, key: tuple, lines: Tuple[Line, ...]):
+        with self._lock:
+            self._entries[key] = lines
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._entries), "max_entries": self.max_entries, "hits": self.hits, "misses": self.misses}
+
+
+line_breaks = LineBreakCache(PDF_LAYOUT_CACHE_SIZE)
+
+
+def _break_lines(pdf, text: str, width: float) -> Tuple[Line, ...]:
+    # Same line breaking as multi_cell(width, h, text) with the current font
+    fragments = pdf._preload_font_styles(pdf.normalize_text(text).replace("\r", ""), False)
+    breaker = MultiLineBreak(fragments, width, [pdf.c_margin, pdf.c_margin], align=Align.J, wrapmode=WrapMode.WORD)
+    lines = []
+    text_line = breaker.get_line()
+    while text_line is not None:
+        lines.append(Line(
+            text="".join("".join(frag.characters) for frag in text_line.fragments),
+            text_width=text_line.text_width,
+            number_of_spaces=text_line.number_of_spaces,
+            align=text_line.align,
+            trailing_nl=text_line.trailing_nl,
+        ))
+        text_line = breaker.get_line()
+    if not lines: # multi_cell still prints (and advances) one empty line
+        lines.append(Line("", 0, 0, Align.J, False))
+    return tuple(lines)
+
+
+def shape(pdf, text: str, family: str, style: str, size: float, width: float, line_height: float) -> TextBlock:
+    """
+    Breaks `text` into lines for a `width` wide multi_cell in the given font.
+    Leaves that font selected.
+    """
+    pdf.set_font(family, style, size)
+    key = (text, family, style, size, width)
+    lines = line_breaks.get(key)
+    if lines is None:
+        lines = _break_lines(pdf, text, width)
+        line_breaks.put(key, lines)
+    return TextBlock(lines, family, style, size, width, line_height)
+
+
+def draw(pdf, block: TextBlock):
+    """
+    Prints a shaped block at the current position, like multi_cell(block.width, block.line_height, text).
+    """
+    pdf.set_font(block.family, block.style, block.size)
+    h = block.line_height
+    last = len(block.lines) - 1
+    for i, line in enumerate(block.lines):
+        pdf._perform_page_break_if_need_be(h)
+        fragments = pdf._preload_font_styles(line.text, False)
+        pdf._render_styled_text_line(
+            TextLine(fragments, line.text_width, line.number_of_spaces, line.align, h, block.width, line.trailing_nl),
+            h=h,
+            new_x=XPos.RIGHT if i == last else XPos.LEFT,
+            new_y=YPos.NEXT,
+            border=0,
+            fill=False,
+            link=None,
+            padding=Padding(0, 0, 0, 0),
+        )
+    if block.lines[-1].trailing_nl:
+        pdf.ln()
@@ -0,0 +1,32 @@
+import os
+from .bounded_pool import BoundedPool, PoolBusy
+from .worksheet_pdf import RenderSpec, render, render_booklet
+
+# Worksheet rendering (fpdf2, pure Python, CPU-bound) runs in separate processes so that
+# a few long texts being rendered do not hold the GIL for every other request.
+# Requests hand over a RenderSpec (plain strings and tuples, picklable) and get the bytes back.
+# Beyond PDF_RENDER_MAX_PENDING queued + running renders the endpoint answers 503 + Retry-After.
+
+PDF_RENDER_WORKERS = int(os.getenv("PDF_RENDER_WORKERS", str(min(os.cpu_count() or 1, 4))))
+PDF_RENDER_MAX_PENDING = int(os.getenv("PDF_RENDER_MAX_PENDING", str(PDF_RENDER_WORKERS * 4)))
+PDF_RENDER_EXECUTOR = os.getenv("PDF_RENDER_EXECUTOR", "process")
+RETRY_AFTER_SECONDS = 5
+
+RendererBusy = PoolBusy
+
+
+class PdfRenderer(BoundedPool):
+    def render(self, spec: RenderSpec):
+        """
+        Returns (pdf bytes, queue wait seconds, render seconds). Raises RendererBusy.
+        """
+        return self.run_timed(render, spec)
+
+    def render_booklet(self, title: str, specs):
+        """
+        Same for several worksheets in one PDF (see worksheet_pdf.render_booklet).
+        """
+        return self.run_timed(render_booklet, title, specs)
+
+
+pdf_renderer = PdfRenderer("pdf-render", PDF_RENDER_WORKERS, PDF_RENDER_MAX_PENDING, PDF_RENDER_EXECUTOR)
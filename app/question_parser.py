@@ -0,0 +1,140 @@
+import re
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+
+# Questions block of an uploaded text: one pass over the lines, patterns compiled once.
+# Layouts understood (the option marked with * is the correct one; unmarked questions
+# keep the first option and are reported, see ParseResult.answer_key_complete):
+#
+#   --- Preguntas ---       Comprehension Questions     [QUESTIONS]
+#   1. Question?            1. Question?                1. Question?
+#   a) Option               - Option                       1) Option
+#   b) Option *             - Option *                     2) Option *
+#
+# Numbered options ("1) ...") must be indented, an unindented "2) ..." starts a question.
+# Lines that are neither are skipped and reported in ParseResult.diagnostics.
+
+QUESTIONS_SEPARATOR = re.compile(
+    r"(--- Preguntas ---|Preguntas:|--- PREGUNTAS ---|PREGUNTAS:"
+    r"|^[ \t]*Comprehension Questions[ \t]*$|^[ \t]*\[QUESTIONS\][ \t]*$)",
+    re.MULTILINE,
+)
+
+QUESTION_LINE = re.compile(r"\d+[.)]\s*")
+LETTER_OPTION = re.compile(r"[a-z][.)]\s*")
+DASH_OPTION = re.compile(r"-\s*")
+NUMBER_OPTION = re.compile(r"\s+\d+\)\s*")
+CORRECT_MARK = "*"
+
+
+@dataclass
+class ParsedQuestion:
+    question_content: str
+    line: int
+    options: List[str] = field(default_factory=list)
+    correct_answer: int = 0
+    marked: bool = False # An option carried the * marker
+
+
+@dataclass
+class Diagnostic:
+    line: int
+    message: str
+    text: str = ""
+
+    def __str__(self):
+        return f"line {self.line}: {self.message}" + (f" ({self.text!r})" if self.text else "")
+
+
+@dataclass
+class ParseResult:
+    questions: List[ParsedQuestion] = field(default_factory=list)
+    diagnostics: List[Diagnostic] = field(default_factory=list)
+
+    @property
+    def answer_key_complete(self) -> bool:
+        # Every question has an option marked as correct
+        return all(q.marked for q in self.questions)
+
+    def rows(self, text_id: int) -> List[dict]:
+        """
+        Parameters for one bulk insert(models.Question).
+        """
+        return [
+            {
+                "text_id": text_id,
+                "question_content": q.question_content,
+                "options": q.options,
+                "correct_answer": q.correct_answer,
+            }
+            for q in self.questions
+        ]
+
+
+def split_questions(full_content: str) -> Tuple[str, Optional[str], int]:
+    """
+    (main text, questions block, line number where the block starts) of an uploaded text,
+    split at the first separator. The questions block is None when there is no separator.
+    """
+    match = QUESTIONS_SEPARATOR.search(full_content)
+    if match is None:
+        return full_content.strip(), None, 0
+    main_text = full_content[:match.start()].strip()
+    # Everything after the first separator
+    return main_text, full_content[match.end():], full_content.count("\n", 0, match.end()) + 1
+
+
+def _option(raw: str, stripped: str) -> Optional[str]:
+    for pattern, text in ((LETTER_OPTION, stripped), (DASH_OPTION, stripped), (NUMBER_OPTION, raw)):
+        m = pattern.match(text)
+        if m:
+            return text[m.end():]
+    return None
+
+
+def parse(questions_text: str, first_line: int = 1) -> ParseResult:
+    """
+    Parses a questions block. Line numbers in the result count from `first_line`.
+    """
+    result = ParseResult()
+    questions = result.questions
+    diagnostics = result.diagnostics
+    current = None
+
+    for number, raw in enumerate(questions_text.split("\n"), start=first_line):
+        line = raw.strip()
+        if not line:
+            continue
+
+        # Indented "1)" under a question is an option, anything else "N." / "N)" a question
+        option = _option(raw.rstrip(), line)
+        if option is not None and (current is not None or not QUESTION_LINE.match(line)):
+            if current is None:
+                diagnostics.append(Diagnostic(number, "option before any question", line))
+                continue
+            if CORRECT_MARK in option:
+                if current.marked:
+                    diagnostics.append(Diagnostic(number, "more than one option marked as correct, keeping the last", line))
+                current.correct_answer = len(current.options)
+                current.marked = True
+                option = option.replace(CORRECT_MARK, "").strip()
+            if not option:
+                diagnostics.append(Diagnostic(number, "empty option", line))
+            current.options.append(option)
+            continue
+
+        m = QUESTION_LINE.match(line)
+        if m:
+            current = ParsedQuestion(line[m.end():], number)
+            questions.append(current)
+            continue
+
+        diagnostics.append(Diagnostic(number, "unrecognised line, skipped", line))
+
+    for q in questions:
+        if len(q.options) < 2:
+            diagnostics.append(Diagnostic(q.line, f"question has {len(q.options)} option(s)", q.question_content))
+        if q.options and not q.marked:
+            diagnostics.append(Diagnostic(q.line, "no option marked as correct, using the first", q.question_content))
+    diagnostics.sort(key=lambda d: d.line)
+    return result
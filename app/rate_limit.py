@@ -0,0 +1,165 @@
+import os
+import random
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from . import models
+
+# Login rate limiting (failed attempts per login code and per IP).
+# Only failures are counted, so a successful login costs one dict lookup and no DB write.
+#
+# Backends (RATE_LIMIT_BACKEND):
+#   sliding_window  exact window per key, in process memory (default)
+#   token_bucket    capacity `limit`, refilled at limit/window per second, in process memory
+#   db              fixed 1-minute buckets in the rate_limit_hits table, shared by every
+#                   gunicorn worker / instance (SQLite or Postgres)
+#
+# The memory backends are per process: with N workers an attacker gets up to N x limit tries.
+
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "sliding_window")
+RATE_LIMIT_WINDOW_SECONDS = int(os.getenv("RATE_LIMIT_WINDOW_SECONDS", "300"))
+RATE_LIMIT_CODE_MAX = int(os.getenv("RATE_LIMIT_CODE_MAX", "6"))
+# A whole school can share one public IP, so the IP limit is much looser
+RATE_LIMIT_IP_MAX = int(os.getenv("RATE_LIMIT_IP_MAX", "60"))
+MAX_TRACKED_KEYS = 100000
+
+
+class SlidingWindowBackend:
+    def __init__(self, max_keys: int = MAX_TRACKED_KEYS):
+        self.max_keys = max_keys
+        self._hits: Dict[str, deque] = {}
+        self._lock = threading.Lock()
+
+    def _prune(self, hits: deque, cutoff: float):
+        while hits and hits[0] <= cutoff:
+            hits.popleft()
+
+    def _sweep(self, now: float, window: int):
+        for key in [k for k, hits in self._hits.items() if not hits or hits[-1] <= now - window]:
+            del self._hits[key]
+
+    def is_blocked(self, db: Optional[Session], key: str, limit: int, window: int) -> bool:
+        with self._lock:
+            hits = self._hits.get(key)
+            if not hits:
+                return False
+            self._prune(hits, time.monotonic() - window)
+            return len(hits) >= limit
+
+    def add(self, db: Optional[Session], key: str, limit: int, window: int):
+        now = time.monotonic()
+        with self._lock:
+            hits = self._hits.get(key)
+            if hits is None:
+                if len(self._hits) >= self.max_keys:
+                    self._sweep(now, window)
+                hits = self._hits[key] = deque()
+            self._prune(hits, now - window)
+            hits.append(now)
+
+
+class TokenBucketBackend:
+    def __init__(self, max_keys: int = MAX_TRACKED_KEYS):
+        self.max_keys = max_keys
+        self._buckets: Dict[str, list] = {} # key -> [tokens, last_refill]
+        self._lock = threading.Lock()
+
+    def _tokens(self, bucket: list, now: float, limit: int, window: int) -> float:
+        bucket[0] = min(limit, bucket[0] + (now - bucket[1]) * limit / window)
+        bucket[1] = now
+        return bucket[0]
+
+    def is_blocked(self, db: Optional[Session], key: str, limit: int, window: int) -> bool:
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                return False
+            return self._tokens(bucket, time.monotonic(), limit, window) < 1
+
+    def add(self, db: Optional[Session], key: str, limit: int, window: int):
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                if len(self._buckets) >= self.max_keys:
+                    # Full buckets carry no information
+                    for k in [k for k, b in self._buckets.items() if self._tokens(b, now, limit, window) >= limit]:
+                        del self._buckets[k]
+                bucket = self._buckets[key] = [float(limit), now]
+            self._tokens(bucket, now, limit, window)
+            bucket[0] = max(bucket[0] - 1, 0.0)
+
+
+class DatabaseBackend:
+    BUCKET_SECONDS = 60
+
+    def _bucket(self) -> int:
+        return int(time.time() // self.BUCKET_SECONDS)
+
+    def is_blocked(self, db: Session, key: str, limit: int, window: int) -> bool:
+        oldest = self._bucket() - window // self.BUCKET_SECONDS + 1
+        total = db.query(func.coalesce(func.sum(models.RateLimitHit.count), 0)).filter(
+            models.RateLimitHit.key == key,
+            models.RateLimitHit.bucket >= oldest
+        ).scalar()
+        return total >= limit
+
+    def add(self, db: Session, key: str, limit: int, window: int):
+        if db.get_bind().dialect.name == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        bucket = self._bucket()
+        stmt = insert(models.RateLimitHit).values(key=key, bucket=bucket, count=1)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["key", "bucket"],
+            set_={"count": models.RateLimitHit.count + 1}
+        )
+        db.execute(stmt)
+        if random.random() < 0.01:
+            # Occasional cleanup of expired buckets
+            db.query(models.RateLimitHit).filter(
+                models.RateLimitHit.bucket < bucket - window // self.BUCKET_SECONDS
+            ).delete(synchronize_session=False)
+        db.commit()
+
+
+BACKENDS = {
+    "sliding_window": SlidingWindowBackend,
+    "token_bucket": TokenBucketBackend,
+    "db": DatabaseBackend,
+}
+
+
+class LoginRateLimiter:
+    def __init__(self, backend, code_max: int, ip_max: int, window: int):
+        self.backend = backend
+        self.code_max = code_max
+        self.ip_max = ip_max
+        self.window = window
+
+    def allow(self, db: Optional[Session], ip_address: str, code_index: str) -> bool:
+        """
+        True if neither the code nor the IP is blocked.
+        """
+        if self.backend.is_blocked(db, f"code:{code_index}", self.code_max, self.window):
+            return False
+        if ip_address and self.backend.is_blocked(db, f"ip:{ip_address}", self.ip_max, self.window):
+            return False
+        return True
+
+    def record_failure(self, db: Optional[Session], ip_address: str, code_index: str):
+        self.backend.add(db, f"code:{code_index}", self.code_max, self.window)
+        if ip_address:
+            self.backend.add(db, f"ip:{ip_address}", self.ip_max, self.window)
+
+
+login_limiter = LoginRateLimiter(
+    BACKENDS[RATE_LIMIT_BACKEND](),
+    RATE_LIMIT_CODE_MAX,
+    RATE_LIMIT_IP_MAX,
+    RATE_LIMIT_WINDOW_SECONDS,
+)
@@ -0,0 +1,112 @@
+import hashlib
+import os
+import secrets
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+from sqlalchemy.orm import Session
+from . import models
+
+# Long-lived, opaque refresh tokens (one family per login on a device).
+# Each use rotates the token: the old one is revoked and points to its replacement.
+# Presenting an already rotated token again means it leaked -> the whole family is revoked.
+
+REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "30"))
+# Two tabs refreshing at the same moment both present the same token;
+# inside this window the second one is just rejected, not treated as theft.
+REUSE_GRACE_SECONDS = 10
+
+
+class RefreshTokenError(Exception):
+    pass
+
+
+def _hash(raw_token: str) -> str:
+    return hashlib.sha256(raw_token.encode("utf-8")).hexdigest()
+
+
+def issue(db: Session, subject: str, family_id: Optional[str] = None) -> Tuple[str, models.RefreshToken]:
+    """
+    Creates a refresh token for `subject`. Returns (raw token, row). Does not commit.
+    """
+    raw_token = secrets.token_urlsafe(32)
+    now = datetime.utcnow()
+    row = models.RefreshToken(
+        token_hash=_hash(raw_token),
+        subject=subject,
+        family_id=family_id or secrets.token_hex(16),
+        created_at=now,
+        expires_at=now + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS),
+    )
+    db.add(row)
+    db.flush()
+    return raw_token, row
+
+
+def _reject_revoked(db: Session, row: models.RefreshToken, now: datetime):
+    # Reuse of a rotated token outside the grace window means it leaked: revoke the family
+    reused_after_rotation = row.replaced_by_id is not None
+    if reused_after_rotation and (now - row.revoked_at).total_seconds() > REUSE_GRACE_SECONDS:
+        revoke_family(db, row.family_id)
+    raise RefreshTokenError("Refresh token revoked")
+
+
+def rotate(db: Session, raw_token: str) -> Tuple[str, models.RefreshToken]:
+    """
+    Validates `raw_token` and replaces it with a new one of the same family.
+    Raises RefreshTokenError if it is unknown, expired or revoked. Commits.
+    """
+    now = datetime.utcnow()
+    row = db.query(models.RefreshToken).filter(models.RefreshToken.token_hash == _hash(raw_token)).first()
+    if not row:
+        raise RefreshTokenError("Invalid refresh token")
+
+    if row.revoked_at is not None:
+        _reject_revoked(db, row, now)
+
+    if row.expires_at < now:
+        raise RefreshTokenError("Refresh token expired")
+
+    # Claim the token atomically: of two concurrent rotations only one gets rowcount 1
+    claimed = db.query(models.RefreshToken).filter(
+        models.RefreshToken.id == row.id,
+        models.RefreshToken.revoked_at.is_(None)
+    ).update({models.RefreshToken.revoked_at: now}, synchronize_session=False)
+    if claimed != 1:
+        # Rotated (or revoked) by someone else since we read it: same rule as above
+        db.rollback()
+        db.refresh(row)
+        _reject_revoked(db, row, now)
+
+    new_raw, new_row = issue(db, row.subject, family_id=row.family_id)
+    db.query(models.RefreshToken).filter(models.RefreshToken.id == row.id).update(
+        {models.RefreshToken.replaced_by_id: new_row.id}, synchronize_session=False
+    )
+    db.commit()
+    return new_raw, new_row
+
+
+def revoke_family(db: Session, family_id: str):
+    db.query(models.RefreshToken).filter(
+        models.RefreshToken.family_id == family_id,
+        models.RefreshToken.revoked_at.is_(None)
+    ).update({models.RefreshToken.revoked_at: datetime.utcnow()}, synchronize_session=False)
+    db.commit()
+
+
+def revoke_token(db: Session, raw_token: str):
+    """
+    Logout: revokes the presented token and every rotation of it.
+    """
+    row = db.query(models.RefreshToken).filter(models.RefreshToken.token_hash == _hash(raw_token)).first()
+    if row:
+        revoke_family(db, row.family_id)
+
+
+def revoke_subject(db: Session, subject: str):
+    """
+    Revokes every refresh token of a user (password reset, deletion). Does not commit.
+    """
+    db.query(models.RefreshToken).filter(
+        models.RefreshToken.subject == subject,
+        models.RefreshToken.revoked_at.is_(None)
+    ).update({models.RefreshToken.revoked_at: datetime.utcnow()}, synchronize_session=False)
@@ -1,11 +1,13 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Request
 from fastapi.security import OAuth2PasswordRequestForm
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from datetime import datetime, timedelta
-from typing import List
-from app import schemas, models, security_utils
-from app.database import get_db
-from app.auth import authenticate_user, create_access_token, get_current_user, get_current_active_user, ACCESS_TOKEN_EXPIRE_MINUTES, get_password_hash, verify_password
+from typing import List, Optional
+from app import schemas, models, security_utils, identity_cache, entitlements, refresh_tokens, code_verifier, attempt_retention, licensing, invitations
+from app.database import get_db, get_async_db, SessionLocal
+from app.auth import authenticate_user, create_access_token, get_current_user, get_current_active_user, get_current_principal, principal_query, ACCESS_TOKEN_EXPIRE_MINUTES, get_password_hash, verify_password
 
 router = APIRouter(
     prefix="/auth",
@@ -16,18 +18,17 @@ router = APIRouter(
 def read_users_me(current_user = Depends(get_current_active_user)):
     return current_user
 
-@router.post("/login-code", response_model=schemas.Token)
-def login_with_code(
-    login_req: schemas.LoginCodeRequest,
-    request: Request,
-    db: Session = Depends(get_db)
-):
-    # 1. Calculate identifiers
-    code = login_req.code
-    ip_address = request.client.host
-    code_index = security_utils.get_code_index(code)
-    
-    # 2. Check Rate Limit
+def _verifier_busy_exception():
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Too many logins in progress. Please try again in a moment.",
+        headers={"Retry-After": str(code_verifier.RETRY_AFTER_SECONDS)},
+    )
+
+def _find_code_owner(db: Session, ip_address: str, code_index: str):
+    # Rate limit + lookup (blocking DB work, runs in the threadpool).
+    # Returns (id, login_code_hash, access_expires_at) or None, and ends the
+    # transaction so no pooled connection is held while bcrypt runs.
     if not security_utils.check_rate_limit(db, ip_address, code_index):
         # Log the blocked attempt? (Optional, check_rate_limit usually implies we stop here)
         # We record it as a failure just to keep the block alive? 
@@ -37,48 +38,65 @@ def login_with_code(
             status_code=status.HTTP_429_TOO_MANY_REQUESTS,
             detail="Too many login attempts. Please try again later."
         )
+    owner = db.query(
+        models.SubUser.id, models.SubUser.login_code_hash, models.SubUser.access_expires_at
+    ).filter(models.SubUser.login_code_index == code_index).first()
+    db.rollback()
+    return owner
 
-    # 3. Find User
-    subuser = db.query(models.SubUser).filter(models.SubUser.login_code_index == code_index).first()
-    
-    if not subuser:
-        # Invalid code (User not found)
-        security_utils.record_login_attempt(db, ip_address, code_index, success=False)
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid login code",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-        
-    # 4. Verify Hash
-    if not subuser.login_code_hash or not security_utils.verify_code(code, subuser.login_code_hash):
+def _finish_code_login(db: Session, ip_address: str, code_index: str, owner, valid: bool):
+    if not valid:
         security_utils.record_login_attempt(db, ip_address, code_index, success=False)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid login code",
             headers={"WWW-Authenticate": "Bearer"},
         )
-        
-    # 5. Success
-    security_utils.record_login_attempt(db, ip_address, code_index, success=True)
-    
+
     # Check Expiry
-    if subuser.access_expires_at and subuser.access_expires_at < datetime.utcnow():
-         raise HTTPException(
+    if owner.access_expires_at and owner.access_expires_at < datetime.utcnow():
+        security_utils.record_login_attempt(db, ip_address, code_index, success=True)
+        raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Access expired. Please renew your license.",
         )
 
-    access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    # We use subuser.name as the identity for now, or maybe a composite?
-    # Existing `get_current_user` expects `username`. SubUsers don't have usernames.
-    # We might need to encode a flag in the token, e.g. "subuser:123"
-    
+    # We encode a flag in the token: SubUsers don't have usernames -> "subuser:123"
     access_token = create_access_token(
-        data={"sub": f"subuser:{subuser.id}"}, # Special prefix for subusers
-        expires_delta=access_token_expires
+        data={"sub": f"subuser:{owner.id}"}, # Special prefix for subusers
+        expires_delta=timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     )
-    return {"access_token": access_token, "token_type": "bearer"}
+    security_utils.record_login_attempt(db, ip_address, code_index, success=True)
+    refresh_token, _ = refresh_tokens.issue(db, f"subuser:{owner.id}")
+    db.commit()
+    return {"access_token": access_token, "token_type": "bearer", "refresh_token": refresh_token}
+
+@router.post("/login-code", response_model=schemas.Token)
+async def login_with_code(
+    login_req: schemas.LoginCodeRequest,
+    request: Request,
+    db: Session = Depends(get_db)
+):
+    # async so that requests waiting for bcrypt hold no thread: the DB steps go to the
+    # threadpool, the bcrypt check to the dedicated code_verifier pool.
+    # 1. Calculate identifiers
+    code = login_req.code
+    ip_address = request.client.host
+    code_index = security_utils.get_code_index(code)
+
+    # 2. Check Rate Limit + Find User
+    owner = await run_in_threadpool(_find_code_owner, db, ip_address, code_index)
+
+    # 3. Verify Hash (unknown code -> no bcrypt work)
+    valid = False
+    if owner and owner.login_code_hash:
+        try:
+            valid = await code_verifier.code_verifier.verify(code, owner.login_code_hash)
+        except code_verifier.VerifierBusy:
+            raise _verifier_busy_exception()
+
+    # 4. Log attempt, check expiry, issue tokens
+    return await run_in_threadpool(_finish_code_login, db, ip_address, code_index, owner, valid)
 
 @router.post("/register", response_model=schemas.User)
 def register(user: schemas.UserCreate, db: Session = Depends(get_db)):
@@ -139,7 +157,56 @@ def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db:
     access_token = create_access_token(
         data={"sub": user.username}, expires_delta=access_token_expires
     )
-    return {"access_token": access_token, "token_type": "bearer"}
+    refresh_token, _ = refresh_tokens.issue(db, user.username)
+    db.commit()
+    return {"access_token": access_token, "token_type": "bearer", "refresh_token": refresh_token}
+
+def _subject_is_valid(db: Session, subject: str) -> bool:
+    # The account must still exist; a subuser must still have access
+    try:
+        principal = db.execute(principal_query(subject)).scalars().first()
+    except HTTPException:
+        return False
+    if principal is None:
+        return False
+    if isinstance(principal, models.SubUser) and principal.access_expires_at and principal.access_expires_at < datetime.utcnow():
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Access expired. Please renew your license.",
+        )
+    return True
+
+@router.post("/refresh", response_model=schemas.Token)
+def refresh_access_token(request: schemas.RefreshRequest, db: Session = Depends(get_db)):
+    # Rotates the refresh token and returns a new pair
+    try:
+        new_refresh_token, row = refresh_tokens.rotate(db, request.refresh_token)
+    except refresh_tokens.RefreshTokenError as e:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail=str(e),
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    if not _subject_is_valid(db, row.subject):
+        refresh_tokens.revoke_family(db, row.family_id)
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid refresh token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    access_token = create_access_token(
+        data={"sub": row.subject},
+        expires_delta=timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    )
+    return {"access_token": access_token, "token_type": "bearer", "refresh_token": new_refresh_token}
+
+@router.post("/logout")
+def logout(request: schemas.RefreshRequest, db: Session = Depends(get_db)):
+    # Revokes the refresh token (and its rotations). The access token just expires.
+    refresh_tokens.revoke_token(db, request.refresh_token)
+    return {"message": "Sesión cerrada"}
 
 @router.post("/forgot-password")
 def forgot_password(request: schemas.PasswordResetRequest, db: Session = Depends(get_db)):
@@ -185,7 +252,9 @@ def reset_password(request: schemas.PasswordResetConfirm, db: Session = Depends(
         # Update Password
         hashed_password = get_password_hash(request.new_password)
         user.hashed_password = hashed_password
+        refresh_tokens.revoke_subject(db, user.username)
         db.commit()
+        identity_cache.invalidate(user)
         
         return {"message": "Contraseña restablecida correctamente"}
         
@@ -223,6 +292,8 @@ def unlock_content(request: schemas.UnlockRequest, current_user: schemas.User =
     invitation.used_by_user_id = current_user.id
     
     db.commit()
+    identity_cache.invalidate(current_user)
+    entitlements.invalidate(current_user)
     
     return {"message": message, "expires_at": current_user.access_expires_at}
 
@@ -232,44 +303,107 @@ def read_users_me_deprecated(current_user: schemas.User = Depends(get_current_us
 
 # --- ADMIN: CODE GENERATION ---
 @router.post("/admin/codes", response_model=List[str])
-def generate_codes(count: int = 1, current_user: schemas.User = Depends(get_current_user), db: Session = Depends(get_db)):
+def generate_codes(count: int = 1, current_user: schemas.User = Depends(get_current_principal), db: Session = Depends(get_db)):
     if current_user.username != "admin":
         raise HTTPException(status_code=403, detail="Not authorized")
-    
-    import secrets
-    import string
-    
-    new_codes = []
-    for _ in range(count):
-        # Generate random 8-char code (Uppercase + Digits)
-        code = ''.join(secrets.choice(string.ascii_uppercase + string.digits) for _ in range(8))
-        
-        # Check uniqueness (simplified, unlikely collision with 8 chars but safer to check)
-        while db.query(models.InvitationCode).filter(models.InvitationCode.code == code).first():
-             code = ''.join(secrets.choice(string.ascii_uppercase + string.digits) for _ in range(8))
-             
-        db_code = models.InvitationCode(code=code)
-        db.add(db_code)
-        new_codes.append(code)
-    
-    db.commit()
-    return new_codes
+    if not 1 <= count <= invitations.MAX_GENERATE:
+        raise HTTPException(status_code=400, detail=f"count must be between 1 and {invitations.MAX_GENERATE}")
+
+    # Random 8-char codes (Uppercase + Digits), uniqueness checked per batch
+    return invitations.generate(db, count)
 
-@router.get("/admin/codes")
-def get_codes(current_user: schemas.User = Depends(get_current_user), db: Session = Depends(get_db)):
+@router.post("/admin/licenses")
+def mint_licenses(count: int, duration_days: int = 365, current_user = Depends(get_current_principal)):
+    # Streams the new keys as CSV while they are created (see app/licensing.py)
+    if current_user.username != "admin":
+        raise HTTPException(status_code=403, detail="Not authorized")
+    if not 1 <= count <= licensing.MAX_MINT:
+        raise HTTPException(status_code=400, detail=f"count must be between 1 and {licensing.MAX_MINT}")
+    if duration_days < 1:
+        raise HTTPException(status_code=400, detail="duration_days must be >= 1")
+
+    def rows():
+        # Own session: the response outlives the request dependencies
+        db = SessionLocal()
+        try:
+            yield from licensing.mint_csv(db, count, duration_days)
+        finally:
+            db.close()
+
+    return StreamingResponse(
+        rows(),
+        media_type="text/csv",
+        headers={"Content-Disposition": f"attachment; filename=licencias_{count}.csv"}
+    )
+
+@router.get("/admin/codes", response_model=schemas.InvitationCodePage)
+def get_codes(
+    is_used: Optional[bool] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    after: Optional[str] = None,
+    limit: int = invitations.DEFAULT_PAGE_SIZE,
+    current_user: schemas.User = Depends(get_current_principal),
+    db: Session = Depends(get_db)
+):
+    # Keyset pagination, newest first; pass `next_cursor` back as `after`
+    if current_user.username != "admin":
+        raise HTTPException(status_code=403, detail="Not authorized")
+    limit = max(1, min(limit, invitations.MAX_PAGE_SIZE))
+    try:
+        codes = invitations.query_codes(db, is_used, created_from, created_to, after, limit + 1)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    page = codes[:limit]
+    return {
+        "items": [invitations.code_row(c) for c in page],
+        "next_cursor": invitations.encode_cursor(page[-1]) if len(codes) > limit else None
+    }
+
+@router.get("/admin/codes/export")
+def export_codes(
+    is_used: Optional[bool] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    current_user: schemas.User = Depends(get_current_principal)
+):
     if current_user.username != "admin":
         raise HTTPException(status_code=403, detail="Not authorized")
-    
-    codes = db.query(models.InvitationCode).all()
-    return [{
-        "code": c.code, 
-        "is_used": c.is_used, 
-        "used_at": c.used_at, 
-        "created_at": c.created_at,
-        "used_by": c.user.username if c.user else None,
-        "user_email": c.user.email if c.user else None,
-        "expires_at": c.user.access_expires_at if c.user else None
-    } for c in codes]
+
+    def rows():
+        db = SessionLocal()
+        try:
+            yield from invitations.export_csv(db, is_used=is_used, created_from=created_from, created_to=created_to)
+        finally:
+            db.close()
+
+    return StreamingResponse(
+        rows(),
+        media_type="text/csv",
+        headers={"Content-Disposition": "attachment; filename=codigos_invitacion.csv"}
+    )
+
+@router.get("/admin/login-stats")
+def get_login_stats(current_user = Depends(get_current_principal)):
+    # Queue depth / wait times of the bcrypt pool used by /auth/login-code
+    if current_user.username != "admin":
+        raise HTTPException(status_code=403, detail="Not authorized")
+    return {"code_verifier": code_verifier.code_verifier.stats()}
+
+@router.post("/admin/login-attempts/compact")
+def compact_login_attempts(
+    retention_days: int = attempt_retention.LOGIN_ATTEMPT_RETENTION_DAYS,
+    dry_run: bool = False,
+    current_user = Depends(get_current_principal),
+    db: Session = Depends(get_db)
+):
+    # Same job as compact_login_attempts.py
+    if current_user.username != "admin":
+        raise HTTPException(status_code=403, detail="Not authorized")
+    if retention_days < 1:
+        raise HTTPException(status_code=400, detail="retention_days must be >= 1")
+    return attempt_retention.compact(db, retention_days=retention_days, dry_run=dry_run)
 
 @router.get("/debug-openai")
 def debug_openai_config():
@@ -297,3 +431,34 @@ def debug_openai_config():
             report["api_call"] = f"Failed: {str(e)}"
             
     return report
+
+
+# --- ASYNC VARIANTS (DATABASE_ASYNC=1) ---
+# main.py includes this router before `router`, so these take the paths.
+
+async_router = APIRouter(
+    prefix="/auth",
+    tags=["auth"]
+)
+
+@async_router.post("/login-code", response_model=schemas.Token)
+async def login_with_code_async(
+    login_req: schemas.LoginCodeRequest,
+    request: Request,
+    db = Depends(get_async_db)
+):
+    # Same steps as login_with_code, with the DB work on the async session
+    code = login_req.code
+    ip_address = request.client.host
+    code_index = security_utils.get_code_index(code)
+
+    owner = await db.run_sync(_find_code_owner, ip_address, code_index)
+
+    valid = False
+    if owner and owner.login_code_hash:
+        try:
+            valid = await code_verifier.code_verifier.verify(code, owner.login_code_hash)
+        except code_verifier.VerifierBusy:
+            raise _verifier_busy_exception()
+
+    return await db.run_sync(_finish_code_login, ip_address, code_index, owner, valid)
@@ -1,84 +1,109 @@
 from fastapi import APIRouter, Depends, HTTPException, status, File, UploadFile, Form, Request
-from fastapi.responses import StreamingResponse, HTMLResponse, RedirectResponse
-from sqlalchemy.orm import Session
+from fastapi.responses import StreamingResponse, HTMLResponse, RedirectResponse, Response, FileResponse
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import insert
+from sqlalchemy.orm import Session, selectinload
 from typing import List, Optional
 from datetime import datetime
-from .. import database, models, schemas, auth
+import hashlib
+import os
+import re
+from .. import database, models, schemas, auth, catalog, catalog_cache, storage, entitlements, worksheet_pdf, pdf_renderer, booklets, uploads, question_parser, corpus_import
+from ..content_cache import text_cache
+from ..identity_cache import identity_cache
+from ..pdf_cache import pdf_cache
 
 router = APIRouter(
     prefix="/reading",
     tags=["reading"]
 )
 
-@router.get("/texts", response_model=List[schemas.TextResponse])
-def get_texts(current_user: schemas.User = Depends(auth.get_current_user), db: Session = Depends(database.get_db)):
-    # Return all texts so frontend can filter by course
-    is_admin = False
-    if hasattr(current_user, "username") and current_user.username == "admin":
-        is_admin = True
-        
-    if is_admin:
-        texts = db.query(models.Text).all()
-    else:
-        texts = db.query(models.Text).filter(models.Text.is_active == True).all()
-    
-    user_attempts = db.query(models.ReadingAttempt).filter(models.ReadingAttempt.user_id == current_user.id).all()
-    attempts_map = {a.text_id: a.score for a in user_attempts}
-    
-    # Check Premium Status
-    is_premium = False
-    if (current_user.access_expires_at and current_user.access_expires_at > datetime.utcnow()) or current_user.username == "admin":
-        is_premium = True
-        
-    # Free Text Logic: First text created (lowest ID) is free.
-    # Assuming IDs are 1, 2, 3...
-    min_id = min([t.id for t in texts]) if texts else 0
-    
+def _catalog_item(t, score, is_completed, access: entitlements.Entitlement) -> schemas.TextResponse:
+    t_resp = schemas.TextResponse.model_validate(t)
+    t_resp.is_completed = bool(is_completed)
+    t_resp.score = score
+    # Lock Logic: premium sees everything, otherwise only the first text is free
+    t_resp.is_locked = access.is_locked(t.id)
+    return t_resp
+
+def _texts_response(texts, attempts_map: dict, completed: Optional[bool], access: entitlements.Entitlement):
     response = []
     for t in texts:
-        t_resp = schemas.TextResponse.model_validate(t)
-        t_resp.is_completed = t.id in attempts_map
-        t_resp.score = attempts_map.get(t.id)
-        
-        # Lock Logic
-        if is_premium:
-            t_resp.is_locked = False
-        else:
-            if t.id == min_id: # First one is free
-                t_resp.is_locked = False
-            else:
-                t_resp.is_locked = True
-                
-        response.append(t_resp)
-        
+        done = t.id in attempts_map
+        if completed is not None and done != completed:
+            continue
+        response.append(_catalog_item(t, attempts_map.get(t.id), done, access))
     return response
 
+@router.get("/texts", response_model=List[schemas.TextResponse])
+def get_texts(
+    course_level: Optional[str] = None,
+    language: Optional[str] = None,
+    completed: Optional[bool] = None,
+    current_user: schemas.User = Depends(auth.get_current_principal),
+    db: Session = Depends(database.get_db)
+):
+    # Return all texts so frontend can filter by course (filters are optional)
+    access = entitlements.resolve(db, current_user)
+
+    # Texts come from the in-memory catalog; only the user's scores hit the DB
+    snapshot = catalog_cache.get_snapshot(db)
+    texts = snapshot.list(include_inactive=access.is_admin, course_level=course_level, language=language)
+    attempts_map = catalog.latest_scores(db, current_user.id)
+    return _texts_response(texts, attempts_map, completed, access)
+
+@router.get("/catalog", response_model=schemas.TextCatalogPage)
+def get_catalog(
+    course_level: Optional[str] = None,
+    language: Optional[str] = None,
+    completed: Optional[bool] = None,
+    after: Optional[int] = None,
+    limit: int = catalog.DEFAULT_PAGE_SIZE,
+    facets: bool = True,
+    current_user: schemas.User = Depends(auth.get_current_principal),
+    db: Session = Depends(database.get_db)
+):
+    # Paginated version of /texts: filters, keyset cursor (?after=<last id>) and facet counts.
+    # Ask for facets only on the first page (facets=false when following next_cursor).
+    limit = max(1, min(limit, catalog.MAX_PAGE_SIZE))
+    access = entitlements.resolve(db, current_user)
+    is_admin = access.is_admin
+
+    # Fetch one extra row to know if there is a next page
+    rows = catalog.query_texts(
+        db, current_user.id, include_inactive=is_admin,
+        course_level=course_level, language=language, completed=completed,
+        after=after, limit=limit + 1
+    )
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    page = schemas.TextCatalogPage(
+        items=[_catalog_item(t, score, done, access) for t, score, done in rows],
+        next_cursor=rows[-1][0].id if has_more else None
+    )
+    if facets:
+        page.facets = schemas.CatalogFacets(**catalog.facet_counts(
+            db, current_user.id, include_inactive=is_admin,
+            course_level=course_level, language=language, completed=completed
+        ))
+    return page
+
 @router.get("/texts/{text_id}", response_model=schemas.TextResponse)
-def get_text(text_id: int, current_user: schemas.User = Depends(auth.get_current_user), db: Session = Depends(database.get_db)):
-    text = db.query(models.Text).filter(models.Text.id == text_id).first()
+def get_text(text_id: int, current_user: schemas.User = Depends(auth.get_current_principal), db: Session = Depends(database.get_db)):
+    text = catalog_cache.get_snapshot(db).get(text_id)
     if not text:
         raise HTTPException(status_code=404, detail="Text not found")
     
     # Enforcement Check
-    is_premium = False
-    if (current_user.access_expires_at and current_user.access_expires_at > datetime.utcnow()) or current_user.username == "admin":
-        is_premium = True
-        
-    # Recalculate if it's the free one (needs logic or DB query optimization, for MVP simple query)
-    first_text = db.query(models.Text).order_by(models.Text.id.asc()).first()
-    is_free = (first_text and text.id == first_text.id)
-    
-    if not is_premium and not is_free:
+    if not entitlements.resolve(db, current_user).can_read(text.id):
         raise HTTPException(status_code=403, detail="Contenido bloqueado. Introduce un código para desbloquear.")
 
-    # Read content from file
+    # Read content (filesystem or blob store, cached)
     try:
-        with open(text.content_path, "r", encoding="utf-8") as f:
-            content = f.read()
+        content = storage.read_text(db, text.content_path)
     except Exception as e:
-        import os
-        cwd = os.getcwd()
-        content = f"Error loading text content. Path: '{text.content_path}'. CWD: '{cwd}'. Error: {str(e)}"
+        content = _content_error(text, e)
 
     # Create a response object including the content
     # We need to manually construct the dict or object because we are enhancing the DB model
@@ -86,15 +111,66 @@ def get_text(text_id: int, current_user: schemas.User = Depends(auth.get_current
     response.content = content
     return response
 
+def _content_error(text, e: Exception) -> str:
+    import os
+    cwd = os.getcwd()
+    return f"Error loading text content. Path: '{text.content_path}'. CWD: '{cwd}'. Error: {str(e)}"
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    return if_none_match.strip() == "*" or etag in [tag.strip() for tag in if_none_match.split(",")]
+
+@router.get("/texts/{text_id}/bundle", response_model=schemas.ReadingBundle)
+def get_reading_bundle(text_id: int, request: Request, current_user: schemas.User = Depends(auth.get_current_principal), db: Session = Depends(database.get_db)):
+    # Text + questions + previous score in one round trip (quiz / reading room)
+    text = db.query(models.Text).options(selectinload(models.Text.questions)).filter(models.Text.id == text_id).first()
+    if not text:
+        raise HTTPException(status_code=404, detail="Text not found")
+
+    # Enforcement Check (same rules as get_text)
+    if not entitlements.resolve(db, current_user).can_read(text.id):
+        raise HTTPException(status_code=403, detail="Contenido bloqueado. Introduce un código para desbloquear.")
+
+    try:
+        content = storage.read_text(db, text.content_path)
+    except Exception:
+        content = "Error loading content."
+
+    last_attempt = db.query(models.ReadingAttempt.score).filter(
+        models.ReadingAttempt.user_id == current_user.id,
+        models.ReadingAttempt.text_id == text_id
+    ).order_by(models.ReadingAttempt.id.desc()).first()
+
+    text_resp = schemas.TextResponse.model_validate(text)
+    text_resp.content = content
+    text_resp.is_completed = last_attempt is not None
+    text_resp.score = last_attempt.score if last_attempt else None
+
+    bundle = schemas.ReadingBundle(
+        text=text_resp,
+        questions=sorted(text.questions, key=lambda q: q.id),
+        previous_score=text_resp.score
+    )
+    body = bundle.model_dump_json()
+
+    # Strong ETag over the exact bytes we send (changes with content, questions or score)
+    etag = f'"{hashlib.sha256(body.encode("utf-8")).hexdigest()[:32]}"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if _etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
 @router.get("/texts/{text_id}/questions", response_model=List[schemas.QuestionResponse])
-def get_questions(text_id: int, current_user: schemas.User = Depends(auth.get_current_user), db: Session = Depends(database.get_db)):
+def get_questions(text_id: int, current_user: schemas.User = Depends(auth.get_current_principal), db: Session = Depends(database.get_db)):
     questions = db.query(models.Question).filter(models.Question.text_id == text_id).all()
     if not questions:
         raise HTTPException(status_code=404, detail="Questions not found for this text")
     return questions
 
 @router.post("/attempt", response_model=schemas.AttemptResponse)
-def submit_attempt(attempt: schemas.AttemptCreate, current_user: schemas.User = Depends(auth.get_current_user), db: Session = Depends(database.get_db)):
+def submit_attempt(attempt: schemas.AttemptCreate, current_user: schemas.User = Depends(auth.get_current_principal), db: Session = Depends(database.get_db)):
     # Calculate score logic can be here if we receive answers, but for now we trust the frontend sends the score
     # Or we could receive selected answers and calculate score here for security. 
     # For MVP, believing the score from frontend is faster (as per user request "Le propone unas preguntas..."). 
@@ -114,13 +190,20 @@ def submit_attempt(attempt: schemas.AttemptCreate, current_user: schemas.User =
 
 
 @router.get("/admin/texts", response_model=List[schemas.TextResponse])
-def get_all_texts_admin(current_user: schemas.User = Depends(auth.get_current_user), db: Session = Depends(database.get_db)):
+def get_all_texts_admin(current_user: schemas.User = Depends(auth.get_current_principal), db: Session = Depends(database.get_db)):
     if current_user.username != "admin":
         raise HTTPException(status_code=403, detail="Not authorized")
     return db.query(models.Text).all()
 
+@router.get("/admin/cache-stats")
+def get_cache_stats(current_user: schemas.User = Depends(auth.get_current_principal)):
+    if current_user.username != "admin":
+        raise HTTPException(status_code=403, detail="Not authorized")
+    # Per worker process
+    return {"text_content": text_cache.stats(), "identity": identity_cache.stats(), "pdf": pdf_cache.stats(), "pdf_render": pdf_renderer.pdf_renderer.stats()}
+
 @router.put("/admin/texts/{text_id}", response_model=schemas.TextResponse)
-def update_text(text_id: int, text_update: schemas.TextUpdate, current_user: schemas.User = Depends(auth.get_current_user), db: Session = Depends(database.get_db)):
+def update_text(text_id: int, text_update: schemas.TextUpdate, current_user: schemas.User = Depends(auth.get_current_principal), db: Session = Depends(database.get_db)):
     if current_user.username != "admin":
         raise HTTPException(status_code=403, detail="Not authorized")
     
@@ -134,51 +217,21 @@ def update_text(text_id: int, text_update: schemas.TextUpdate, current_user: sch
         text.language = text_update.language
         
     db.commit()
-    db.refresh(text)
-    db.commit()
+    catalog_cache.bump_generation(db)
     db.refresh(text)
     return text
 
-@router.post("/admin/upload", response_model=schemas.TextResponse)
-def upload_text(
-    title: str = Form(...),
-    course_level: str = Form("ALL"),
-    language: str = Form("es"),
-    text_file: UploadFile = File(...),
-    audio_file: Optional[UploadFile] = File(None),
-    current_user: schemas.User = Depends(auth.get_current_user),
-    db: Session = Depends(database.get_db)
-):
-    if current_user.username != "admin":
-        raise HTTPException(status_code=403, detail="Not authorized")
+AUDIO_DIR = "static/audio"
 
-    import shutil
-    import os
-    
-    # 1. Save Text File
-    # Ensure directory exists
-    save_dir = f"data/texts/{course_level}"
-    os.makedirs(save_dir, exist_ok=True)
-    
-    filename = text_file.filename
-    content_path = f"{save_dir}/{filename}"
-    
-    with open(content_path, "wb") as buffer:
-        shutil.copyfileobj(text_file.file, buffer)
-        
-    # 2. Save Audio File (if present)
-    audio_path = None
-    if audio_file:
-        audio_filename = audio_file.filename
-        audio_save_dir = "static/audio"
-        os.makedirs(audio_save_dir, exist_ok=True)
-        audio_path_full = f"{audio_save_dir}/{audio_filename}"
-        
-        with open(audio_path_full, "wb") as buffer:
-            shutil.copyfileobj(audio_file.file, buffer)
-        
-        # Store relative path for DB
-        audio_path = f"audio/{audio_filename}"
+def _save_upload(db: Session, title: str, course_level: str, language: str, filename: str,
+                 full_content: str, main_text: str, questions_text: Optional[str], questions_line: int,
+                 audio_path: Optional[str]):
+    # 1. Stage Text File (filesystem or DB blob, see app/storage.py)
+    # Store ONLY the text when there are questions (hide questions from reading view)
+    # Published only once the row is committed: a duplicate upload never replaces the existing file
+    if db.query(models.Text.id).filter(models.Text.filename == filename).first():
+        raise HTTPException(status_code=400, detail=f"Error saving to DB: {filename} already exists")
+    staged = storage.stage_text(db, course_level, filename, full_content if questions_text is None else main_text)
 
     # 3. Create DB Entry
     new_text = models.Text(
@@ -186,7 +239,7 @@ def upload_text(
         filename=filename,
         course_level=course_level,
         language=language,
-        content_path=content_path,
+        content_path=staged.content_path,
         audio_path=audio_path
     )
     
@@ -196,93 +249,34 @@ def upload_text(
         db.refresh(new_text)
     except Exception as e:
         db.rollback()
+        staged.discard()
         raise HTTPException(status_code=400, detail=f"Error saving to DB (Title/Filename might be duplicate): {str(e)}")
+    except BaseException:
+        db.rollback()
+        staged.discard()
+        raise
+    staged.publish()
         
-    # 4. Parse & Save Questions
-    # Read content to parse questions
-    try:
-        with open(content_path, "r", encoding="utf-8") as f:
-            full_content = f.read()
-            
-        # Split Content vs Questions
-        # Look for typical separators
-        import re
-        separator_pattern = r"(--- Preguntas ---|Preguntas:|--- PREGUNTAS ---|PREGUNTAS:)"
-        parts = re.split(separator_pattern, full_content)
-        
-        main_text = parts[0].strip()
-        questions_text = ""
-        if len(parts) > 1:
-            # Reconstruct the rest (in case multiple separators, take all after first)
-            questions_text = "".join(parts[2:]).strip()
-            
-            # Update the file to ONLY contain the text (hide questions from reading view)
-            with open(content_path, "w", encoding="utf-8") as f:
-                f.write(main_text)
-                
-            # Parse Questions Logic
-            # Expected format:
-            # 1. Question text?
-            # a) Option 1
-            # b) Option 2 ...
-            # * Solution (optional logic, but for now let's assume first is correct or randomized? 
-            # Actually, let's assume standard format and try to detect 'CORRECT' or just take index.
-            # SIMPLE PARSER:
-            lines = questions_text.split('\n')
-            current_q = None
-            current_options = []
-            current_correct = 0 # Default to 0 (a)
-            
-            for line in lines:
-                line = line.strip()
-                if not line: continue
-                
-                # Detect Question (starts with digit + dot/paren)
-                if re.match(r"^\d+[\.\)]", line):
-                    # Save previous if exists
-                    if current_q:
-                        db_q = models.Question(
-                            text_id=new_text.id,
-                            question_content=current_q,
-                            options=current_options,
-                            correct_answer=current_correct
-                        )
-                        db.add(db_q)
-                    
-                    # Start new
-                    current_q = re.sub(r"^\d+[\.\)]\s*", "", line)
-                    current_options = []
-                    current_correct = 0
-                    
-                # Detect Option (starts with a) b) or - )
-                elif re.match(r"^[a-z][\.\)]", line) or line.startswith("-"):
-                    opt_text = re.sub(r"^[a-z][\.\)]\s*|-\s*", "", line)
-                    
-                    # Check if marked as correct (e.g. ends with *)
-                    if "*" in line:
-                        current_correct = len(current_options)
-                        opt_text = opt_text.replace("*", "").strip()
-                        
-                    current_options.append(opt_text)
-            
-            # Save last one
-            if current_q:
-                db_q = models.Question(
-                    text_id=new_text.id,
-                    question_content=current_q,
-                    options=current_options,
-                    correct_answer=current_correct
-                )
-                db.add(db_q)
-                
-            db.commit()
+    # 4. Parse & Save Questions (see app/question_parser.py), in one INSERT
+    diagnostics = []
+    if questions_text is not None:
+        parsed = question_parser.parse(questions_text, questions_line)
+        diagnostics = [str(d) for d in parsed.diagnostics] # Returned to the admin page too
+        for d in diagnostics:
+            print(f"{filename}: {d}")
+        if parsed.questions:
+            try:
+                db.execute(insert(models.Question), parsed.rows(new_text.id))
+                db.commit()
+            except Exception as e:
+                db.rollback()
+                print(f"Error saving questions: {e}")
+                # Non-blocking, text is saved anyway
 
-    except Exception as e:
-        print(f"Error parsing questions: {e}")
-        # Non-blocking, text is saved anyway
-        pass
-        
-    
+    catalog_cache.bump_generation(db)
+    return new_text, diagnostics
+
+def _generate_missing_questions(db: Session, new_text: models.Text, main_text: str):
     # 5. IF NO MANUAL QUESTIONS -> AI GENERATION
     # Check if questions were added manually
     existing_questions = db.query(models.Question).filter(models.Question.text_id == new_text.id).count()
@@ -296,8 +290,67 @@ def upload_text(
             print(f"AI Generation Failed: {e}")
             # Don't fail the upload, but log it
             pass
-        
-    return new_text
+    db.refresh(new_text)
+
+def _upload_filename(name: Optional[str]) -> str:
+    # Only the file's own name: it is joined under data/texts/<course>/ or static/audio/
+    filename = os.path.basename((name or "").replace("\\", "/")).strip()
+    if filename in ("", ".", ".."):
+        raise HTTPException(status_code=400, detail="Nombre de archivo no válido.")
+    return filename
+
+@router.post("/admin/upload", response_model=schemas.TextUploadResponse)
+async def upload_text(
+    title: str = Form(...),
+    course_level: str = Form("ALL"),
+    language: str = Form("es"),
+    text_file: UploadFile = File(...),
+    audio_file: Optional[UploadFile] = File(None),
+    current_user: schemas.User = Depends(auth.get_current_principal),
+    db: Session = Depends(database.get_db)
+):
+    # Files are read in chunks on the event loop (see uploads.py), DB work runs in the threadpool
+    if current_user.username != "admin":
+        raise HTTPException(status_code=403, detail="Not authorized")
+
+    filename = _upload_filename(text_file.filename)
+    try:
+        raw, text_sha256 = await uploads.read_limited(text_file, uploads.UPLOAD_MAX_TEXT_BYTES)
+    except uploads.UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=f"El texto supera el máximo de {e.max_bytes // 1024} KB.")
+    full_content = raw.decode("utf-8", errors="replace")
+    main_text, questions_text, questions_line = question_parser.split_questions(full_content)
+
+    # 2. Stage Audio File (if present): published only once the text is saved
+    audio_path = None
+    staged_audio = None
+    if audio_file:
+        audio_filename = _upload_filename(audio_file.filename)
+        try:
+            staged_audio = await uploads.stage(audio_file, f"{AUDIO_DIR}/{audio_filename}", uploads.UPLOAD_MAX_AUDIO_BYTES)
+        except uploads.UploadTooLarge as e:
+            raise HTTPException(status_code=413, detail=f"El audio supera el máximo de {e.max_bytes // (1024 * 1024)} MB.")
+        # Store relative path for DB
+        audio_path = f"audio/{audio_filename}"
+
+    try:
+        new_text, diagnostics = await run_in_threadpool(
+            _save_upload, db, title, course_level, language, filename,
+            full_content, main_text, questions_text, questions_line, audio_path
+        )
+    except BaseException:
+        if staged_audio:
+            await staged_audio.discard()
+        raise
+    if staged_audio:
+        await staged_audio.publish()
+        print(f"Uploaded {audio_path}: {staged_audio.size} bytes, sha256 {staged_audio.sha256}")
+    print(f"Uploaded {filename}: {len(raw)} bytes, sha256 {text_sha256}")
+
+    await run_in_threadpool(_generate_missing_questions, db, new_text, main_text)
+    response = schemas.TextUploadResponse.model_validate(new_text)
+    response.diagnostics = diagnostics
+    return response
 
 def generate_questions_openai(text_id: int, content: str, db: Session):
     import openai
@@ -375,8 +428,35 @@ def generate_questions_openai(text_id: int, content: str, db: Session):
         print(f"OpenAI Error: {e}")
         raise e
 
+@router.post("/admin/import-corpus", response_model=schemas.CorpusImportReport)
+async def import_corpus(
+    corpus_file: UploadFile = File(...),
+    dry_run: bool = Form(False),
+    current_user: schemas.User = Depends(auth.get_current_principal),
+    db: Session = Depends(database.get_db)
+):
+    # A readings collection file (many texts + questions, see app/corpus_import.py).
+    # Re-importing the same file only rewrites the readings that changed.
+    if current_user.username != "admin":
+        raise HTTPException(status_code=403, detail="Not authorized")
+
+    try:
+        raw, _ = await uploads.read_limited(corpus_file, uploads.UPLOAD_MAX_TEXT_BYTES)
+    except uploads.UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=f"El archivo supera el máximo de {e.max_bytes // 1024} KB.")
+    content = raw.decode("utf-8", errors="replace")
+
+    raws = corpus_import.split_collection(content, os.path.basename(corpus_file.filename))
+    if not raws:
+        raise HTTPException(status_code=400, detail="No se ha encontrado ninguna lectura en el archivo.")
+    readings = await run_in_threadpool(corpus_import.parse_readings, raws)
+    report = await run_in_threadpool(corpus_import.import_readings, db, readings, dry_run)
+    print(f"Corpus {corpus_file.filename}: {len(report.created)} created, {len(report.updated)} updated, "
+          f"{len(report.unchanged)} unchanged, {len(report.skipped)} skipped, {len(report.inactive)} inactive")
+    return report
+
 @router.patch("/admin/texts/{text_id}/toggle", response_model=schemas.TextResponse)
-def toggle_text_active(text_id: int, current_user: schemas.User = Depends(auth.get_current_user), db: Session = Depends(database.get_db)):
+def toggle_text_active(text_id: int, current_user: schemas.User = Depends(auth.get_current_principal), db: Session = Depends(database.get_db)):
     if current_user.username != "admin":
         raise HTTPException(status_code=403, detail="Not authorized")
     
@@ -386,11 +466,12 @@ def toggle_text_active(text_id: int, current_user: schemas.User = Depends(auth.g
         
     text.is_active = not text.is_active
     db.commit()
+    catalog_cache.bump_generation(db)
     db.refresh(text)
     return text
 
 @router.delete("/admin/texts/{text_id}")
-def delete_text(text_id: int, current_user: schemas.User = Depends(auth.get_current_user), db: Session = Depends(database.get_db)):
+def delete_text(text_id: int, current_user: schemas.User = Depends(auth.get_current_principal), db: Session = Depends(database.get_db)):
     if current_user.username != "admin":
         raise HTTPException(status_code=403, detail="Not authorized")
     
@@ -400,266 +481,141 @@ def delete_text(text_id: int, current_user: schemas.User = Depends(auth.get_curr
         
     db.delete(text)
     db.commit()
+    catalog_cache.bump_generation(db)
     return {"message": "Text deleted successfully"}
 
 @router.get("/texts/{text_id}/pdf")
-def generate_text_pdf(text_id: int, font_style: str = "imprenta", font_size: str = "L", current_user: schemas.User = Depends(auth.get_current_user), db: Session = Depends(database.get_db)):
+def generate_text_pdf(text_id: int, request: Request, font_style: str = "imprenta", font_size: str = "L", current_user: schemas.User = Depends(auth.get_current_principal), db: Session = Depends(database.get_db)):
     # 1. Fetch Data & Check Access
-    text = db.query(models.Text).filter(models.Text.id == text_id).first()
+    text = catalog_cache.get_snapshot(db).get(text_id)
     if not text:
         raise HTTPException(status_code=404, detail="Text not found")
         
-    # Check Premium/Free (Reuse logic or simplify)
-    is_premium = False
-    if (current_user.access_expires_at and current_user.access_expires_at > datetime.utcnow()) or current_user.username == "admin":
-        is_premium = True
-        
-    first_text = db.query(models.Text).order_by(models.Text.id.asc()).first()
-    is_free = (first_text and text.id == first_text.id)
-    
-    if not is_premium and not is_free:
+    if not entitlements.resolve(db, current_user).can_read(text.id):
         raise HTTPException(status_code=403, detail="Contenido bloqueado.")
 
     # Get Content
     content = ""
     try:
-        with open(text.content_path, "r", encoding="utf-8") as f:
-            content = f.read()
+        content = storage.read_text(db, text.content_path)
     except Exception:
         content = "Error loading content."
 
     # Get Questions
     questions = db.query(models.Question).filter(models.Question.text_id == text_id).all()
 
-    # Uppercase Logic
-    is_uppercase = (font_style == "mayuscula")
-    if is_uppercase:
-        content = content.upper()
-        # Note: Questions and Options need to be uppercased during iteration
-        font_style = "imprenta" # Reset to standard font for rendering
-
-    # 2. Generate PDF
-    from fpdf import FPDF
-    import io
-    from fastapi.responses import StreamingResponse
-
-    class PDF(FPDF):
-        def header(self):
-            # Header always standard
-            self.set_font('Arial', 'B', 15)
-            self.cell(0, 10, 'Aula de Comprensión Lectora', 0, 1, 'C')
-            self.ln(5)
-
-        def footer(self):
-            self.set_y(-15)
-            self.set_font('Arial', 'I', 8)
-            self.cell(0, 10, f'Página {self.page_no()}', 0, 0, 'C')
-
-    pdf = PDF()
-    
-    # Calculate Base Sizes & Offsets
-    # Base (for "L" size - as requested "current")
-    # Title: 24 (was 20)
-    # Text (Imp): 18 (was 16), Text (Lig): 20 (was 18)
-    # Questions: 18 (was 16)
-    # Options: 17 (was 15)
-    
-    # Map input size to offset
-    size_offsets = {
-        "S": -4,
-        "M": -2,
-        "L": 0,
-        "XL": 6 
+    # 2. Same content + questions + options -> same PDF: serve it from the disk cache
+    spec = worksheet_pdf.make_spec(text.title, content, questions, font_style, font_size)
+    key = worksheet_pdf.cache_key(text.id, spec)
+    filename = f"Ficha_{text.filename.replace('.txt', '')}.pdf"
+    headers = {
+        "ETag": f'"{key}"',
+        "Cache-Control": "private, no-cache",
+        "Content-Disposition": f"attachment; filename={filename}",
     }
-    offset = size_offsets.get(font_size, 0)
-    
-    # Font Setup
-    main_font = "Arial"
-    base_text_size = 18 # Increased from 16
-    
-    if font_style == "ligada":
-        try:
-            # Register Custom Font
-            pdf.add_font("AulaCNova", style="", fname="static/fonts/AulaCNova.ttf")
-            main_font = "AulaCNova"
-            base_text_size = 20 # Increased from 18
-        except Exception as e:
-            print(f"Font loading error: {e}")
-            main_font = "Arial"
+    if _etag_matches(request, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
 
-    # Apply Offset
-    s_title = 24 + offset # Increased base from 20
-    s_text = base_text_size + offset
-    s_quest = 18 + offset # Increased base from 16
-    s_opt = 17 + offset # Increased base from 15
-    s_sol = 20 + offset # Increased base from 18
+    path = pdf_cache.get(key)
+    if path is None:
+        # Render in the PDF process pool (CPU-bound, must not hold this process' GIL)
+        try:
+            data, queue_seconds, render_seconds = pdf_renderer.pdf_renderer.render(spec)
+        except pdf_renderer.RendererBusy:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Generando demasiadas fichas a la vez. Inténtalo de nuevo en unos segundos.",
+                headers={"Retry-After": str(pdf_renderer.RETRY_AFTER_SECONDS)},
+            )
+        path = pdf_cache.put(key, data)
+        headers["Server-Timing"] = f"queue;dur={queue_seconds * 1000:.1f}, render;dur={render_seconds * 1000:.1f}"
+    else:
+        headers["Server-Timing"] = 'cache;desc="hit"'
+
+    return FileResponse(path, media_type="application/pdf", headers=headers)
+
+@router.get("/booklet")
+def download_booklet(
+    request: Request,
+    course_level: Optional[str] = None,
+    language: Optional[str] = None,
+    ids: Optional[str] = None,
+    format: str = "pdf",
+    font_style: str = "imprenta",
+    font_size: str = "L",
+    current_user: schemas.User = Depends(auth.get_current_principal),
+    db: Session = Depends(database.get_db)
+):
+    # Worksheets of several texts in one download (see booklets.py):
+    # ?course_level=&language= (readable texts only) or ?ids=3,5,8 (in that order);
+    # format=pdf (one PDF with a table of contents) or format=zip (one PDF per text).
+    if format not in ("pdf", "zip"):
+        raise HTTPException(status_code=400, detail="Formato no válido (pdf o zip).")
+
+    access = entitlements.resolve(db, current_user)
+    snapshot = catalog_cache.get_snapshot(db)
+    if ids:
+        try:
+            text_ids = [int(part) for part in ids.split(",") if part.strip()]
+        except ValueError:
+            raise HTTPException(status_code=400, detail="ids debe ser una lista de números separados por comas.")
+        texts = []
+        for text_id in dict.fromkeys(text_ids):
+            text = snapshot.get(text_id)
+            if not text:
+                raise HTTPException(status_code=404, detail=f"Text {text_id} not found")
+            if not access.can_read(text.id):
+                raise HTTPException(status_code=403, detail="Contenido bloqueado.")
+            texts.append(text)
+    else:
+        texts = [
+            t for t in snapshot.list(include_inactive=access.is_admin, course_level=course_level, language=language)
+            if access.can_read(t.id)
+        ]
 
-    pdf.add_page()
-    
-    # helper for safe text
-    def safe_text(txt):
-        if is_uppercase:
-            txt = txt.upper()
-            
-        if main_font == "Arial":
-            # Replace common incompatible characters
-            replacements = {
-                "–": "-", "—": "-", "“": '"', "”": '"', "‘": "'", "’": "'", "…": "..."
-            }
-            for k, v in replacements.items():
-                txt = txt.replace(k, v)
-                
-            return txt.encode('latin-1', 'replace').decode('latin-1')
-        else:
-            # Custom fonts in fpdf2 usually handle utf-8 better, but let's be safe
-            # Actually fpdf2 handles utf-8 natively with TTF fonts
-            return txt
-
-    # Title
-    pdf.set_font("Arial", "B", s_title) # Increased from 18
-    pdf.multi_cell(0, 10, safe_text(text.title), align='C')
-    pdf.ln(10)
-
-    # Text Content
-    pdf.set_font(main_font, "", s_text)
-    # Adjust line height based on size (approx size * 0.5)
-    lh_text = s_text * 0.5 
-    if lh_text < 6: lh_text = 6
-    
-    pdf.multi_cell(0, lh_text, safe_text(content)) # Increased line height for text
-    pdf.ln(10)
+    if not texts:
+        raise HTTPException(status_code=404, detail="No hay fichas disponibles con estos filtros.")
+    if len(texts) > booklets.BOOKLET_MAX_TEXTS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Máximo {booklets.BOOKLET_MAX_TEXTS} fichas por descarga. Filtra por curso o idioma."
+        )
 
-    # Questions
-    if questions:
-        pdf.add_page()
-        pdf.set_font("Arial", "B", s_quest) # Increased from 14
-        pdf.cell(0, 10, safe_text("Preguntas de Comprensión"), 0, 1)
-        pdf.ln(5)
+    entries = booklets.collect(db, texts, font_style, font_size)
+    name = f"Fichas_{course_level or 'seleccion'}"
 
-        pdf.set_font("Arial", "", s_quest) # Increased from 14
-        
-        # Helper to calculate height
-        def get_text_height(txt, w_available, font_family, font_style, font_size, line_height):
-            pdf.set_font(font_family, font_style, font_size)
-            # fpdf2 multi_cell with split_only=True returns list of lines
-            # If split_only not supported in some context, fallback to simpler estimation
-            try:
-                # split_only=True returns the lines that would be printed
-                lines = pdf.multi_cell(w_available, line_height, txt, split_only=True)
-                return len(lines) * line_height
-            except:
-                # Fallback: approximation
-                string_w = pdf.get_string_width(txt)
-                lines = int(string_w / w_available) + 1
-                return lines * line_height
-
-        for i, q in enumerate(questions):
-            # 1. Calculate Block Height
-            block_height = 0
-            
-            # Question
-            q_str = q.question_content
-            if is_uppercase: q_str = q_str.upper()
-            
-            q_text = f"{i+1}. {safe_text(q_str)}"
-            q_w = pdf.w - pdf.l_margin - pdf.r_margin
-            
-            lh_q = s_quest * 0.5
-            if lh_q < 7: lh_q = 7
-            
-            block_height += get_text_height(q_text, q_w, "Arial", "B", s_quest, lh_q) # Using new size 16, line height 8
-            
-            # Options
-            options = q.options if isinstance(q.options, list) else []
-            opt_w = pdf.w - pdf.l_margin - pdf.r_margin - 10
-            lh_opt = s_opt * 0.5
-            if lh_opt < 6: lh_opt = 6
-            
-            char_code = 97
-            
-            for opt in options:
-                opt_str = opt if not is_uppercase else opt.upper()
-                opt_text = f"{chr(char_code)}) {safe_text(opt_str)}"
-                block_height += get_text_height(opt_text, opt_w, "Arial", "", s_opt, lh_opt) # Using new size 15, line height 8
-                char_code += 1
-            
-            block_height += 5 # Bottom padding
-            
-            # 2. Check Space
-            # page_break_trigger is the Y position where auto-break happens
-            space_left = pdf.page_break_trigger - pdf.get_y()
-            if block_height > space_left:
-                pdf.add_page()
-
-            # 3. Render
-            pdf.set_font("Arial", "B", s_quest) # Increased from 14
-            pdf.multi_cell(0, lh_q, q_text) 
-            
-            pdf.set_font("Arial", "", s_opt) # Increased from 13
-            char_code = 97
-            for opt in options:
-                pdf.set_x(pdf.l_margin + 10) 
-                available_w = pdf.w - pdf.l_margin - pdf.r_margin - 10
-                
-                opt_str = opt if not is_uppercase else opt.upper()
-                pdf.multi_cell(available_w, lh_opt, f"{chr(char_code)}) {safe_text(opt_str)}") # Increased line height
-                char_code += 1
-            pdf.ln(5)
-
-    # Solutions Section
-    if questions:
-        pdf.add_page() # Start solutions on new page for privacy/teacher use
-        
-        # AulaCNova only has regular style registered. Avoid "B" if custom font.
-        sol_style = "B" if main_font == "Arial" else ""
-        pdf.set_font(main_font, sol_style, s_sol)
-        
-        pdf.cell(0, 10, safe_text("SOLUCIONES:"), 0, 1)
-        pdf.ln(5)
-        
-        pdf.set_font(main_font, "", s_text) # Use text size for solutions
-        for i, q in enumerate(questions):
-            # Resolve correct answer
-            opts = q.options if isinstance(q.options, list) else []
-            idx = q.correct_answer
-            
-            answer_text = "N/A"
-            letter = "?"
-            
-            if isinstance(idx, int) and 0 <= idx < len(opts):
-                letter = chr(97 + idx) # 0->a, 1->b...
-                answer_text = opts[idx]
-            
-            if is_uppercase:
-                answer_text = answer_text.upper()
-            
-            full_line_text = f"{i+1}. {letter}) {answer_text}"
-            
-            # Robust width and positioning
-            pdf.set_x(pdf.l_margin)
-            available_w = pdf.w - pdf.l_margin - pdf.r_margin
-            
-            pdf.multi_cell(available_w, lh_text, safe_text(full_line_text))
+    if format == "zip":
+        return StreamingResponse(
+            booklets.stream_zip(entries),
+            media_type="application/zip",
+            headers={"Content-Disposition": f"attachment; filename={name}.zip"}
+        )
 
-    # Output
-    pdf_buffer = io.BytesIO()
-    pdf.output(pdf_buffer)
-    pdf_buffer.seek(0)
-    
-    filename = f"Ficha_{text.filename.replace('.txt', '')}.pdf"
-    
-    return StreamingResponse(
-        pdf_buffer, 
-        media_type="application/pdf", 
-        headers={"Content-Disposition": f"attachment; filename={filename}"}
-    )
+    title = f"Fichas de lectura - {course_level}" if course_level else "Fichas de lectura"
+    key = booklets.booklet_key(title, entries)
+    headers = {
+        "ETag": f'"{key}"',
+        "Cache-Control": "private, no-cache",
+        "Content-Disposition": f"attachment; filename={name}.pdf",
+    }
+    if _etag_matches(request, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    try:
+        path, _ = booklets.booklet_pdf(title, entries)
+    except pdf_renderer.RendererBusy:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Generando demasiadas fichas a la vez. Inténtalo de nuevo en unos segundos.",
+            headers={"Retry-After": str(pdf_renderer.RETRY_AFTER_SECONDS)},
+        )
+    return FileResponse(path, media_type="application/pdf", headers=headers)
 
 
 
 # --- MAGIC WRITER ENDPOINTS ---
 
 @router.post("/admin/magic/story", response_model=schemas.MagicStoryResponse)
-def generate_magic_story(request: schemas.MagicRequest, current_user: schemas.User = Depends(auth.get_current_user)):
+def generate_magic_story(request: schemas.MagicRequest, current_user: schemas.User = Depends(auth.get_current_principal)):
     if current_user.username != "admin":
         raise HTTPException(status_code=403, detail="Not authorized")
 
@@ -741,7 +697,7 @@ def generate_magic_story(request: schemas.MagicRequest, current_user: schemas.Us
 
 
 @router.post("/admin/magic/questions", response_model=schemas.MagicQuestionsResponse)
-def generate_questions_from_text(request: schemas.MagicQuestionsRequest, current_user: schemas.User = Depends(auth.get_current_user)):
+def generate_questions_from_text(request: schemas.MagicQuestionsRequest, current_user: schemas.User = Depends(auth.get_current_principal)):
     if current_user.username != "admin":
         raise HTTPException(status_code=403, detail="Not authorized")
 
@@ -942,11 +898,10 @@ def generate_questions_from_text(request: schemas.MagicQuestionsRequest, current
         raise HTTPException(status_code=500, detail=f"Error generando preguntas: {str(e)}")
 
 @router.post("/admin/magic/save", response_model=schemas.TextResponse)
-def save_magic_story(request: schemas.MagicSaveRequest, current_user: schemas.User = Depends(auth.get_current_user), db: Session = Depends(database.get_db)):
+def save_magic_story(request: schemas.MagicSaveRequest, current_user: schemas.User = Depends(auth.get_current_principal), db: Session = Depends(database.get_db)):
     if current_user.username != "admin":
         raise HTTPException(status_code=403, detail="Not authorized")
 
-    import os
     import re
 
     # 1. Generate Safe Filename
@@ -955,18 +910,12 @@ def save_magic_story(request: schemas.MagicSaveRequest, current_user: schemas.Us
     filename = f"{safe_title}.txt"
     
     # 2. Save File
-    save_dir = f"data/texts/{request.course_level}"
-    os.makedirs(save_dir, exist_ok=True)
-    content_path = f"{save_dir}/{filename}"
-    
     # Check if exists (append random valid if needed? for now just overwrite or error)
-    if os.path.exists(content_path):
+    if storage.exists(db, request.course_level, filename):
         import uuid
         filename = f"{safe_title}_{str(uuid.uuid4())[:4]}.txt"
-        content_path = f"{save_dir}/{filename}"
 
-    with open(content_path, "w", encoding="utf-8") as f:
-        f.write(request.content)
+    content_path = storage.write_text(db, request.course_level, filename, request.content)
 
     # 3. Create DB Entry
     new_text = models.Text(
@@ -981,6 +930,7 @@ def save_magic_story(request: schemas.MagicSaveRequest, current_user: schemas.Us
     db.add(new_text)
     db.commit()
     db.refresh(new_text)
+    catalog_cache.bump_generation(db)
 
     # 4. Save Questions
     for q in request.questions:
@@ -995,3 +945,59 @@ def save_magic_story(request: schemas.MagicSaveRequest, current_user: schemas.Us
     db.commit()
     
     return new_text
+
+
+# --- ASYNC VARIANTS (DATABASE_ASYNC=1) ---
+# Same behaviour as the endpoints above, on the async engine.
+# main.py includes this router before `router`, so these take the paths.
+
+async_router = APIRouter(
+    prefix="/reading",
+    tags=["reading"]
+)
+
+@async_router.get("/texts", response_model=List[schemas.TextResponse])
+async def get_texts_async(
+    course_level: Optional[str] = None,
+    language: Optional[str] = None,
+    completed: Optional[bool] = None,
+    current_user = Depends(auth.get_current_principal_async),
+    db = Depends(database.get_async_db)
+):
+    access = await entitlements.resolve_async(db, current_user)
+    snapshot = await catalog_cache.get_snapshot_async(db)
+    texts = snapshot.list(include_inactive=access.is_admin, course_level=course_level, language=language)
+    attempts_map = await db.run_sync(catalog.latest_scores, current_user.id)
+    return _texts_response(texts, attempts_map, completed, access)
+
+@async_router.get("/texts/{text_id}", response_model=schemas.TextResponse)
+async def get_text_async(text_id: int, current_user = Depends(auth.get_current_principal_async), db = Depends(database.get_async_db)):
+    text = (await catalog_cache.get_snapshot_async(db)).get(text_id)
+    if not text:
+        raise HTTPException(status_code=404, detail="Text not found")
+
+    access = await entitlements.resolve_async(db, current_user)
+    if not access.can_read(text.id):
+        raise HTTPException(status_code=403, detail="Contenido bloqueado. Introduce un código para desbloquear.")
+
+    try:
+        content = await storage.read_text_async(db, text.content_path)
+    except Exception as e:
+        content = _content_error(text, e)
+
+    response = schemas.TextResponse.model_validate(text)
+    response.content = content
+    return response
+
+@async_router.post("/attempt", response_model=schemas.AttemptResponse)
+async def submit_attempt_async(attempt: schemas.AttemptCreate, current_user = Depends(auth.get_current_principal_async), db = Depends(database.get_async_db)):
+    db_attempt = models.ReadingAttempt(
+        user_id=current_user.id,
+        text_id=attempt.text_id,
+        time_spent_seconds=attempt.time_spent_seconds,
+        score=attempt.score
+    )
+    db.add(db_attempt)
+    await db.commit()
+    await db.refresh(db_attempt)
+    return db_attempt
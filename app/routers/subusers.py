@@ -1,8 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from sqlalchemy import select, insert, update
 from sqlalchemy.orm import Session
 from datetime import datetime, timedelta
-from app import models, schemas, auth, security_utils
-from app.database import get_db
+from typing import List
+import csv
+import io
+from app import models, schemas, auth, security_utils, identity_cache, entitlements, refresh_tokens
+from app.database import get_db, get_async_db
 
 router = APIRouter(
     prefix="/subusers",
@@ -13,7 +20,7 @@ router = APIRouter(
 def create_subuser(
     subuser: schemas.SubUserCreate,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_active_user)
+    current_user = Depends(auth.get_current_teacher)
 ):
     # Create sub-user attached to current user
     db_subuser = models.SubUser(
@@ -30,16 +37,176 @@ def create_subuser(
 @router.get("/", response_model=list[schemas.SubUserResponse])
 def read_subusers(
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_active_user)
+    current_user = Depends(auth.get_current_teacher)
 ):
-    return current_user.subusers
+    return db.query(models.SubUser).filter(models.SubUser.parent_user_id == current_user.id).order_by(models.SubUser.id).all()
+
+# --- BULK ONBOARDING (whole class at once) ---
+BULK_MAX_STUDENTS = 500
+
+def _parse_roster_csv(data: bytes) -> List[schemas.RosterEntry]:
+    # Columns: name[,license_key]. Optional header row; "," ";" or tab separated (Excel in Spanish uses ";")
+    text = data.decode("utf-8-sig", errors="replace")
+    first_line = text.split("\n", 1)[0]
+    delimiter = max(",;\t", key=first_line.count)
+    rows = [row for row in csv.reader(io.StringIO(text), delimiter=delimiter) if row and row[0].strip()]
+    if rows and rows[0][0].strip().lower() in ("name", "nombre"):
+        rows = rows[1:]
+    return [
+        schemas.RosterEntry(name=row[0], license_key=row[1] if len(row) > 1 else None)
+        for row in rows
+    ]
+
+async def _read_roster(request: Request) -> List[schemas.RosterEntry]:
+    content_type = request.headers.get("content-type", "")
+    try:
+        if content_type.startswith("multipart/form-data"):
+            upload = (await request.form()).get("file")
+            if upload is None or isinstance(upload, str):
+                raise HTTPException(status_code=400, detail="Falta el fichero (campo 'file')")
+            return _parse_roster_csv(await upload.read())
+        if "json" in content_type:
+            return schemas.SubUserBulkCreate.model_validate_json(await request.body()).students
+        return _parse_roster_csv(await request.body())
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=e.errors(include_url=False, include_context=False))
+
+def _new_login_codes(db: Session, count: int) -> List[str]:
+    # One query per batch to rule out collisions with existing codes
+    codes = {}
+    while len(codes) < count:
+        candidates = {}
+        for _ in range(count - len(codes)):
+            code = security_utils.generate_login_code()
+            candidates[security_utils.get_code_index(code)] = code
+        taken = {
+            index for (index,) in db.query(models.SubUser.login_code_index).filter(
+                models.SubUser.login_code_index.in_(list(candidates))
+            )
+        }
+        codes.update((index, code) for index, code in candidates.items() if index not in taken and index not in codes)
+    return list(codes.values())
+
+def _create_roster(db: Session, parent_user_id: int, roster: List[schemas.RosterEntry]) -> List[dict]:
+    """
+    Creates every student of the roster and activates the licenses given, all in one
+    transaction (nothing is created if any row is wrong). Returns one dict per student.
+    """
+    # 1. Validate everything before writing
+    errors = []
+    names = [entry.name.strip() for entry in roster]
+    keys = [entry.license_key.strip().upper() if entry.license_key and entry.license_key.strip() else None for entry in roster]
+    seen = set()
+    for row, (name, key) in enumerate(zip(names, keys), start=1):
+        if not name:
+            errors.append(f"Fila {row}: falta el nombre")
+        if key and key in seen:
+            errors.append(f"Fila {row}: licencia {key} repetida")
+        seen.add(key)
+
+    licenses = {
+        lic.key: (lic.id, lic.duration_days)
+        for lic in db.query(models.License).filter(
+            models.License.key.in_([k for k in keys if k]),
+            models.License.status == "ACTIVE"
+        )
+    }
+    for row, key in enumerate(keys, start=1):
+        if key and key not in licenses:
+            errors.append(f"Fila {row}: licencia {key} inválida, usada o revocada")
+    if errors:
+        raise HTTPException(status_code=400, detail=errors)
+
+    # 2. Login codes for licensed students, hashed in parallel
+    licensed = [row for row, key in enumerate(keys) if key]
+    codes = _new_login_codes(db, len(licensed))
+    db.rollback() # No connection held while hashing
+    hashes = security_utils.hash_codes(codes)
+
+    # 3. Batched writes
+    now = datetime.utcnow()
+    license_ids = [licenses[keys[row]][0] for row in licensed]
+    claimed = db.execute(
+        update(models.License).where(
+            models.License.id.in_(license_ids),
+            models.License.status == "ACTIVE"
+        ).values(status="USED", activated_at=now)
+    ).rowcount
+    if claimed != len(license_ids):
+        db.rollback()
+        raise HTTPException(status_code=409, detail="Alguna licencia se ha usado mientras tanto. Vuelve a intentarlo.")
+
+    students = [
+        {"parent_user_id": parent_user_id, "name": name, "is_active": True, "access_expires_at": None,
+         "login_code_hash": None, "login_code_index": None, "login_code_display": None}
+        for name in names
+    ]
+    for row, code, code_hash in zip(licensed, codes, hashes):
+        students[row].update(
+            access_expires_at=now + timedelta(days=licenses[keys[row]][1]),
+            login_code_hash=code_hash,
+            login_code_index=security_utils.get_code_index(code),
+            login_code_display=code,
+        )
+    ids = db.execute(
+        insert(models.SubUser).returning(models.SubUser.id, sort_by_parameter_order=True),
+        students
+    ).scalars().all()
+
+    if licensed:
+        db.execute(update(models.License), [
+            {"id": licenses[keys[row]][0], "used_by_subuser_id": ids[row]} for row in licensed
+        ])
+    db.commit()
+
+    return [
+        {"id": subuser_id, "name": student["name"], "login_code": student["login_code_display"],
+         "access_expires_at": student["access_expires_at"]}
+        for subuser_id, student in zip(ids, students)
+    ]
+
+@router.post("/bulk")
+async def create_subusers_bulk(
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user = Depends(auth.get_current_teacher)
+):
+    """
+    Roster as CSV (body or multipart field `file`: name[,license_key]) or JSON
+    ({"students": [{"name": ..., "license_key": ...}]}). Streams back a CSV with
+    the id, name and login code of every student created.
+    """
+    roster = await _read_roster(request)
+    if not roster:
+        raise HTTPException(status_code=400, detail="La lista está vacía")
+    if len(roster) > BULK_MAX_STUDENTS:
+        raise HTTPException(status_code=400, detail=f"Máximo {BULK_MAX_STUDENTS} alumnos/as por lista")
+
+    created = await run_in_threadpool(_create_roster, db, current_user.id, roster)
+
+    def rows():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(["id", "nombre", "codigo_acceso", "acceso_hasta"])
+        for student in created:
+            expires = student["access_expires_at"]
+            writer.writerow([student["id"], student["name"], student["login_code"] or "", expires.date().isoformat() if expires else ""])
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+    return StreamingResponse(
+        rows(),
+        media_type="text/csv",
+        headers={"Content-Disposition": "attachment; filename=codigos_alumnos.csv"}
+    )
 
 @router.post("/{subuser_id}/license")
 def activate_license(
     subuser_id: int,
     license_req: schemas.LicenseActivate,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_active_user)
+    current_user = Depends(auth.get_current_teacher)
 ):
     # Verify subuser belongs to current user
     subuser = db.query(models.SubUser).filter(
@@ -81,6 +248,8 @@ def activate_license(
     subuser.login_code_display = raw_code # Store for display
     
     db.commit()
+    identity_cache.invalidate(subuser)
+    entitlements.invalidate(subuser)
     
     return {
         "message": "License activated successfully",
@@ -92,7 +261,7 @@ def activate_license(
 def delete_subuser(
     subuser_id: int,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_active_user)
+    current_user = Depends(auth.get_current_teacher)
 ):
     subuser = db.query(models.SubUser).filter(
         models.SubUser.id == subuser_id,
@@ -109,8 +278,11 @@ def delete_subuser(
         lic.used_by_subuser_id = None
         # lic.status = "REVOKED" # Optional: could revoke, or leave as USED to prevent reuse
         
+    subject = identity_cache.subject_for(subuser)
+    refresh_tokens.revoke_subject(db, subject)
     db.delete(subuser)
     db.commit()
+    identity_cache.invalidate(subject)
     return None
 
 @router.put("/{subuser_id}", response_model=schemas.SubUserResponse)
@@ -118,7 +290,7 @@ def update_subuser(
     subuser_id: int,
     subuser_update: schemas.SubUserUpdate,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_active_user)
+    current_user = Depends(auth.get_current_teacher)
 ):
     subuser = db.query(models.SubUser).filter(
         models.SubUser.id == subuser_id,
@@ -132,3 +304,22 @@ def update_subuser(
     db.commit()
     db.refresh(subuser)
     return subuser
+
+
+# --- ASYNC VARIANTS (DATABASE_ASYNC=1) ---
+# main.py includes this router before `router`, so these take the paths.
+
+async_router = APIRouter(
+    prefix="/subusers",
+    tags=["subusers"],
+)
+
+@async_router.get("/", response_model=list[schemas.SubUserResponse])
+async def read_subusers_async(
+    db = Depends(get_async_db),
+    current_user = Depends(auth.get_current_teacher_async)
+):
+    result = await db.execute(
+        select(models.SubUser).where(models.SubUser.parent_user_id == current_user.id).order_by(models.SubUser.id)
+    )
+    return result.scalars().all()
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import List, Optional, Dict
 from datetime import datetime
 
 class UserBase(BaseModel):
@@ -22,6 +22,10 @@ class User(UserBase):
 class Token(BaseModel):
     access_token: str
     token_type: str
+    refresh_token: Optional[str] = None
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
 
 class TokenData(BaseModel):
     username: Optional[str] = None
@@ -55,6 +59,26 @@ class TextResponse(TextBase):
     class Config:
         from_attributes = True
 
+class TextUploadResponse(TextResponse):
+    # POST /reading/admin/upload: questions block warnings (see app/question_parser.py)
+    diagnostics: List[str] = []
+
+class ReadingBundle(BaseModel):
+    # Everything the reading room / quiz needs in one response
+    text: TextResponse
+    questions: List[QuestionResponse]
+    previous_score: Optional[float] = None
+
+class CatalogFacets(BaseModel):
+    course_level: Dict[str, int] = {}
+    language: Dict[str, int] = {}
+    completed: Dict[str, int] = {}
+
+class TextCatalogPage(BaseModel):
+    items: List[TextResponse]
+    next_cursor: Optional[int] = None # Pass as ?after= to get the next page
+    facets: Optional[CatalogFacets] = None
+
 class TextUpdate(BaseModel):
     course_level: Optional[str] = None
     language: Optional[str] = None
@@ -99,9 +123,29 @@ class SubUserResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class InvitationCodeRow(BaseModel):
+    code: str
+    is_used: bool
+    used_at: Optional[datetime] = None
+    created_at: Optional[datetime] = None
+    used_by: Optional[str] = None
+    user_email: Optional[str] = None
+    expires_at: Optional[datetime] = None
+
+class InvitationCodePage(BaseModel):
+    items: List[InvitationCodeRow]
+    next_cursor: Optional[str] = None
+
 class LicenseActivate(BaseModel):
     license_key: str
 
+class RosterEntry(BaseModel):
+    name: str
+    license_key: Optional[str] = None
+
+class SubUserBulkCreate(BaseModel):
+    students: List[RosterEntry]
+
 class LoginCodeRequest(BaseModel):
     code: str
 
@@ -139,3 +183,16 @@ class MagicQuestionsRequest(BaseModel):
 
 class MagicQuestionsResponse(BaseModel):
     questions: List[QuestionDraft]
+
+class CorpusImportReport(BaseModel):
+    # POST /reading/admin/import-corpus (see app/corpus_import.py)
+    readings: int
+    created: List[str]
+    updated: List[str]
+    unchanged: List[str]
+    skipped: List[str]
+    inactive: List[str] # Written without a complete answer key (hidden from students)
+    diagnostics: List[str]
+
+    class Config:
+        from_attributes = True
@@ -2,6 +2,11 @@ import secrets
 import string
 import hmac
 import hashlib
+import os
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import List
 from passlib.context import CryptContext
 
 # Configuration
@@ -39,6 +44,28 @@ def hash_code(code: str) -> str:
     """
     return PWD_CONTEXT.hash(code)
 
+# Process pool for bulk hashing (classroom onboarding). "spawn" because the
+# caller is a threaded server process.
+CODE_HASH_WORKERS = int(os.getenv("CODE_HASH_WORKERS", str(os.cpu_count() or 1)))
+_hash_pool = None
+_hash_pool_lock = threading.Lock()
+
+def hash_codes(codes: List[str]) -> List[str]:
+    """
+    Hashes many login codes, in parallel on a process pool when there is more than one CPU.
+    Same order as `codes`.
+    """
+    global _hash_pool
+    if CODE_HASH_WORKERS <= 1 or len(codes) < 2:
+        return [hash_code(code) for code in codes]
+    with _hash_pool_lock:
+        if _hash_pool is None:
+            _hash_pool = ProcessPoolExecutor(
+                max_workers=CODE_HASH_WORKERS, mp_context=multiprocessing.get_context("spawn")
+            )
+    chunksize = max(1, len(codes) // (CODE_HASH_WORKERS * 4))
+    return list(_hash_pool.map(hash_code, codes, chunksize=chunksize))
+
 def verify_code(plain_code: str, hashed_code: str) -> bool:
     """
     Verifies a plain login code against the stored hash.
@@ -56,44 +83,24 @@ def get_code_index(code: str) -> str:
         hashlib.sha256
     ).hexdigest()
 
+from typing import Optional
 from sqlalchemy.orm import Session
-from app.models import LoginAttempt
-from datetime import datetime, timedelta
+from app.rate_limit import login_limiter
+from app.attempt_log import attempt_log
 
-MAX_ATTEMPTS = 6
-BLOCK_DURATION_MINUTES = 5
-
-def check_rate_limit(db: Session, ip_address: str, code_index: str) -> bool:
+def check_rate_limit(db: Optional[Session], ip_address: str, code_index: str) -> bool:
     """
     Checks if the IP or Code Index is currently blocked.
     Returns True if ALLOWED, False if BLOCKED.
+    Limits and backend: app/rate_limit.py (only the db backend uses `db`).
     """
-    # 1. Count failures in the last X minutes
-    # Simple logic: Fixed window backoff for now (as per req: 5 min initial)
-    # Ideally we'd scan backwards to find the last successful login or start of block.
-    
-    cutoff = datetime.utcnow() - timedelta(minutes=BLOCK_DURATION_MINUTES)
-    
-    attempts = db.query(LoginAttempt).filter(
-        LoginAttempt.login_code_index == code_index,
-        LoginAttempt.success == False,
-        LoginAttempt.timestamp > cutoff
-    ).count()
-    
-    if attempts >= MAX_ATTEMPTS:
-        return False
-        
-    return True
+    return login_limiter.allow(db, ip_address, code_index)
 
-def record_login_attempt(db: Session, ip_address: str, code_index: str, success: bool):
-    """
-    Logs a login attempt to the database.
-    """
-    attempt = LoginAttempt(
-        ip_address=ip_address,
-        login_code_index=code_index,
-        success=success,
-        timestamp=datetime.utcnow()
-    )
-    db.add(attempt)
-    db.commit()
+def record_login_attempt(db: Optional[Session], ip_address: str, code_index: str, success: bool):
+    """
+    Counts failures for the rate limiter and queues the attempt for the
+    login_attempts audit log (written in batches, see app/attempt_log.py).
+    """
+    if not success:
+        login_limiter.record_failure(db, ip_address, code_index)
+    attempt_log.record(ip_address, code_index, success)
@@ -0,0 +1,190 @@
+import gzip
+import hashlib
+import os
+import tempfile
+from dataclasses import dataclass
+from datetime import datetime
+from typing import TYPE_CHECKING, Optional
+from sqlalchemy.orm import Session
+from fastapi.concurrency import run_in_threadpool
+from . import models
+from .content_cache import text_cache
+
+try:
+    import zstandard
+except ImportError: # Optional: fall back to gzip
+    zstandard = None
+
+if TYPE_CHECKING: # sqlalchemy.ext.asyncio needs greenlet, only required with DATABASE_ASYNC=1
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+# Where text bodies live.
+# Text.content_path is either a filesystem path ("data/texts/1P/x.txt")
+# or a blob reference ("blob:<sha256>") into the text_blobs table.
+# Reads dispatch on the value, so both kinds can coexist during a migration.
+# New texts go to the backend chosen with TEXT_STORAGE_BACKEND ("filesystem" or "db").
+
+BLOB_PREFIX = "blob:"
+TEXTS_ROOT = "data/texts"
+
+
+def compress(data: bytes):
+    if zstandard is not None:
+        return "zstd", zstandard.ZstdCompressor(level=10).compress(data)
+    return "gzip", gzip.compress(data, compresslevel=9)
+
+
+def decompress(codec: str, data: bytes) -> bytes:
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("Blob is zstd-compressed but 'zstandard' is not installed")
+        return zstandard.ZstdDecompressor().decompress(data)
+    if codec == "gzip":
+        return gzip.decompress(data)
+    return data
+
+
+@dataclass
+class StagedText:
+    content_path: str
+    temp_path: Optional[str] = None # Filesystem only: the body until publish()
+
+    def publish(self):
+        # Atomic rename: readers see the old file or the new one, never a half-written text
+        if self.temp_path:
+            os.replace(self.temp_path, self.content_path)
+            self.temp_path = None
+
+    def discard(self):
+        if self.temp_path:
+            try:
+                os.remove(self.temp_path)
+            except FileNotFoundError:
+                pass
+            self.temp_path = None
+
+
+class FilesystemBackend:
+    name = "filesystem"
+
+    def stage(self, db: Session, course_level: str, filename: str, content: str) -> StagedText:
+        save_dir = f"{TEXTS_ROOT}/{course_level}"
+        os.makedirs(save_dir, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=save_dir, suffix=".part")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(content)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+        return StagedText(f"{save_dir}/{filename}", temp_path)
+
+    def write(self, db: Session, course_level: str, filename: str, content: str) -> str:
+        staged = self.stage(db, course_level, filename, content)
+        try:
+            staged.publish()
+        except BaseException:
+            staged.discard()
+            raise
+        return staged.content_path
+
+    def read(self, db: Session, content_path: str) -> str:
+        return text_cache.read(content_path)
+
+
+class DatabaseBlobBackend:
+    name = "db"
+
+    def put_bytes(self, db: Session, data: bytes) -> str:
+        """
+        Stores the bytes (once per distinct content) and returns the sha256.
+        Does not commit.
+        """
+        sha = hashlib.sha256(data).hexdigest()
+        exists = db.query(models.TextBlob.sha256).filter(models.TextBlob.sha256 == sha).first()
+        if not exists:
+            codec, packed = compress(data)
+            db.add(models.TextBlob(sha256=sha, codec=codec, size=len(data), data=packed, created_at=datetime.utcnow()))
+            db.flush()
+        return sha
+
+    def stage(self, db: Session, course_level: str, filename: str, content: str) -> StagedText:
+        # The blob is only flushed: it is committed (or rolled back) with the caller's rows
+        return StagedText(f"{BLOB_PREFIX}{self.put_bytes(db, content.encode('utf-8'))}")
+
+    def write(self, db: Session, course_level: str, filename: str, content: str) -> str:
+        staged = self.stage(db, course_level, filename, content)
+        db.commit()
+        return staged.content_path
+
+    def read(self, db: Session, content_path: str) -> str:
+        sha = content_path[len(BLOB_PREFIX):]
+
+        def load():
+            blob = db.query(models.TextBlob).filter(models.TextBlob.sha256 == sha).first()
+            if not blob:
+                raise FileNotFoundError(f"Blob not found: {sha}")
+            return decompress(blob.codec, blob.data).decode("utf-8")
+
+        # Content-addressed: safe to cache without validation
+        return text_cache.read_immutable(content_path, load)
+
+
+BACKENDS = {
+    FilesystemBackend.name: FilesystemBackend(),
+    DatabaseBlobBackend.name: DatabaseBlobBackend(),
+}
+
+
+def get_backend():
+    name = os.getenv("TEXT_STORAGE_BACKEND", FilesystemBackend.name)
+    if name not in BACKENDS:
+        raise RuntimeError(f"Unknown TEXT_STORAGE_BACKEND: {name}")
+    return BACKENDS[name]
+
+
+def is_blob(content_path: str) -> bool:
+    return bool(content_path) and content_path.startswith(BLOB_PREFIX)
+
+
+def read_text(db: Session, content_path: str) -> str:
+    """
+    Reads a text body, whatever backend it was written with.
+    """
+    if is_blob(content_path):
+        return BACKENDS[DatabaseBlobBackend.name].read(db, content_path)
+    return BACKENDS[FilesystemBackend.name].read(db, content_path)
+
+
+async def read_text_async(db: "AsyncSession", content_path: str) -> str:
+    """
+    read_text() for the async engine: blob lookups run on the async session,
+    file reads in the threadpool so they don't block the event loop.
+    """
+    if is_blob(content_path):
+        return await db.run_sync(read_text, content_path)
+    return await run_in_threadpool(text_cache.read, content_path)
+
+
+def write_text(db: Session, course_level: str, filename: str, content: str) -> str:
+    """
+    Stores a text body with the configured backend and returns its content_path.
+    """
+    return get_backend().write(db, course_level, filename, content)
+
+
+def stage_text(db: Session, course_level: str, filename: str, content: str) -> StagedText:
+    """
+    write_text() in two steps, for a body that belongs to rows not committed yet: commit
+    them, then publish() the staged text, or discard() it if the commit fails.
+    """
+    return get_backend().stage(db, course_level, filename, content)
+
+
+def exists(db: Session, course_level: str, filename: str) -> bool:
+    """
+    True if a text with this filename is already stored (filenames are unique).
+    """
+    if db.query(models.Text.id).filter(models.Text.filename == filename).first():
+        return True
+    return os.path.exists(f"{TEXTS_ROOT}/{course_level}/{filename}")
@@ -0,0 +1,90 @@
+import hashlib
+import os
+import uuid
+from dataclasses import dataclass
+from typing import Tuple
+import aiofiles
+import aiofiles.os
+from fastapi import UploadFile
+
+# Admin uploads (/reading/admin/upload): files are read in chunks without blocking the
+# event loop, hashed (SHA-256) as they stream in and cut off as soon as they pass the limit.
+# Files on disk are first written to a temp file next to the destination and renamed into
+# place only once the text is saved, so a failed or partial upload never replaces a file.
+
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+UPLOAD_MAX_TEXT_BYTES = int(os.getenv("UPLOAD_MAX_TEXT_BYTES", str(2 * 1024 * 1024)))
+UPLOAD_MAX_AUDIO_BYTES = int(os.getenv("UPLOAD_MAX_AUDIO_BYTES", str(100 * 1024 * 1024)))
+
+
+class UploadTooLarge(Exception):
+    def __init__(self, filename: str, max_bytes: int):
+        super().__init__(f"{filename} exceeds {max_bytes} bytes")
+        self.filename = filename
+        self.max_bytes = max_bytes
+
+
+@dataclass
+class StagedFile:
+    temp_path: str
+    path: str
+    size: int
+    sha256: str
+
+    async def publish(self):
+        # Atomic on the same filesystem: readers see the old file or the new one
+        await aiofiles.os.replace(self.temp_path, self.path)
+
+    async def discard(self):
+        try:
+            await aiofiles.os.remove(self.temp_path)
+        except FileNotFoundError:
+            pass
+
+
+async def read_limited(upload: UploadFile, max_bytes: int) -> Tuple[bytes, str]:
+    """
+    Whole upload in memory (for small files): returns (data, sha256).
+    Raises UploadTooLarge.
+    """
+    digest = hashlib.sha256()
+    chunks = []
+    size = 0
+    while True:
+        chunk = await upload.read(UPLOAD_CHUNK_SIZE)
+        if not chunk:
+            break
+        size += len(chunk)
+        if size > max_bytes:
+            raise UploadTooLarge(upload.filename, max_bytes)
+        digest.update(chunk)
+        chunks.append(chunk)
+    return b"".join(chunks), digest.hexdigest()
+
+
+async def stage(upload: UploadFile, path: str, max_bytes: int) -> StagedFile:
+    """
+    Streams the upload to a temp file in the destination directory.
+    Call publish() to move it into `path`, or discard(). Raises UploadTooLarge.
+    """
+    directory = os.path.dirname(path) or "."
+    await aiofiles.os.makedirs(directory, exist_ok=True)
+    temp_path = os.path.join(directory, f".{os.path.basename(path)}.{uuid.uuid4().hex}.part")
+
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        async with aiofiles.open(temp_path, "wb") as out:
+            while True:
+                chunk = await upload.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLarge(upload.filename, max_bytes)
+                digest.update(chunk)
+                await out.write(chunk)
+    except BaseException:
+        await StagedFile(temp_path, path, size, "").discard()
+        raise
+    return StagedFile(temp_path, path, size, digest.hexdigest())
@@ -0,0 +1,262 @@
+import hashlib
+import json
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+# Worksheet PDF (text + questions + solutions page), used by /reading/texts/{id}/pdf and /reading/booklet.
+# The output depends only on the RenderSpec, so specs are also the cache key (see pdf_cache.py).
+
+FONT_STYLES = ("imprenta", "ligada", "mayuscula")
+
+# Map input size to offset
+# Base (for "L" size - as requested "current")
+SIZE_OFFSETS = {
+    "S": -4,
+    "M": -2,
+    "L": 0,
+    "XL": 6
+}
+
+
+@dataclass(frozen=True)
+class RenderSpec:
+    title: str
+    content: str
+    questions: Tuple[Tuple[str, Tuple[str, ...], int], ...] # (question_content, options, correct_answer)
+    font_style: str = "imprenta"
+    font_size: str = "L"
+
+
+def make_spec(title: str, content: str, questions, font_style: str, font_size: str) -> RenderSpec:
+    """
+    Builds a spec from a Text's title/content and its Question rows.
+    Unknown font_style / font_size fall back to the defaults (as the renderer always did).
+    """
+    return RenderSpec(
+        title=title,
+        content=content,
+        questions=tuple(
+            (q.question_content, tuple(q.options if isinstance(q.options, list) else []), q.correct_answer)
+            for q in questions
+        ),
+        font_style=font_style if font_style in FONT_STYLES else "imprenta",
+        font_size=font_size if font_size in SIZE_OFFSETS else "L",
+    )
+
+
+def cache_key(text_id: int, spec: RenderSpec) -> str:
+    """
+    (text_id, content hash, questions hash, font_style, font_size), as a file-name-safe string.
+    The title is hashed with the content: renaming a text changes the PDF too.
+    """
+    content_hash = hashlib.sha256(f"{spec.title}\0{spec.content}".encode("utf-8")).hexdigest()[:16]
+    questions_hash = hashlib.sha256(
+        json.dumps(spec.questions, ensure_ascii=False).encode("utf-8")
+    ).hexdigest()[:16]
+    return f"{text_id}-{content_hash}-{questions_hash}-{spec.font_style}-{spec.font_size}"
+
+
+def _new_document():
+    from fpdf import FPDF
+
+    class PDF(FPDF):
+        def header(self):
+            # Header always standard
+            self.set_font('Arial', 'B', 15)
+            self.cell(0, 10, 'Aula de Comprensión Lectora', 0, 1, 'C')
+            self.ln(5)
+
+        def footer(self):
+            self.set_y(-15)
+            self.set_font('Arial', 'I', 8)
+            self.cell(0, 10, f'Página {self.page_no()}', 0, 0, 'C')
+
+    return PDF()
+
+
+def _to_latin1(txt: str) -> str:
+    # Core fonts (Arial) only cover latin-1: replace common incompatible characters
+    replacements = {
+        "–": "-", "—": "-", "“": '"', "”": '"', "‘": "'", "’": "'", "…": "..."
+    }
+    for k, v in replacements.items():
+        txt = txt.replace(k, v)
+
+    return txt.encode('latin-1', 'replace').decode('latin-1')
+
+
+def render(spec: RenderSpec) -> bytes:
+    pdf = _new_document()
+    _draw_worksheet(pdf, spec)
+    return bytes(pdf.output())
+
+
+def render_booklet(title: str, specs) -> bytes:
+    """
+    Several worksheets in one PDF, each one starting on a new page,
+    after a table of contents (clickable, also in the PDF outline).
+    """
+    from fpdf import TextStyle
+    from fpdf.outline import TableOfContents
+
+    pdf = _new_document()
+    toc = TableOfContents(text_style=TextStyle(font_family="Arial", font_size_pt=12))
+
+    def render_toc(pdf, outline):
+        pdf.set_x(pdf.l_margin)
+        pdf.set_font("Arial", "B", 20)
+        pdf.multi_cell(0, 10, _to_latin1(title), align='C', new_x="LMARGIN", new_y="NEXT")
+        pdf.ln(5)
+        toc.render_toc(pdf, outline)
+
+    pdf.add_page()
+    pdf.insert_toc_placeholder(render_toc, allow_extra_pages=True)
+    for spec in specs:
+        _draw_worksheet(pdf, spec, section=_to_latin1(spec.title))
+    return bytes(pdf.output())
+
+
+def _draw_worksheet(pdf, spec: RenderSpec, section: Optional[str] = None):
+    # Adds the worksheet's pages to `pdf`. `section`: its table of contents entry
+    from . import pdf_fonts, pdf_layout
+
+    content = spec.content
+    font_style = spec.font_style
+    questions = spec.questions
+
+    # Uppercase Logic
+    is_uppercase = (font_style == "mayuscula")
+    if is_uppercase:
+        content = content.upper()
+        # Note: Questions and Options need to be uppercased during iteration
+        font_style = "imprenta" # Reset to standard font for rendering
+
+    # Calculate Base Sizes & Offsets
+    # Title: 24 (was 20)
+    # Text (Imp): 18 (was 16), Text (Lig): 20 (was 18)
+    # Questions: 18 (was 16)
+    # Options: 17 (was 15)
+    offset = SIZE_OFFSETS.get(spec.font_size, 0)
+
+    # Font Setup
+    main_font = "Arial"
+    base_text_size = 18 # Increased from 16
+
+    if font_style == "ligada":
+        try:
+            # Register Custom Font (parsed once per process, see pdf_fonts.py)
+            if pdf_fonts.aula_font.fontkey not in pdf.fonts:
+                pdf_fonts.aula_font.add_to(pdf)
+            main_font = pdf_fonts.AULA_FONT_FAMILY
+            base_text_size = 20 # Increased from 18
+        except Exception as e:
+            print(f"Font loading error: {e}")
+            main_font = "Arial"
+
+    # Apply Offset
+    s_title = 24 + offset # Increased base from 20
+    s_text = base_text_size + offset
+    s_quest = 18 + offset # Increased base from 16
+    s_opt = 17 + offset # Increased base from 15
+    s_sol = 20 + offset # Increased base from 18
+
+    pdf.add_page()
+    if section:
+        pdf.start_section(section)
+
+    # helper for safe text
+    def safe_text(txt):
+        if is_uppercase:
+            txt = txt.upper()
+
+        if main_font == "Arial":
+            return _to_latin1(txt)
+        else:
+            # Custom fonts in fpdf2 usually handle utf-8 better, but let's be safe
+            # Actually fpdf2 handles utf-8 natively with TTF fonts
+            return txt
+
+    # Title
+    pdf.set_font("Arial", "B", s_title) # Increased from 18
+    pdf.multi_cell(0, 10, safe_text(spec.title), align='C')
+    pdf.ln(10)
+
+    # Text Content
+    pdf.set_font(main_font, "", s_text)
+    # Adjust line height based on size (approx size * 0.5)
+    lh_text = s_text * 0.5
+    if lh_text < 6: lh_text = 6
+
+    pdf.multi_cell(0, lh_text, safe_text(content)) # Increased line height for text
+    pdf.ln(10)
+
+    # Questions
+    if questions:
+        pdf.add_page()
+        pdf.set_font("Arial", "B", s_quest) # Increased from 14
+        pdf.cell(0, 10, safe_text("Preguntas de Comprensión"), 0, 1)
+        pdf.ln(5)
+
+        pdf.set_font("Arial", "", s_quest) # Increased from 14
+
+        lh_q = s_quest * 0.5
+        if lh_q < 7: lh_q = 7
+        lh_opt = s_opt * 0.5
+        if lh_opt < 6: lh_opt = 6
+
+        q_w = pdf.w - pdf.l_margin - pdf.r_margin
+        opt_w = q_w - 10
+
+        for i, (question_content, options, _) in enumerate(questions):
+            # 1. Lay out the block once (see pdf_layout.py)
+            q_block = pdf_layout.shape(pdf, f"{i+1}. {safe_text(question_content)}", "Arial", "B", s_quest, q_w, lh_q)
+            opt_blocks = [
+                pdf_layout.shape(pdf, f"{chr(97 + j)}) {safe_text(opt)}", "Arial", "", s_opt, opt_w, lh_opt)
+                for j, opt in enumerate(options)
+            ]
+            block_height = q_block.height + sum(b.height for b in opt_blocks) + 5 # Bottom padding
+
+            # 2. Check Space
+            # page_break_trigger is the Y position where auto-break happens
+            space_left = pdf.page_break_trigger - pdf.get_y()
+            if block_height > space_left:
+                pdf.add_page()
+
+            # 3. Render the same lines
+            pdf_layout.draw(pdf, q_block)
+            for opt_block in opt_blocks:
+                pdf.set_x(pdf.l_margin + 10)
+                pdf_layout.draw(pdf, opt_block)
+            pdf.ln(5)
+
+    # Solutions Section
+    if questions:
+        pdf.add_page() # Start solutions on new page for privacy/teacher use
+
+        # AulaCNova only has regular style registered. Avoid "B" if custom font.
+        sol_style = "B" if main_font == "Arial" else ""
+        pdf.set_font(main_font, sol_style, s_sol)
+
+        pdf.cell(0, 10, safe_text("SOLUCIONES:"), 0, 1)
+        pdf.ln(5)
+
+        pdf.set_font(main_font, "", s_text) # Use text size for solutions
+        for i, (_, opts, idx) in enumerate(questions):
+            # Resolve correct answer
+            answer_text = "N/A"
+            letter = "?"
+
+            if isinstance(idx, int) and 0 <= idx < len(opts):
+                letter = chr(97 + idx) # 0->a, 1->b...
+                answer_text = opts[idx]
+
+            if is_uppercase:
+                answer_text = answer_text.upper()
+
+            full_line_text = f"{i+1}. {letter}) {answer_text}"
+
+            # Robust width and positioning
+            pdf.set_x(pdf.l_margin)
+            available_w = pdf.w - pdf.l_margin - pdf.r_margin
+
+            pdf.multi_cell(available_w, lh_text, safe_text(full_line_text))
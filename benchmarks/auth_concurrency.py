@@ -0,0 +1,96 @@
+"""
+Requests/second of an authenticated endpoint (/auth/me) at several concurrency levels,
+comparing the old `async def get_current_user` (sync queries on the event loop)
+with the current threadpool dependency.
+
+Usage (from the repo root, needs httpx):
+    python benchmarks/auth_concurrency.py --requests 400 --db-latency-ms 5
+
+--db-latency-ms adds a sleep to every SQL statement to mimic a network round trip
+to Postgres (SQLite on local disk is too fast to show the difference).
+
+Keep --concurrency below the SQLAlchemy pool size (5 + 10 overflow): above it the old
+dependency blocks the event loop waiting for a connection that only the loop can
+release, and the run stalls until the pool timeout (30s).
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+_db_file = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+os.environ["DATABASE_URL"] = f"sqlite:///{_db_file.name}"
+
+import httpx
+from fastapi import Depends
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app import auth, database, models
+from app.main import app
+
+
+def setup_user():
+    db = database.SessionLocal()
+    db.add(models.User(username="bench", hashed_password="x", course_level="1P"))
+    db.commit()
+    db.close()
+    return auth.create_access_token({"sub": "bench"})
+
+
+async def legacy_get_current_user(token: str = Depends(auth.oauth2_scheme), db: Session = Depends(database.get_db)):
+    # What the dependency used to be: async def running blocking queries on the loop
+    return auth.get_current_user(token, db)
+
+
+async def run_level(client, token, concurrency, total):
+    headers = {"Authorization": f"Bearer {token}"}
+    queue = asyncio.Queue()
+    for _ in range(total):
+        queue.put_nowait(None)
+
+    async def worker():
+        while not queue.empty():
+            queue.get_nowait()
+            response = await client.get("/auth/me", headers=headers)
+            assert response.status_code == 200, response.text
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return total / (time.perf_counter() - start)
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", default="1,4,8,12")
+    parser.add_argument("--db-latency-ms", type=float, default=5.0)
+    args = parser.parse_args()
+
+    if args.db_latency_ms:
+        delay = args.db_latency_ms / 1000
+
+        @event.listens_for(database.engine, "before_cursor_execute")
+        def _latency(*_):
+            time.sleep(delay)
+
+    token = setup_user()
+    levels = [int(x) for x in args.concurrency.split(",")]
+    transport = httpx.ASGITransport(app=app)
+
+    print(f"{'concurrency':>11} | {'before (rps)':>12} | {'after (rps)':>11}")
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for level in levels:
+            app.dependency_overrides[auth.get_current_user] = legacy_get_current_user
+            before = await run_level(client, token, level, args.requests)
+            app.dependency_overrides.clear()
+            after = await run_level(client, token, level, args.requests)
+            print(f"{level:>11} | {before:>12.1f} | {after:>11.1f}")
+
+    os.unlink(_db_file.name)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
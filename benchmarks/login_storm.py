@@ -0,0 +1,113 @@
+"""
+Classroom login storm: N students POST /auth/login-code at the same moment.
+Reports p50/p99 latency of the logins and of a static file requested
+during the storm, plus the code_verifier queue metrics.
+
+Usage (from the repo root, needs httpx):
+    python benchmarks/login_storm.py --logins 500
+    CODE_VERIFY_MAX_PENDING=64 python benchmarks/login_storm.py --logins 500
+
+--bcrypt-rounds only changes the cost of the benchmark's own codes (production
+hashes use passlib's default, 12). Lower it to get quick runs on a small machine.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+_db_file = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+os.environ["DATABASE_URL"] = f"sqlite:///{_db_file.name}"
+
+import httpx
+from app import database, models, security_utils
+from app.code_verifier import code_verifier
+from app.main import app
+
+
+def _hash(args):
+    code, rounds = args
+    return security_utils.PWD_CONTEXT.hash(code, rounds=rounds)
+
+
+def setup_students(count, rounds):
+    codes = [security_utils.generate_login_code() for _ in range(count)]
+    with ProcessPoolExecutor() as pool:
+        hashes = list(pool.map(_hash, [(code, rounds) for code in codes], chunksize=8))
+
+    db = database.SessionLocal()
+    teacher = models.User(username="storm-teacher", hashed_password="x", course_level="3P")
+    db.add(teacher)
+    db.flush()
+    db.add_all([
+        models.SubUser(
+            parent_user_id=teacher.id,
+            name=f"Alumno {i}",
+            login_code_hash=code_hash,
+            login_code_index=security_utils.get_code_index(code),
+        )
+        for i, (code, code_hash) in enumerate(zip(codes, hashes))
+    ])
+    db.commit()
+    db.close()
+    return codes
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * p / 100), len(ordered) - 1)]
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--logins", type=int, default=500)
+    parser.add_argument("--bcrypt-rounds", type=int, default=12)
+    parser.add_argument("--probe-interval-ms", type=float, default=50.0)
+    args = parser.parse_args()
+
+    print(f"Hashing {args.logins} codes (rounds={args.bcrypt_rounds})...")
+    codes = setup_students(args.logins, args.bcrypt_rounds)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        login_times, statuses, probe_times = [], {}, []
+        storm_over = asyncio.Event()
+
+        async def login(code):
+            start = time.perf_counter()
+            response = await client.post("/auth/login-code", json={"code": code})
+            login_times.append(time.perf_counter() - start)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+        async def probe():
+            while not storm_over.is_set():
+                start = time.perf_counter()
+                await client.get("/static/css/styles.css")
+                probe_times.append(time.perf_counter() - start)
+                await asyncio.sleep(args.probe_interval_ms / 1000)
+
+        probe_task = asyncio.create_task(probe())
+        start = time.perf_counter()
+        await asyncio.gather(*(login(code) for code in codes))
+        elapsed = time.perf_counter() - start
+        storm_over.set()
+        await probe_task
+
+    ms = lambda seconds: f"{seconds * 1000:8.1f} ms"
+    print(f"\n{args.logins} logins in {elapsed:.1f}s ({args.logins / elapsed:.1f}/s), statuses: {statuses}")
+    print(f"login  p50 {ms(statistics.median(login_times))} | p99 {ms(percentile(login_times, 99))} | max {ms(max(login_times))}")
+    if probe_times:
+        print(f"static p50 {ms(statistics.median(probe_times))} | p99 {ms(percentile(probe_times, 99))} | max {ms(max(probe_times))} ({len(probe_times)} probes)")
+    print("code_verifier:", code_verifier.stats())
+
+    os.unlink(_db_file.name)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,108 @@
+"""
+Parsing throughput of the upload questions block: the old inline parser from
+/reading/admin/upload (re.match / re.sub with uncompiled patterns, one branch per line)
+against app/question_parser.py, on a synthetic questions block repeated --blocks times.
+
+Usage (from the repo root):
+    python benchmarks/question_parser.py --blocks 2000
+    python benchmarks/question_parser.py --layout dash
+"""
+import argparse
+import os
+import re
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import question_parser
+
+LETTER_BLOCK = """
+1. ¿Qué hicieron Marta y su abuelo en el huerto antes de que el sol calentara?
+a) Regaron las plantas *
+b) Recogieron tomates
+c) Descansaron a la sombra
+d) Nada
+
+2) ¿Por qué regaban tan pronto?
+a) Porque el agua se evapora con el calor *
+b) Porque tenían prisa
+c) Porque llovía
+d) Porque era domingo
+"""
+
+DASH_BLOCK = """
+1. What day is it in the story?
+- Friday
+- Monday *
+- Pancake Day
+
+2. What is the student's name?
+- Emma *
+- Friday
+- Anna
+"""
+
+LAYOUTS = {"letter": LETTER_BLOCK, "dash": DASH_BLOCK}
+
+
+def old_parse(questions_text):
+    # The parser as it was inlined in _save_upload, minus the db.add calls
+    questions = []
+    lines = questions_text.split('\n')
+    current_q = None
+    current_options = []
+    current_correct = 0
+    for line in lines:
+        line = line.strip()
+        if not line: continue
+        if re.match(r"^\d+[\.\)]", line):
+            if current_q:
+                questions.append((current_q, current_options, current_correct))
+            current_q = re.sub(r"^\d+[\.\)]\s*", "", line)
+            current_options = []
+            current_correct = 0
+        elif re.match(r"^[a-z][\.\)]", line) or line.startswith("-"):
+            opt_text = re.sub(r"^[a-z][\.\)]\s*|-\s*", "", line)
+            if "*" in line:
+                current_correct = len(current_options)
+                opt_text = opt_text.replace("*", "").strip()
+            current_options.append(opt_text)
+    if current_q:
+        questions.append((current_q, current_options, current_correct))
+    return questions
+
+
+def timed(fn, text, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(text)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--blocks", type=int, default=1000, help="Question blocks per input")
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--layout", default="letter", choices=sorted(LAYOUTS))
+    args = parser.parse_args()
+
+    text = LAYOUTS[args.layout] * args.blocks
+    lines = text.count("\n")
+    old_count = len(old_parse(text))
+    new_count = len(question_parser.parse(text).questions)
+    print(f"{args.layout} layout: {lines} lines, {new_count} questions (old parser: {old_count})")
+
+    old = timed(old_parse, text, args.repeat)
+    new = timed(question_parser.parse, text, args.repeat)
+    print(f"{'parser':<8}{'ms':>10}{'lines/s':>14}")
+    print(f"{'old':<8}{old * 1000:>10.1f}{lines / old:>14,.0f}")
+    print(f"{'new':<8}{new * 1000:>10.1f}{lines / new:>14,.0f}")
+    print(f"speedup {old / new:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Render time of a 13-question worksheet at every font_size, comparing the old two-pass
+question layout (measure with multi_cell(split_only=True), then multi_cell again to draw)
+with app/pdf_layout.py (break lines once, draw those lines), cold and warm line cache.
+
+Usage (from the repo root):
+    python benchmarks/worksheet_render.py --repeat 20
+    python benchmarks/worksheet_render.py --font-style mayuscula
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from dataclasses import dataclass
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import pdf_layout, worksheet_pdf
+
+TEXT = (
+    "Marta y su abuelo salieron temprano hacia el huerto. El sol apenas asomaba detrás de "
+    "las montañas y la hierba todavía estaba húmeda. —¿Por qué regamos tan pronto?, preguntó "
+    "Marta. —Porque con el calor del mediodía el agua se evapora antes de llegar a las raíces, "
+    "respondió el abuelo mientras llenaba la regadera. "
+) * 6
+
+QUESTIONS = [
+    SimpleNamespace(
+        question_content=f"¿Qué hicieron Marta y su abuelo en el huerto antes de que el sol calentara, según lo que cuenta el texto en el párrafo número {n}?",
+        options=[
+            "Regaron las plantas porque el agua se aprovecha mejor por la mañana temprano.",
+            "Recogieron tomates.",
+            "Descansaron a la sombra del manzano hasta la hora de comer con toda la familia.",
+            "Nada.",
+        ],
+        correct_answer=0,
+    )
+    for n in range(1, 14)
+]
+
+
+@dataclass(frozen=True)
+class _TwoPassBlock:
+    text: str
+    family: str
+    style: str
+    size: float
+    width: float
+    line_height: float
+    height: float
+
+
+def _two_pass_shape(pdf, text, family, style, size, width, line_height):
+    pdf.set_font(family, style, size)
+    lines = pdf.multi_cell(width, line_height, text, dry_run=True, output="LINES")
+    return _TwoPassBlock(text, family, style, size, width, line_height, len(lines) * line_height)
+
+
+def _two_pass_draw(pdf, block):
+    pdf.set_font(block.family, block.style, block.size)
+    pdf.multi_cell(block.width, block.line_height, block.text)
+
+
+def timed_renders(spec, repeat, before_each=None):
+    times = []
+    for _ in range(repeat):
+        if before_each:
+            before_each()
+        start = time.perf_counter()
+        worksheet_pdf.render(spec)
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--font-style", default="imprenta", choices=worksheet_pdf.FONT_STYLES)
+    args = parser.parse_args()
+
+    shape, draw = pdf_layout.shape, pdf_layout.draw
+    print(f"{len(QUESTIONS)} questions, font_style={args.font_style}, median of {args.repeat} renders (ms)")
+    print(f"{'size':<5}{'two-pass':>10}{'cold':>10}{'warm':>10}{'speedup':>9}")
+    for font_size in worksheet_pdf.SIZE_OFFSETS:
+        spec = worksheet_pdf.make_spec("El huerto del abuelo", TEXT, QUESTIONS, args.font_style, font_size)
+        worksheet_pdf.render(spec) # imports, font files
+
+        pdf_layout.shape, pdf_layout.draw = _two_pass_shape, _two_pass_draw
+        try:
+            two_pass = timed_renders(spec, args.repeat)
+        finally:
+            pdf_layout.shape, pdf_layout.draw = shape, draw
+        cold = timed_renders(spec, args.repeat, before_each=pdf_layout.line_breaks.clear)
+        warm = timed_renders(spec, args.repeat)
+        print(f"{font_size:<5}{two_pass:>10.1f}{cold:>10.1f}{warm:>10.1f}{two_pass / warm:>8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
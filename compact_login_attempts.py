@@ -0,0 +1,39 @@
+from app.database import SessionLocal, engine, Base, create_missing_indexes
+from app import attempt_retention
+import argparse
+
+# Rolls login_attempts rows older than the retention period up into
+# login_attempts_daily and deletes them (see app/attempt_retention.py).
+#
+# Usage:
+#   python compact_login_attempts.py                  # LOGIN_ATTEMPT_RETENTION_DAYS (30)
+#   python compact_login_attempts.py --days 7
+#   python compact_login_attempts.py --dry-run        # only report
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--days", type=int, default=attempt_retention.LOGIN_ATTEMPT_RETENTION_DAYS)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    create_missing_indexes()
+    db = SessionLocal()
+    try:
+        report = attempt_retention.compact(db, retention_days=args.days, dry_run=args.dry_run)
+    finally:
+        db.close()
+
+    for day, rows in report["per_day"].items():
+        print(f"  {day}: {rows} rows")
+    print(f"Cutoff: {report['cutoff']}")
+    print(f"Days compacted: {report['days']}, rows pruned: {report['rows_pruned']}, aggregates: {report['aggregates_written']}")
+    if args.dry_run:
+        print("Dry run: nothing saved.")
+    else:
+        print("✅ Compaction done.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+from app.database import SessionLocal, engine, Base
+from app import corpus_import
+import glob
+import os
+import sys
+
+# Imports the readings collection files (texts + questions, see app/corpus_import.py).
+# Safe to run again: only new or changed readings are written.
+#
+# Usage:
+#   python import_corpus.py                      # every readings_*primaria file
+#   python import_corpus.py path/to/file.txt ... # only these
+#   python import_corpus.py --dry-run            # only report
+
+CORPUS_GLOB = "data/texts/PRIMARIA/INGLÉS/textos/readings_*primaria_readings_questions.txt"
+
+
+def main(paths, dry_run=False):
+    # Not at import time: the pool workers import this module too
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        raws = []
+        for path in paths:
+            with open(path, encoding="utf-8") as f:
+                raws.extend(corpus_import.split_collection(f.read(), os.path.basename(path)))
+        # All files in one pool
+        readings = corpus_import.parse_readings(raws)
+        report = corpus_import.import_readings(db, readings, dry_run=dry_run)
+    finally:
+        db.close()
+
+    print(f"Files: {len(paths)}, readings: {report.readings}")
+    print(f"Created: {len(report.created)}, updated: {len(report.updated)}, unchanged: {len(report.unchanged)}")
+    for entry in report.skipped:
+        print(f"⚠️  Skipped {entry}")
+    for entry in report.inactive:
+        print(f"⚠️  Inactive {entry}: no answer key for every question")
+    for entry in report.diagnostics:
+        print(f"   {entry}")
+    if dry_run:
+        print("Dry run: nothing saved.")
+
+
+if __name__ == "__main__":
+    args = [a for a in sys.argv[1:] if a != "--dry-run"]
+    main(args or sorted(glob.glob(CORPUS_GLOB)), dry_run="--dry-run" in sys.argv)
@@ -0,0 +1,55 @@
+from app.database import SessionLocal, engine, Base
+from app import corpus_import, docx_ingest
+import argparse
+import glob
+
+# Imports the authors' Word files (texts + questions, see app/docx_ingest.py) through the
+# same path as import_corpus.py. Safe to run again: unchanged documents are not re-read
+# and only new or changed readings are written.
+#
+# Usage:
+#   python ingest_docx.py                                   # the *_READINGSrev.docx collections
+#   python ingest_docx.py "data/texts/PRIMARIA/Ada Yey.docx" \
+#       --questions data/questions/1_PRIMARIA/Preguntas.docx --course-level 1P
+#   python ingest_docx.py --dry-run                         # only report
+
+COLLECTIONS_GLOB = "data/texts/PRIMARIA/INGLÉS/textos/*READINGSrev.docx"
+
+
+def main(args):
+    # Not at import time: the pool workers import this module too
+    Base.metadata.create_all(bind=engine)
+    paths = args.paths or sorted(glob.glob(COLLECTIONS_GLOB))
+    extractions = docx_ingest.extract_all(paths, args.course_level, args.language, args.questions)
+    raws = [reading for extraction in extractions for reading in extraction.readings]
+
+    db = SessionLocal()
+    try:
+        readings = corpus_import.parse_readings(raws)
+        report = corpus_import.import_readings(db, readings, dry_run=args.dry_run)
+    finally:
+        db.close()
+
+    for extraction in extractions:
+        state = "cached" if extraction.cached else "extracted"
+        print(f"{extraction.source}: {extraction.kind}, {len(extraction.readings)} reading(s) ({state})")
+    print(f"Readings: {report.readings}")
+    print(f"Created: {len(report.created)}, updated: {len(report.updated)}, unchanged: {len(report.unchanged)}")
+    for entry in report.skipped:
+        print(f"⚠️  Skipped {entry}")
+    for entry in report.inactive:
+        print(f"⚠️  Inactive {entry}: no answer key for every question")
+    for entry in report.diagnostics:
+        print(f"   {entry}")
+    if args.dry_run:
+        print("Dry run: nothing saved.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("paths", nargs="*")
+    parser.add_argument("--questions", help="Questions-only .docx for the single text given")
+    parser.add_argument("--course-level", default="ALL", help="Course of single texts (collections use their header)")
+    parser.add_argument("--language", default="es", help="Language of single texts (collections are in English)")
+    parser.add_argument("--dry-run", action="store_true")
+    main(parser.parse_args())
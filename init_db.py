@@ -1,5 +1,5 @@
 from app.database import SessionLocal, engine, Base
-from app import models
+from app import models, catalog_cache
 import json
 
 Base.metadata.create_all(bind=engine)
@@ -52,6 +52,7 @@ def seed():
         db.add(db_q)
     
     db.commit()
+    catalog_cache.bump_generation(db)
     print("Database seeded!")
 
 if __name__ == "__main__":
@@ -0,0 +1,81 @@
+from app.database import SessionLocal, engine, Base
+from app import models, storage, catalog_cache
+import os
+import sys
+
+# Imports the data/texts tree into the text_blobs table (compressed, deduplicated by SHA-256)
+# and points every Text row that used a local file to its blob.
+#
+# Usage:
+#   python migrate_texts_to_blobs.py            # import + update texts
+#   python migrate_texts_to_blobs.py --dry-run  # only report
+
+Base.metadata.create_all(bind=engine)
+db = SessionLocal()
+backend = storage.BACKENDS["db"]
+
+
+def import_file(path):
+    with open(path, "rb") as f:
+        data = f.read()
+    data.decode("utf-8") # Only utf-8 text bodies are valid content
+    return backend.put_bytes(db, data), len(data)
+
+
+def migrate(dry_run=False):
+    imported = {} # normalized path -> sha
+    raw_bytes = 0
+    skipped = []
+
+    # 1. Every .txt in the tree
+    for root, _, files in os.walk(storage.TEXTS_ROOT):
+        for name in sorted(files):
+            if not name.endswith(".txt"):
+                continue
+            path = os.path.join(root, name)
+            try:
+                sha, size = import_file(path)
+            except UnicodeDecodeError:
+                skipped.append(path)
+                continue
+            imported[os.path.normpath(path)] = sha
+            raw_bytes += size
+
+    # 2. Texts pointing to files (including files outside data/texts)
+    updated = 0
+    missing = []
+    for text in db.query(models.Text).all():
+        if storage.is_blob(text.content_path):
+            continue
+        key = os.path.normpath(text.content_path or "")
+        sha = imported.get(key)
+        if sha is None and os.path.exists(key):
+            sha, size = import_file(key)
+            imported[key] = sha
+            raw_bytes += size
+        if sha is None:
+            missing.append(f"{text.id}: {text.content_path}")
+            continue
+        text.content_path = f"{storage.BLOB_PREFIX}{sha}"
+        updated += 1
+
+    distinct = len(set(imported.values()))
+    print(f"Files imported: {len(imported)} ({raw_bytes} bytes), distinct blobs: {distinct}")
+    print(f"Texts updated: {updated}")
+    for path in skipped:
+        print(f"⚠️  Skipped (not utf-8): {path}")
+    for entry in missing:
+        print(f"❌ File not found for text {entry}")
+
+    if dry_run:
+        db.rollback()
+        print("Dry run: nothing saved.")
+        return
+
+    db.commit()
+    catalog_cache.bump_generation(db)
+    print("✅ Migration done. Set TEXT_STORAGE_BACKEND=db so new texts go to the blob store.")
+
+
+if __name__ == "__main__":
+    migrate(dry_run="--dry-run" in sys.argv)
@@ -0,0 +1,36 @@
+from app.database import SessionLocal, engine, Base
+from app import licensing
+import argparse
+import sys
+
+# Mints licenses in bulk and writes their keys as CSV (see app/licensing.py).
+#
+# Usage:
+#   python mint_licenses.py --count 10000 --out licencias.csv
+#   python mint_licenses.py --count 50 --days 180          # CSV to stdout
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--count", type=int, required=True)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--out", help="CSV file (default: stdout)")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    out = open(args.out, "w", newline="") if args.out else sys.stdout
+    try:
+        for chunk in licensing.mint_csv(db, args.count, args.days):
+            out.write(chunk)
+    finally:
+        db.close()
+        if args.out:
+            out.close()
+
+    if args.out:
+        print(f"✅ {args.count} licenses ({args.days} days) written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
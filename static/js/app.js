@@ -16,11 +16,7 @@ document.addEventListener('DOMContentLoaded', () => {
             <button id="logout-btn" class="btn btn-outline" style="padding: 0.4rem 0.8rem; font-size: 0.8rem;">Cerrar Sesión</button>
         `;
 
-        document.getElementById('logout-btn').addEventListener('click', () => {
-            localStorage.removeItem('token');
-            localStorage.removeItem('username');
-            window.location.href = '/login';
-        });
+        document.getElementById('logout-btn').addEventListener('click', logoutSession);
     } else {
         // User is NOT logged in
         // Only show login/register links if NOT on those pages already?
@@ -0,0 +1,58 @@
+// Renovación transparente del token de acceso (30 min) con el refresh token.
+// Se carga en <head>, antes que los scripts de cada página.
+
+let refreshPromise = null;
+
+function refreshSession() {
+    // Una sola renovación a la vez: el resto de peticiones con 401 esperan a esta
+    if (!refreshPromise) {
+        const refreshToken = localStorage.getItem('refresh_token');
+        refreshPromise = (refreshToken ? axios.post('/auth/refresh', { refresh_token: refreshToken }) : Promise.reject())
+            .then(response => {
+                localStorage.setItem('token', response.data.access_token);
+                localStorage.setItem('refresh_token', response.data.refresh_token);
+                axios.defaults.headers.common['Authorization'] = 'Bearer ' + response.data.access_token;
+                return response.data.access_token;
+            })
+            .catch(error => {
+                // Otra pestaña pudo rotarlo justo antes: usar el que dejó guardado
+                if (localStorage.getItem('refresh_token') !== refreshToken) {
+                    return localStorage.getItem('token');
+                }
+                localStorage.removeItem('token');
+                localStorage.removeItem('refresh_token');
+                throw error;
+            })
+            .finally(() => { refreshPromise = null; });
+    }
+    return refreshPromise;
+}
+
+axios.interceptors.response.use(null, async error => {
+    const config = error.config;
+    const isAuthCall = config && config.url && config.url.startsWith('/auth/') && config.url !== '/auth/me';
+    if (!error.response || error.response.status !== 401 || !config || config._retried || isAuthCall) {
+        throw error;
+    }
+    config._retried = true;
+    try {
+        const token = await refreshSession();
+        config.headers['Authorization'] = 'Bearer ' + token;
+        return axios(config);
+    } catch (refreshError) {
+        throw error;
+    }
+});
+
+function logoutSession() {
+    const refreshToken = localStorage.getItem('refresh_token');
+    localStorage.removeItem('token');
+    localStorage.removeItem('refresh_token');
+    localStorage.removeItem('username');
+    const done = () => { window.location.href = '/login'; };
+    if (refreshToken) {
+        axios.post('/auth/logout', { refresh_token: refreshToken }).then(done, done);
+    } else {
+        done();
+    }
+}
@@ -0,0 +1,31 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# A throwaway SQLite database for the whole run: app.database reads DATABASE_URL on import
+_DB_DIR = tempfile.mkdtemp(prefix="aula_cl_tests_")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_DB_DIR, 'test.db')}"
+os.environ.setdefault("PDF_CACHE_DIR", os.path.join(_DB_DIR, "pdf_cache"))
+os.environ.setdefault("DOCX_CACHE_DIR", os.path.join(_DB_DIR, "docx_cache"))
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT) # Relative paths (data/, static/) as when running the server
+
+from app.database import Base, SessionLocal, engine # noqa: E402
+from app import models # noqa: E402,F401
+from app.identity_cache import identity_cache # noqa: E402
+
+
+@pytest.fixture
+def db():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    identity_cache.invalidate() # Principals of the previous test's rows
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
@@ -0,0 +1,27 @@
+import fcntl
+from datetime import datetime, timedelta
+
+from app import attempt_retention, models
+
+
+def test_scheduled_run_compacts_old_attempts(db):
+    old = datetime.utcnow() - timedelta(days=attempt_retention.LOGIN_ATTEMPT_RETENTION_DAYS + 5)
+    db.add_all([
+        models.LoginAttempt(ip_address="10.0.0.1", timestamp=old, success=False),
+        models.LoginAttempt(ip_address="10.0.0.1", timestamp=old, success=True),
+        models.LoginAttempt(ip_address="10.0.0.1", timestamp=datetime.utcnow(), success=False),
+    ])
+    db.commit()
+
+    report = attempt_retention.compact_once()
+
+    assert report["rows_pruned"] == 2
+    assert db.query(models.LoginAttempt).count() == 1
+    daily = db.query(models.LoginAttemptDaily).one()
+    assert (daily.successes, daily.failures) == (1, 1)
+
+
+def test_scheduled_run_is_skipped_while_another_worker_holds_the_lock(db):
+    with open(attempt_retention.LOCK_PATH, "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        assert attempt_retention.compact_once() is None
@@ -0,0 +1,56 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.bounded_pool import BoundedPool, PoolBusy
+
+
+def _wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_slot_is_held_until_the_job_ends_when_the_caller_goes_away():
+    pool = BoundedPool("test", workers=1, max_pending=1)
+    started = threading.Event()
+    release = threading.Event()
+
+    def job():
+        started.set()
+        release.wait(5)
+        return "done"
+
+    async def disconnecting_client():
+        task = asyncio.ensure_future(pool.run_async(job))
+        while not started.is_set():
+            await asyncio.sleep(0.01)
+        task.cancel() # Client disconnected
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(disconnecting_client())
+
+    # The job is still running: no room for another one
+    assert pool.stats()["pending"] == 1
+    with pytest.raises(PoolBusy):
+        pool.run_timed(lambda: None)
+
+    release.set()
+    _wait_for(lambda: pool.stats()["pending"] == 0)
+    assert pool.run_timed(lambda: 42)[0] == 42
+
+
+def test_failed_job_frees_its_slot():
+    pool = BoundedPool("test", workers=1, max_pending=1)
+
+    def boom():
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        pool.run_timed(boom)
+    _wait_for(lambda: pool.stats()["pending"] == 0)
+    assert pool.run_timed(lambda: 1)[0] == 1
@@ -0,0 +1,83 @@
+import pytest
+
+from app import corpus_import, models, question_parser, storage
+
+COLLECTION = """READINGS — 3º PRIMARIA
+
+3º - Reading 1 (3P-01)
+Emma's Backpack
+
+Emma has a pink backpack.
+
+Comprehension Questions
+1. What colour is her backpack?
+- Pink *
+- Green
+
+3º - Reading 2 (3P-02)
+Tom's Dog
+
+Tom has a small dog.
+
+Comprehension Questions
+1. What has Tom got?
+- A cat
+- A dog
+"""
+
+
+@pytest.fixture(autouse=True)
+def texts_root(tmp_path, monkeypatch):
+    monkeypatch.setenv("TEXT_STORAGE_BACKEND", "filesystem")
+    monkeypatch.setattr(storage, "TEXTS_ROOT", str(tmp_path))
+
+
+def _texts(db):
+    return {
+        row.reading_id: text
+        for row, text in db.query(models.CorpusReading, models.Text).join(models.Text, models.Text.id == models.CorpusReading.text_id)
+    }
+
+
+def test_unmarked_question_is_reported():
+    result = question_parser.parse("1. What has Tom got?\n- A cat\n- A dog\n")
+    assert [d.message for d in result.diagnostics] == ["no option marked as correct, using the first"]
+    assert not result.answer_key_complete
+
+
+def test_reading_without_answer_key_is_imported_inactive(db):
+    report = corpus_import.import_collection(db, COLLECTION, "readings.txt", workers=1)
+
+    assert report.inactive == ["3P-02"]
+    assert any("3P-02" in d and "no option marked" in d for d in report.diagnostics)
+    texts = _texts(db)
+    assert texts["3P-01"].is_active and not texts["3P-02"].is_active
+
+
+def test_reading_is_activated_once_its_answer_key_is_added(db):
+    corpus_import.import_collection(db, COLLECTION, "readings.txt", workers=1)
+
+    report = corpus_import.import_collection(db, COLLECTION.replace("- A dog", "- A dog *"), "readings.txt", workers=1)
+
+    assert report.updated == ["3P-02"] and report.inactive == []
+    text = _texts(db)["3P-02"]
+    db.refresh(text)
+    assert text.is_active
+    assert [q.correct_answer for q in text.questions] == [1]
+
+
+def test_failed_batch_leaves_the_live_texts_untouched(db, tmp_path, monkeypatch):
+    corpus_import.import_collection(db, COLLECTION, "readings.txt", workers=1)
+    path = tmp_path / "3P" / "corpus_3P-01.txt"
+    before = path.read_text(encoding="utf-8")
+
+    def fail(self, text_id):
+        raise RuntimeError("batch failed")
+
+    monkeypatch.setattr(question_parser.ParseResult, "rows", fail)
+    with pytest.raises(RuntimeError):
+        corpus_import.import_collection(db, COLLECTION.replace("pink backpack", "blue backpack"), "readings.txt", workers=1)
+
+    assert path.read_text(encoding="utf-8") == before
+    assert sorted(p.name for p in (tmp_path / "3P").iterdir()) == ["corpus_3P-01.txt", "corpus_3P-02.txt"]
+    assert _texts(db)["3P-01"].content_path == str(path)
@@ -0,0 +1,65 @@
+import inspect
+
+import fpdf
+from fpdf import FPDF
+from fpdf.fonts import SubsetMap, TTFFont
+from fpdf.line_break import MultiLineBreak, TextLine
+
+from app import pdf_layout
+from app.pdf_fonts import PreparedFont, AULA_FONT_FAMILY, AULA_FONT_PATH
+
+# app/pdf_layout.py and app/pdf_fonts.py use fpdf2 internals (pinned in requirements.txt).
+# These tests fail loudly when an fpdf2 upgrade renames or changes them.
+
+
+def _params(fn):
+    return set(inspect.signature(fn).parameters)
+
+
+def test_fpdf2_is_the_pinned_version():
+    with open("requirements.txt", encoding="utf-8") as f:
+        pinned = next(line.split("#")[0].split("==")[1].strip() for line in f if line.startswith("fpdf2=="))
+    assert fpdf.FPDF_VERSION == pinned
+
+
+def test_layout_internals_exist():
+    assert {"text", "markdown"} <= _params(FPDF._preload_font_styles)
+    assert {"h"} <= _params(FPDF._perform_page_break_if_need_be)
+    assert {"text_line", "h", "border", "new_x", "new_y", "fill", "link", "padding"} <= _params(FPDF._render_styled_text_line)
+    assert {"fragments", "max_width", "margins", "align", "wrapmode"} <= _params(MultiLineBreak.__init__)
+    assert TextLine._fields[:7] == ("fragments", "text_width", "number_of_spaces", "align", "height", "max_width", "trailing_nl")
+
+
+def test_font_internals_exist():
+    pdf = FPDF()
+    font = TTFFont(pdf, AULA_FONT_PATH, AULA_FONT_FAMILY.lower(), "")
+    for name in ("i", "ttfont", "subset", "missing_glyphs", "biggest_size_pt"):
+        assert hasattr(font, name), name
+    assert isinstance(font.subset, SubsetMap)
+
+
+def test_shaped_text_prints_like_multi_cell():
+    text = "La lectura de hoy es un cuento corto. " * 8 + "\nFin."
+
+    expected = FPDF()
+    expected.add_page()
+    expected.set_font("helvetica", "", 12)
+    expected.multi_cell(80, 6, text)
+
+    pdf = FPDF()
+    pdf.add_page()
+    pdf_layout.draw(pdf, pdf_layout.shape(pdf, text, "helvetica", "", 12, 80, 6))
+
+    assert (pdf.x, pdf.y, pdf.page) == (expected.x, expected.y, expected.page)
+
+
+def test_prepared_font_is_subset_in_the_output():
+    font = PreparedFont(AULA_FONT_FAMILY, AULA_FONT_PATH)
+    pdf = FPDF()
+    font.add_to(pdf)
+    pdf.add_page()
+    pdf.set_font(AULA_FONT_FAMILY, "", 14)
+    pdf.cell(text="abc")
+    output = bytes(pdf.output())
+    assert output.startswith(b"%PDF")
+    assert len(output) < len(open(AULA_FONT_PATH, "rb").read())
@@ -0,0 +1,63 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import models, refresh_tokens
+from app.database import SessionLocal
+
+
+def test_rotate_replaces_the_token(db):
+    raw, row = refresh_tokens.issue(db, "alice")
+    db.commit()
+
+    new_raw, new_row = refresh_tokens.rotate(db, raw)
+
+    assert new_raw != raw
+    assert new_row.family_id == row.family_id
+    old = db.get(models.RefreshToken, row.id)
+    db.refresh(old)
+    assert old.revoked_at is not None
+    assert old.replaced_by_id == new_row.id
+
+
+def test_concurrent_rotation_of_the_same_token_rejects_only_the_second(db):
+    raw, row = refresh_tokens.issue(db, "alice")
+    db.commit()
+
+    # Second tab: has read the token (still valid) but not rotated it yet
+    other = SessionLocal()
+    try:
+        stale = other.query(models.RefreshToken).filter(models.RefreshToken.id == row.id).one()
+        assert stale.revoked_at is None
+
+        first_raw, first_row = refresh_tokens.rotate(db, raw)
+
+        with pytest.raises(refresh_tokens.RefreshTokenError):
+            refresh_tokens.rotate(other, raw)
+    finally:
+        other.close()
+
+    # Inside REUSE_GRACE_SECONDS: the winner's token is still valid and rotates
+    db.expire_all()
+    assert db.get(models.RefreshToken, first_row.id).revoked_at is None
+    next_raw, next_row = refresh_tokens.rotate(db, first_raw)
+    assert next_row.family_id == row.family_id
+
+
+def test_reuse_after_the_grace_window_revokes_the_family(db):
+    raw, row = refresh_tokens.issue(db, "alice")
+    db.commit()
+    first_raw, first_row = refresh_tokens.rotate(db, raw)
+    db.query(models.RefreshToken).filter(models.RefreshToken.id == row.id).update(
+        {models.RefreshToken.revoked_at: datetime.utcnow() - timedelta(seconds=refresh_tokens.REUSE_GRACE_SECONDS + 1)}
+    )
+    db.commit()
+
+    with pytest.raises(refresh_tokens.RefreshTokenError):
+        refresh_tokens.rotate(db, raw)
+
+    db.expire_all()
+    family = db.query(models.RefreshToken).filter(models.RefreshToken.family_id == row.family_id).all()
+    assert all(t.revoked_at is not None for t in family)
+    with pytest.raises(refresh_tokens.RefreshTokenError):
+        refresh_tokens.rotate(db, first_raw)
@@ -0,0 +1,70 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app import auth, models
+from app.main import app
+
+
+@pytest.fixture
+def classes(db):
+    # Teacher 1 and teacher 2, one student each: student 1 belongs to teacher 2
+    teachers = [models.User(username=name, hashed_password="x") for name in ("ana", "luis")]
+    db.add_all(teachers)
+    db.flush()
+    db.add_all([
+        models.SubUser(name="Pablo", parent_user_id=teachers[1].id, login_code_display="PABLO-CODE"),
+        models.SubUser(name="Marta", parent_user_id=teachers[0].id, login_code_display="SECRET-CODE"),
+    ])
+    db.commit()
+    return teachers
+
+
+def _headers(subject):
+    return {"Authorization": f"Bearer {auth.create_access_token({'sub': subject})}"}
+
+
+def test_teacher_lists_own_students(classes):
+    response = TestClient(app).get("/subusers/", headers=_headers("ana"))
+    assert response.status_code == 200
+    assert [s["name"] for s in response.json()] == ["Marta"]
+
+
+@pytest.mark.parametrize("method, path, body", [
+    ("GET", "/subusers/", None),
+    ("POST", "/subusers/", {"name": "Intruso"}),
+    ("PUT", "/subusers/2", {"name": "Intruso"}),
+    ("DELETE", "/subusers/2", None),
+    ("POST", "/subusers/2/license", {"license_key": "ABC123XYZ"}),
+    ("POST", "/subusers/bulk", {"students": [{"name": "Intruso"}]}),
+])
+def test_student_token_is_rejected(db, classes, method, path, body):
+    # Student 1 has the same id as teacher 1
+    response = TestClient(app).request(method, path, json=body, headers=_headers("subuser:1"))
+    assert response.status_code == 403
+    assert "SECRET-CODE" not in response.text
+    assert db.query(models.SubUser).count() == 2
+
+
+def test_student_token_is_rejected_on_the_async_route(classes):
+    # The DATABASE_ASYNC=1 variant, on an async session over the test database
+    from fastapi import FastAPI
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    from app.database import SQLALCHEMY_DATABASE_URL, async_database_url, get_async_db
+    from app.routers import subusers
+
+    engine = create_async_engine(async_database_url(SQLALCHEMY_DATABASE_URL))
+    sessions = async_sessionmaker(engine, expire_on_commit=False)
+
+    async def override():
+        async with sessions() as session:
+            yield session
+
+    async_app = FastAPI()
+    async_app.include_router(subusers.async_router)
+    async_app.dependency_overrides[get_async_db] = override
+    client = TestClient(async_app)
+
+    assert client.get("/subusers/", headers=_headers("subuser:1")).status_code == 403
+    response = client.get("/subusers/", headers=_headers("ana"))
+    assert [s["name"] for s in response.json()] == ["Marta"]
@@ -0,0 +1,32 @@
+from fastapi.testclient import TestClient
+
+from app import auth, models, storage
+from app.main import app
+
+
+def test_upload_returns_the_question_diagnostics(db, tmp_path, monkeypatch):
+    monkeypatch.setenv("TEXT_STORAGE_BACKEND", "filesystem")
+    monkeypatch.setattr(storage, "TEXTS_ROOT", str(tmp_path))
+    db.add(models.User(username="admin", hashed_password="x"))
+    db.commit()
+    token = auth.create_access_token({"sub": "admin"})
+    content = (
+        "Había una vez un gato.\n"
+        "--- Preguntas ---\n"
+        "1. ¿Quién era?\n"
+        "a) Un gato *\n"
+        "b) Un perro\n"
+        "2. ¿Dónde vivía?\n"
+        "a) En casa\n"
+    )
+
+    response = TestClient(app).post(
+        "/reading/admin/upload",
+        headers={"Authorization": f"Bearer {token}"},
+        data={"title": "El gato", "course_level": "1P", "language": "es"},
+        files={"text_file": ("gato.txt", content.encode("utf-8"), "text/plain")},
+    )
+
+    assert response.status_code == 200, response.text
+    diagnostics = response.json()["diagnostics"]
+    assert diagnostics and all(d.startswith("line 6:") for d in diagnostics)
@@ -0,0 +1,81 @@
+import os
+
+import pytest
+from fastapi import HTTPException
+
+from app import models, storage
+from app.database import SessionLocal
+from app.routers import reading
+
+
+@pytest.fixture
+def texts_root(tmp_path, monkeypatch):
+    monkeypatch.setenv("TEXT_STORAGE_BACKEND", "filesystem")
+    monkeypatch.setattr(storage, "TEXTS_ROOT", str(tmp_path))
+    return tmp_path
+
+
+def _upload(db, content):
+    return reading._save_upload(db, "Cuento", "1P", "es", "cuento.txt", content, content, None, 1, None)
+
+
+def test_duplicate_upload_keeps_the_existing_file(db, texts_root):
+    text, _ = _upload(db, "Primera versión")
+
+    with pytest.raises(HTTPException) as e:
+        _upload(db, "Segunda versión")
+
+    assert e.value.status_code == 400
+    assert (texts_root / "1P" / "cuento.txt").read_text(encoding="utf-8") == "Primera versión"
+    assert storage.read_text(db, text.content_path) == "Primera versión"
+    assert os.listdir(texts_root / "1P") == ["cuento.txt"]
+
+
+def test_staged_text_is_discarded_when_the_row_is_not_committed(db, texts_root, monkeypatch):
+    stage_text = storage.stage_text
+
+    def stage_then_lose_the_race(*args):
+        staged = stage_text(*args)
+        other = SessionLocal() # Same filename committed by another upload meanwhile
+        other.add(models.Text(title="Otro", filename="cuento.txt", course_level="1P", content_path="x"))
+        other.commit()
+        other.close()
+        return staged
+
+    monkeypatch.setattr(storage, "stage_text", stage_then_lose_the_race)
+    with pytest.raises(HTTPException) as e:
+        _upload(db, "Texto")
+
+    assert e.value.status_code == 400
+    assert not (texts_root / "1P").exists() or os.listdir(texts_root / "1P") == []
+
+
+def _post(db, filename):
+    from fastapi.testclient import TestClient
+
+    from app import auth
+    from app.main import app
+
+    if not db.query(models.User).filter(models.User.username == "admin").first():
+        db.add(models.User(username="admin", hashed_password="x"))
+        db.commit()
+    return TestClient(app).post(
+        "/reading/admin/upload",
+        headers={"Authorization": f"Bearer {auth.create_access_token({'sub': 'admin'})}"},
+        data={"title": "Cuento", "course_level": "1P", "language": "es"},
+        files={"text_file": (filename, "Había una vez.".encode("utf-8"), "text/plain")},
+    )
+
+
+def test_upload_keeps_only_the_file_name(db, texts_root):
+    response = _post(db, "../../cuento.txt")
+
+    assert response.status_code == 200, response.text
+    assert response.json()["filename"] == "cuento.txt"
+    assert os.listdir(texts_root / "1P") == ["cuento.txt"]
+
+
+@pytest.mark.parametrize("filename", ["..", "dir/.", "C:\\\\Users\\\\.."])
+def test_upload_rejects_names_without_a_file(db, texts_root, filename):
+    assert _post(db, filename).status_code == 400
+    assert db.query(models.Text).count() == 0